@@ -0,0 +1,18 @@
+# Generated by Django 4.0.7 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_alter_player_options_alter_playerprofile_options'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='datetime_modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -6,6 +6,9 @@ class Player(AbstractUser):
     """
     The auth_user_model.
     """
+    # Changed by every save, so lists of Players can tell if they're stale
+    datetime_modified = models.DateTimeField(auto_now=True)
+
     class Meta:
         ordering = ['pk']
     
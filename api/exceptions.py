@@ -0,0 +1,21 @@
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+
+class PreconditionFailed(APIException):
+    """The Match has changed since the version given in If-Match."""
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The match has changed since it was last fetched.'
+    default_code = 'precondition_failed'
+
+class IdempotencyKeyConflict(APIException):
+    """Another request with the same Idempotency-Key is being processed."""
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this Idempotency-Key is in progress.'
+    default_code = 'idempotency_key_conflict'
+
+class IdempotencyKeyReused(APIException):
+    """An Idempotency-Key was sent again with a different request body."""
+    status_code = status.HTTP_422_UNPROCESSABLE_ENTITY
+    default_detail = 'This Idempotency-Key was used for a different request.'
+    default_code = 'idempotency_key_reused'
@@ -1,16 +1,93 @@
-from typing import Tuple
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Pattern, Tuple
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.urls import (NoReverseMatch, get_resolver, get_script_prefix,
+                         get_urlconf)
+from django.urls.resolvers import get_ns_resolver
+from django.utils.http import RFC3986_SUBDELIMS
 
 from rest_framework import serializers
+from rest_framework.reverse import preserve_builtin_query_params
+
+@lru_cache(maxsize=None)
+def compile_url(urlconf: str, view_name: str,
+                kwarg_names: FrozenSet[str]) -> Tuple[str, Pattern, Dict]:
+    """
+    Return the %-format template of the URL `view_name` reverses to with
+    `kwarg_names`, without the script prefix, the route pattern a filled in
+    template must match, and the converters of its kwargs. Namespaces are
+    followed the way `django.urls.reverse` follows them, without a current
+    app.
+    """
+    resolver = get_resolver(urlconf)
+    *namespaces, name = view_name.split(':')
+    ns_pattern = ''
+    ns_converters = {}
+    for ns in namespaces:
+        app_list = resolver.app_dict.get(ns)
+        if app_list and ns not in app_list:
+            ns = app_list[0]
+        try:
+            extra, resolver = resolver.namespace_dict[ns]
+        except KeyError:
+            raise NoReverseMatch(f'{ns} is not a registered namespace')
+        ns_pattern += extra
+        ns_converters.update(resolver.pattern.converters)
+    if ns_pattern:
+        resolver = get_ns_resolver(ns_pattern, resolver,
+                                   tuple(ns_converters.items()))
+
+    for possibility, pattern, defaults, converters in resolver.reverse_dict.getlist(name):
+        for result, params in possibility:
+            if set(params) == kwarg_names and not defaults:
+                return result, re.compile(f'^{pattern}'), converters
+    raise NoReverseMatch(
+        f"Reverse for '{view_name}' with keyword arguments "
+        f"{sorted(kwarg_names)} not found.")
 
 class ParameterizedHyperlinkedIdentityField(serializers.HyperlinkedIdentityField):
     """Class to use for `url` fields on Serializers whose URLS draw on 
     attributes from RelatedField instances.
+
+    Each view name is compiled once into a URL template (see `compile_url`),
+    and the URL kwargs are read without fetching related objects: a related
+    object's pk from its foreign key, and any other attribute from an
+    annotation named `<related field>_<lookup field>` (e.g.
+    `player_username`) or from the related object if it's already loaded.
     """
     def __init__(self, lookup_field_data: Tuple[Tuple[str, str, str]],
                  view_name: str = None, **kwargs):
         self.lookup_field_data = lookup_field_data
         super().__init__(view_name, **kwargs)
 
+    def get_lookup_value(self, obj, related_field_name, lookup_field):
+        """Return the value of `lookup_field` on the object related to `obj`
+        by `related_field_name`, or on `obj` itself if it has no such
+        relation."""
+        if not related_field_name:
+            return getattr(obj, lookup_field)
+
+        try:
+            field = obj._meta.get_field(related_field_name)
+        except (AttributeError, FieldDoesNotExist):
+            field = None
+
+        if field is not None and field.many_to_one:
+            if lookup_field in ('pk', field.target_field.attname):
+                return getattr(obj, field.attname)
+            annotation = f'{related_field_name}_{lookup_field}'
+            if annotation in obj.__dict__:
+                return obj.__dict__[annotation]
+        elif field is None and not hasattr(obj, related_field_name):
+            return getattr(obj, lookup_field)
+
+        target_obj = getattr(obj, related_field_name)
+        return None if target_obj is None else getattr(target_obj, lookup_field)
+
     def get_url(self, obj, view_name, request, format):
         """
         Given an object, return the URL that hyperlinks to the object.
@@ -21,18 +98,51 @@ class ParameterizedHyperlinkedIdentityField(serializers.HyperlinkedIdentityField
         # Unsaved objects will not yet have a valid URL.
         if hasattr(obj, 'pk') and obj.pk in (None, ''):
             return None
-        
-        kwargs = {}
 
+        kwargs = {}
         for related_field_name, lookup_field, lookup_url_kwarg in self.lookup_field_data:
+            kwargs[lookup_url_kwarg] = self.get_lookup_value(
+                obj, related_field_name, lookup_field)
+        # Nothing to link to, e.g. a Score whose Player was deleted
+        if None in kwargs.values():
+            return None
 
-            # Set object to search for attribute in (either self or related field)
-            if related_field_name and hasattr(obj, related_field_name):
-                target_obj = getattr(obj, related_field_name)
-            else:
-                target_obj = obj
+        # Versioned URLs are left to the versioning scheme
+        if getattr(request, 'versioning_scheme', None) is not None:
+            return self.reverse(view_name, kwargs=kwargs, request=request,
+                                format=format)
 
-            lookup_value = getattr(target_obj, lookup_field)
-            kwargs.update({lookup_url_kwarg: lookup_value})
-        
-        return self.reverse(view_name, kwargs=kwargs, request=request, format=format)
+        url_kwargs = kwargs if format is None else {**kwargs, 'format': format}
+        template, pattern, converters = compile_url(
+            get_urlconf() or settings.ROOT_URLCONF, view_name,
+            frozenset(url_kwargs))
+        subs = {
+            kwarg: converters[kwarg].to_url(value) if kwarg in converters
+                   else str(value)
+            for kwarg, value in url_kwargs.items()
+        }
+        # Values the route doesn't accept are left to `reverse`, which
+        # rejects them as it would without a compiled template
+        if not pattern.search(template % subs):
+            return self.reverse(view_name, kwargs=kwargs, request=request,
+                                format=format)
+        url = quote(get_script_prefix() + template % subs,
+                    safe=RFC3986_SUBDELIMS + '/~:@')
+
+        if request is None:
+            return url
+        return preserve_builtin_query_params(request.build_absolute_uri(url),
+                                             request)
+
+
+class CachedHyperlinkedRelatedField(serializers.HyperlinkedRelatedField):
+    """HyperlinkedRelatedField that looks up the object for each URL only 
+    once per serializer. Used on `many=True` serializers where many rows 
+    link to the same few objects (e.g., the two players in a match).
+    """
+    def get_object(self, view_name, view_args, view_kwargs):
+        cache = self.root.__dict__.setdefault('_related_object_cache', {})
+        key = (view_name, tuple(view_args), tuple(sorted(view_kwargs.items())))
+        if key not in cache:
+            cache[key] = super().get_object(view_name, view_args, view_kwargs)
+        return cache[key]
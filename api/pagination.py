@@ -0,0 +1,31 @@
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class OptionalCursorPagination(CursorPagination):
+    """
+    Cursor pagination that is only used when a request asks for it with a
+    `page_size` query parameter. Without one, the full list is returned as a
+    plain array, as before.
+
+    Each page is found from the position of the last one on the ordering
+    fields, so fetching a page costs the same however deep it is.
+    """
+    page_size = None
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+    ordering = 'pk'
+
+class GameCursorPagination(OptionalCursorPagination):
+    ordering = ('-datetime_played', '-pk')
+
+class MatchCursorPagination(OptionalCursorPagination):
+    ordering = ('-datetime_started', '-pk')
+
+class OptionalLimitOffsetPagination(LimitOffsetPagination):
+    """
+    Limit/offset pagination, only used when a request passes `limit`. For
+    lists sorted by client-chosen fields, such as the Player leaderboard,
+    that a cursor can't follow.
+    """
+    default_limit = None
+    max_limit = 500
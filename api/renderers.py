@@ -0,0 +1,137 @@
+"""
+Renderers for large API responses.
+
+FastJSONRenderer encodes JSON with orjson, and MessagePackRenderer encodes
+MessagePack for clients that send `Accept: application/msgpack`; turn them on
+with the API_FAST_RENDERERS setting. Both pass everything orjson and msgpack
+can't encode natively (including datetimes) to DRF's JSON encoder, so their
+output matches JSONRenderer's value for value.
+
+NDJSONRenderer and CSVRenderer render the streamed exports, one row at a
+time.
+"""
+import csv
+import json
+from typing import Iterable, Iterator, List, Sequence
+
+from django.core.exceptions import ImproperlyConfigured
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Converts what the encoders can't encode natively, the way JSONRenderer does
+encode_default = JSONEncoder().default
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that encodes with orjson. Pretty-printed responses (e.g. in
+    the browsable API) and responses without orjson installed are left to
+    JSONRenderer.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if orjson is None or self.get_indent(accepted_media_type,
+                                             renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        ret = orjson.dumps(
+            data,
+            default=encode_default,
+            option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+        )
+        # Escape U+2028 and U+2029, as JSONRenderer does
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029')
+
+class MessagePackRenderer(BaseRenderer):
+    """
+    Renderer which serializes to MessagePack. Needs the msgpack package.
+    """
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if msgpack is None:
+            raise ImproperlyConfigured(
+                'MessagePackRenderer needs the msgpack package.')
+        return msgpack.packb(data, default=encode_default, use_bin_type=True)
+
+class NDJSONRenderer(BaseRenderer):
+    """
+    Renderer which serializes to newline-delimited JSON: one JSON object per
+    row.
+    """
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render_row(self, row: dict) -> bytes:
+        return json.dumps(row, cls=JSONEncoder, ensure_ascii=False,
+                          separators=(',', ':')).encode() + b'\n'
+
+    def render_rows(self, columns: List[str],
+                    rows: Iterable[Sequence]) -> Iterator[bytes]:
+        """Render each row of values in `columns` as it's read."""
+        for row in rows:
+            yield self.render_row(dict(zip(columns, row)))
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if isinstance(data, list):
+            return b''.join(self.render_row(row) for row in data)
+        return self.render_row(data)
+
+class Echo:
+    """File-like object that returns what's written to it, so `csv.writer`
+    can render one row at a time."""
+    def write(self, value):
+        return value
+
+class CSVRenderer(BaseRenderer):
+    """
+    Renderer which serializes to CSV, with a header row of column names.
+    Values that aren't strings, numbers, or booleans are written as DRF's
+    JSON encoder would give them (e.g. datetimes in ISO 8601).
+    """
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def encode_value(self, value):
+        if value is None or isinstance(value, (str, int, float)):
+            return value
+        return encode_default(value)
+
+    def render_rows(self, columns: List[str],
+                    rows: Iterable[Sequence]) -> Iterator[bytes]:
+        """Render the header, then each row of values in `columns` as it's
+        read."""
+        writer = csv.writer(Echo())
+        yield writer.writerow(columns).encode(self.charset)
+        for row in rows:
+            yield writer.writerow(
+                [self.encode_value(value) for value in row]).encode(self.charset)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        rows = data if isinstance(data, list) else [data]
+        columns = list(rows[0]) if rows else []
+        return b''.join(self.render_rows(
+            columns, ([row.get(column) for column in columns] for row in rows)))
@@ -1,8 +1,67 @@
+from collections import Counter
+
+from datetime import datetime
+from typing import Optional
+
+from django.db.models import (Case, F, FloatField, OuterRef, Prefetch, Q,
+                              Subquery, When)
+from django.db.models.expressions import CombinedExpression
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.utils import timezone
+from django.utils.functional import cached_property
+
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.relations import PKOnlyObject
 
 from accounts.models import Player
-from api.fields import ParameterizedHyperlinkedIdentityField
-from base.models import Game, Match, Outcome, Score
+from api.fields import (CachedHyperlinkedRelatedField,
+                        ParameterizedHyperlinkedIdentityField)
+from base.models import Game, Match, Outcome, Rivalry, Score
+
+PLAYER_STATS_COUNTS = [
+    'matches_played',
+    'matches_won',
+    'matches_lost',
+    'games_won',
+    'games_lost',
+    'total_points',
+    'gin_count',
+    'undercut_count',
+]
+
+def win_pct(wins: str, losses: str) -> CombinedExpression:
+    """Expression for the share of `wins` out of `wins` + `losses`, or None
+    if both are 0."""
+    return Cast(F(wins), FloatField()) / NullIf(F(wins) + F(losses), 0)
+
+class DictRepresentationMixin:
+    """
+    Serializer mixin for the rows of long lists. Each instance is represented
+    as a plain dict instead of an OrderedDict (dicts keep their order), from
+    a list of readable fields built once per serializer rather than once per
+    instance. The renderers encode the dicts as they are.
+    """
+    @cached_property
+    def readable_fields(self):
+        return [field for field in self.fields.values()
+                if not field.write_only]
+
+    def to_representation(self, instance):
+        ret = {}
+        for field in self.readable_fields:
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+
+            check_for_none = (attribute.pk if isinstance(attribute, PKOnlyObject)
+                              else attribute)
+            if check_for_none is None:
+                ret[field.field_name] = None
+            else:
+                ret[field.field_name] = field.to_representation(attribute)
+        return ret
 
 class PlayerSerializer(serializers.HyperlinkedModelSerializer):
     """
@@ -34,7 +93,193 @@ class PlayerSerializer(serializers.HyperlinkedModelSerializer):
             'last_login',
         ]
 
-class MatchSerializer(serializers.HyperlinkedModelSerializer):
+class PlayerListSerializer(DictRepresentationMixin,
+                           serializers.HyperlinkedModelSerializer):
+    """
+    Lightweight serializer for lists of Players. Instead of every Match the
+    Player has joined, carries counts of their Matches and Games and a link
+    to their Match list.
+    """
+    url = serializers.HyperlinkedIdentityField(
+        lookup_field='username',
+        view_name='api:player-detail',
+    )
+    matches = serializers.HyperlinkedIdentityField(
+        lookup_field='username',
+        view_name='api:match-list-player',
+    )
+    match_count = serializers.IntegerField(read_only=True)
+    game_count = serializers.IntegerField(read_only=True)
+    class Meta:
+        model = Player
+        fields = [
+            'url',
+            'username',
+            'first_name',
+            'last_name',
+            'is_active',
+            'date_joined',
+            'last_login',
+            'match_count',
+            'game_count',
+            'matches',
+        ]
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Annotate the counts the serializer reads from the Player's
+        PlayerStats."""
+        return queryset.annotate(
+            match_count=Coalesce(F('stats__matches_played'), 0),
+            game_count=Coalesce(
+                F('stats__games_won') + F('stats__games_lost'), 0),
+        )
+
+class PlayerStatsSerializer(DictRepresentationMixin,
+                            serializers.HyperlinkedModelSerializer):
+    """
+    Serializer for the Player leaderboard: each Player's PlayerStats, and the
+    share of their Matches and Games they won (None before any are played).
+    """
+    url = serializers.HyperlinkedIdentityField(
+        lookup_field='username',
+        view_name='api:player-detail',
+    )
+    matches_played = serializers.IntegerField(read_only=True)
+    matches_won = serializers.IntegerField(read_only=True)
+    matches_lost = serializers.IntegerField(read_only=True)
+    match_win_pct = serializers.FloatField(read_only=True)
+    games_won = serializers.IntegerField(read_only=True)
+    games_lost = serializers.IntegerField(read_only=True)
+    game_win_pct = serializers.FloatField(read_only=True)
+    total_points = serializers.IntegerField(read_only=True)
+    gin_count = serializers.IntegerField(read_only=True)
+    undercut_count = serializers.IntegerField(read_only=True)
+    last_played = serializers.DateTimeField(read_only=True)
+    class Meta:
+        model = Player
+        fields = [
+            'url',
+            'username',
+            'matches_played',
+            'matches_won',
+            'matches_lost',
+            'match_win_pct',
+            'games_won',
+            'games_lost',
+            'game_win_pct',
+            'total_points',
+            'gin_count',
+            'undercut_count',
+            'last_played',
+        ]
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Annotate every stat the serializer reads from the Player's
+        PlayerStats, so the leaderboard is built from a single query.
+        """
+        counts = {
+            field: Coalesce(F(f'stats__{field}'), 0)
+            for field in PLAYER_STATS_COUNTS
+        }
+        return queryset.annotate(
+            last_played=F('stats__last_played'),
+            **counts,
+        ).annotate(
+            match_win_pct=win_pct('matches_won', 'matches_lost'),
+            game_win_pct=win_pct('games_won', 'games_lost'),
+        )
+
+class RivalrySerializer(DictRepresentationMixin,
+                        serializers.ModelSerializer):
+    """
+    Serializer for a Rivalry, from the side of one of its Players: their
+    totals against the other Player, and the other Player's against them.
+    """
+    url = ParameterizedHyperlinkedIdentityField(
+        view_name='api:rivalry-detail',
+        lookup_field_data=(
+            (None, 'player_username', 'username'),
+            (None, 'opponent_username', 'other'),
+        ),
+    )
+    player = ParameterizedHyperlinkedIdentityField(
+        view_name='api:player-detail',
+        lookup_field_data=((None, 'player_username', 'username'),),
+    )
+    opponent = ParameterizedHyperlinkedIdentityField(
+        view_name='api:player-detail',
+        lookup_field_data=((None, 'opponent_username', 'username'),),
+    )
+    opponent_username = serializers.CharField(read_only=True)
+    matches_won = serializers.IntegerField(read_only=True)
+    matches_lost = serializers.IntegerField(read_only=True)
+    match_win_pct = serializers.FloatField(read_only=True)
+    games_won = serializers.IntegerField(read_only=True)
+    games_lost = serializers.IntegerField(read_only=True)
+    game_win_pct = serializers.FloatField(read_only=True)
+    points = serializers.IntegerField(read_only=True)
+    opponent_points = serializers.IntegerField(read_only=True)
+    gin_count = serializers.IntegerField(read_only=True)
+    opponent_gin_count = serializers.IntegerField(read_only=True)
+    undercut_count = serializers.IntegerField(read_only=True)
+    opponent_undercut_count = serializers.IntegerField(read_only=True)
+    class Meta:
+        model = Rivalry
+        fields = [
+            'url',
+            'player',
+            'opponent',
+            'opponent_username',
+            'matches_played',
+            'matches_won',
+            'matches_lost',
+            'match_win_pct',
+            'games_played',
+            'games_won',
+            'games_lost',
+            'game_win_pct',
+            'points',
+            'opponent_points',
+            'gin_count',
+            'opponent_gin_count',
+            'undercut_count',
+            'opponent_undercut_count',
+            'last_played',
+        ]
+
+    @staticmethod
+    def setup_eager_loading(queryset, username):
+        """Annotate each Rivalry with the totals of the Player `username`
+        and of their opponent, so a Rivalry is read in a single query.
+        """
+        is_a = Q(player_a__username=username)
+
+        def side(own, other):
+            return Case(When(is_a, then=F(own)), default=F(other))
+
+        return queryset.annotate(
+            player_username=side('player_a__username', 'player_b__username'),
+            opponent_username=side('player_b__username', 'player_a__username'),
+            matches_won=side('a_matches_won', 'b_matches_won'),
+            matches_lost=side('b_matches_won', 'a_matches_won'),
+            games_won=side('a_games_won', 'b_games_won'),
+            games_lost=side('b_games_won', 'a_games_won'),
+            points=side('a_points', 'b_points'),
+            opponent_points=side('b_points', 'a_points'),
+            gin_count=side('a_gin_count', 'b_gin_count'),
+            opponent_gin_count=side('b_gin_count', 'a_gin_count'),
+            undercut_count=side('a_undercut_count', 'b_undercut_count'),
+            opponent_undercut_count=side('b_undercut_count',
+                                         'a_undercut_count'),
+        ).annotate(
+            match_win_pct=win_pct('matches_won', 'matches_lost'),
+            game_win_pct=win_pct('games_won', 'games_lost'),
+        )
+
+class MatchSerializer(DictRepresentationMixin,
+                      serializers.HyperlinkedModelSerializer):
     url = serializers.HyperlinkedIdentityField(
         lookup_field='pk',
         lookup_url_kwarg='match_pk',
@@ -49,8 +294,8 @@ class MatchSerializer(serializers.HyperlinkedModelSerializer):
     games = ParameterizedHyperlinkedIdentityField(
         view_name='api:game-detail',
         lookup_field_data=(
-            (None, 'pk', 'match_pk'),
-            ('game', 'pk', 'game_pk'),
+            ('match', 'pk', 'match_pk'),
+            (None, 'pk', 'game_pk'),
         ),
         many=True,
         read_only=True,
@@ -76,8 +321,95 @@ class MatchSerializer(serializers.HyperlinkedModelSerializer):
     class Meta:
         model = Match
         fields = '__all__'
+        read_only_fields = ['datetime_started', 'version']
 
-class GameSerializer(serializers.HyperlinkedModelSerializer):
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Fetch everything the serializer follows in a fixed number of
+        queries, however many Matches are in `queryset`.
+        """
+        return queryset.prefetch_related(
+            'players',
+            'games',
+            Prefetch('score_set', Score.objects.select_related('player')),
+            Prefetch('outcome_set', Outcome.objects.select_related('player')),
+        )
+
+def format_date(value: Optional[datetime]) -> Optional[str]:
+    """Format a datetime as a local date, e.g. '3/14/23'."""
+    if value is None:
+        return None
+    value = timezone.localtime(value)
+    return f'{value.month}/{value.day}/{value.year % 100}'
+
+class MatchSummarySerializer(DictRepresentationMixin,
+                             serializers.HyperlinkedModelSerializer):
+    """
+    Serializer for a row of a Player's match list: each Match with their
+    opponent, both Scores, the Player's Outcome, and its formatted dates.
+    """
+    url = serializers.HyperlinkedIdentityField(
+        lookup_field='pk',
+        lookup_url_kwarg='match_pk',
+        view_name='api:match-detail',
+    )
+    opponent = ParameterizedHyperlinkedIdentityField(
+        view_name='api:player-detail',
+        lookup_field_data=((None, 'opponent_username', 'username'),),
+    )
+    opponent_username = serializers.CharField(read_only=True)
+    player_score = serializers.IntegerField(read_only=True)
+    opponent_score = serializers.IntegerField(read_only=True)
+    player_outcome = serializers.IntegerField(read_only=True)
+    datetime_started_formatted = serializers.SerializerMethodField()
+    datetime_range_formatted = serializers.SerializerMethodField()
+    class Meta:
+        model = Match
+        fields = [
+            'url',
+            'pk',
+            'target_score',
+            'complete',
+            'datetime_started',
+            'datetime_ended',
+            'datetime_started_formatted',
+            'datetime_range_formatted',
+            'opponent',
+            'opponent_username',
+            'player_score',
+            'opponent_score',
+            'player_outcome',
+        ]
+
+    @staticmethod
+    def setup_eager_loading(queryset, username):
+        """Annotate each Match with the Scores and Outcome of the Player
+        `username` and their opponent, so the list is read in one query.
+        """
+        scores = Score.objects.filter(match=OuterRef('pk'))
+        player_score = scores.filter(player__username=username)
+        opponent_score = scores.exclude(player__username=username)
+        outcome = Outcome.objects.filter(match=OuterRef('pk'),
+                                         player__username=username)
+        return queryset.annotate(
+            player_score=Subquery(player_score.values('player_score')[:1]),
+            opponent_score=Subquery(opponent_score.values('player_score')[:1]),
+            opponent_username=Subquery(
+                opponent_score.values('player__username')[:1]),
+            player_outcome=Subquery(outcome.values('player_outcome')[:1]),
+        )
+
+    def get_datetime_started_formatted(self, match):
+        return format_date(match.datetime_started)
+
+    def get_datetime_range_formatted(self, match):
+        if match.datetime_ended is None:
+            return None
+        return (f'{format_date(match.datetime_started)}-'
+                f'{format_date(match.datetime_ended)}')
+
+class GameSerializer(DictRepresentationMixin,
+                     serializers.HyperlinkedModelSerializer):
 
     url = ParameterizedHyperlinkedIdentityField(
         view_name='api:game-detail',
@@ -105,8 +437,36 @@ class GameSerializer(serializers.HyperlinkedModelSerializer):
     class Meta:
         model = Game
         fields = '__all__'
+        read_only_fields = ['datetime_played']
+
+class GameBulkSerializer(GameSerializer):
+    """
+    Serializer for Games posted in bulk to a single Match. The Match is taken
+    from the URL, and each Player URL is only looked up once.
+    """
+    match = serializers.HyperlinkedRelatedField(
+        view_name='api:match-detail',
+        lookup_field='pk',
+        lookup_url_kwarg='match_pk',
+        read_only=True,
+    )
+    winner = CachedHyperlinkedRelatedField(
+        view_name='api:player-detail',
+        queryset=Player.objects.all(),
+        lookup_field='username',
+    )
+    loser = CachedHyperlinkedRelatedField(
+        view_name='api:player-detail',
+        queryset=Player.objects.all(),
+        lookup_field='username',
+    )
+    class Meta:
+        model = Game
+        fields = '__all__'
+        read_only_fields = ['_points_cache', 'datetime_played']
 
-class OutcomeSerializer(serializers.HyperlinkedModelSerializer):
+class OutcomeSerializer(DictRepresentationMixin,
+                        serializers.HyperlinkedModelSerializer):
 
     url = ParameterizedHyperlinkedIdentityField(
         view_name='api:outcome-detail',
@@ -130,7 +490,8 @@ class OutcomeSerializer(serializers.HyperlinkedModelSerializer):
         model = Outcome
         fields = '__all__'
 
-class ScoreSerializer(serializers.HyperlinkedModelSerializer):
+class ScoreSerializer(DictRepresentationMixin,
+                      serializers.HyperlinkedModelSerializer):
 
     url = ParameterizedHyperlinkedIdentityField(
         view_name='api:score-detail',
@@ -153,3 +514,151 @@ class ScoreSerializer(serializers.HyperlinkedModelSerializer):
     class Meta:
         model = Score
         fields = '__all__'
+
+class MatchPlayerSerializer(serializers.HyperlinkedModelSerializer):
+    """
+    Serializer for the Players inlined in a MatchSnapshotSerializer.
+    """
+    url = serializers.HyperlinkedIdentityField(
+        lookup_field='username',
+        view_name='api:player-detail',
+    )
+    class Meta:
+        model = Player
+        fields = ['url', 'username', 'first_name', 'last_name']
+
+class MatchSnapshotSerializer(serializers.Serializer):
+    """
+    Serializer for everything the match detail page shows: a Match, its
+    Players with their Game wins and losses in it, and its Games, Scores, and
+    Outcomes. Games are ordered newest first.
+    """
+    match = MatchSerializer(source='*', read_only=True)
+    players = serializers.SerializerMethodField()
+    games = GameSerializer(source='games.all', many=True, read_only=True)
+    scores = ScoreSerializer(source='score_set.all', many=True, read_only=True)
+    outcomes = OutcomeSerializer(source='outcome_set.all', many=True,
+                                 read_only=True)
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        """Fetch everything the serializer follows in five queries."""
+        return queryset.prefetch_related(
+            'players',
+            Prefetch('games', Game.objects.select_related('winner', 'loser')),
+            Prefetch('score_set', Score.objects.select_related('player')),
+            Prefetch('outcome_set', Outcome.objects.select_related('player')),
+        )
+
+    def get_players(self, match):
+        wins = Counter(game.winner_id for game in match.games.all())
+        losses = Counter(game.loser_id for game in match.games.all())
+        players = MatchPlayerSerializer(match.players.all(), many=True,
+                                        context=self.context).data
+        for player, player_data in zip(match.players.all(), players):
+            player_data['wins'] = wins[player.pk]
+            player_data['losses'] = losses[player.pk]
+        return players
+
+
+# Compact representations, for `?repr=compact`. Related objects are given by
+# pk, and Players by username, rather than by URL. Fields are listed
+# explicitly so the layout stays the same as the models grow.
+
+class CompactPlayerListSerializer(DictRepresentationMixin,
+                                  serializers.ModelSerializer):
+    """
+    Compact serializer for lists of Players, read from the counts annotated
+    by `PlayerListSerializer.setup_eager_loading`.
+    """
+    match_count = serializers.IntegerField(read_only=True)
+    game_count = serializers.IntegerField(read_only=True)
+    class Meta:
+        model = Player
+        fields = [
+            'id',
+            'username',
+            'first_name',
+            'last_name',
+            'is_active',
+            'date_joined',
+            'last_login',
+            'match_count',
+            'game_count',
+        ]
+        read_only_fields = fields
+
+class CompactMatchSerializer(DictRepresentationMixin,
+                             serializers.ModelSerializer):
+    """
+    Compact serializer for a Match, with its Players' usernames and its
+    Games' pks. Read from querysets set up by
+    `MatchSerializer.setup_eager_loading`.
+    """
+    players = serializers.SlugRelatedField(slug_field='username', many=True,
+                                           read_only=True)
+    games = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+    class Meta:
+        model = Match
+        fields = [
+            'id',
+            'players',
+            'games',
+            'datetime_started',
+            'datetime_ended',
+            'datetime_modified',
+            'target_score',
+            'complete',
+            'version',
+        ]
+        read_only_fields = fields
+
+class CompactGameSerializer(DictRepresentationMixin,
+                            serializers.ModelSerializer):
+    winner = serializers.SlugRelatedField(slug_field='username',
+                                          read_only=True)
+    loser = serializers.SlugRelatedField(slug_field='username',
+                                         read_only=True)
+    class Meta:
+        model = Game
+        fields = [
+            'id',
+            'match',
+            'winner',
+            'loser',
+            'points',
+            'gin',
+            'undercut',
+            'datetime_played',
+        ]
+        read_only_fields = fields
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('winner', 'loser')
+
+class CompactScoreSerializer(DictRepresentationMixin,
+                             serializers.ModelSerializer):
+    player = serializers.SlugRelatedField(slug_field='username',
+                                          read_only=True)
+    class Meta:
+        model = Score
+        fields = ['id', 'match', 'player', 'player_score']
+        read_only_fields = fields
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('player')
+
+class CompactOutcomeSerializer(DictRepresentationMixin,
+                               serializers.ModelSerializer):
+    player = serializers.SlugRelatedField(slug_field='username',
+                                          read_only=True)
+    class Meta:
+        model = Outcome
+        fields = ['id', 'match', 'player', 'player_outcome']
+        read_only_fields = fields
+
+    @staticmethod
+    def setup_eager_loading(queryset):
+        return queryset.select_related('player')
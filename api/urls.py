@@ -9,26 +9,36 @@ urlpatterns = [
     re_path(r'^players/$', views.PlayerListAll.as_view(), name='player-list-all'),
     re_path(r'^create-player/$', views.PlayerCreate.as_view(), name='player-create'),
     re_path(r'^request-player/$', views.RequestPlayer.as_view(), name='request-player'),
+    re_path(r'^stats/players/$', views.PlayerStats.as_view(), name='player-stats'),
 
     # Lists by Player
     re_path(r'^players/(?P<username>[a-zA-Z]+\w*)/matches/$', views.MatchListPlayer.as_view(), name='match-list-player'),
+    re_path(r'^players/(?P<username>[a-zA-Z]+\w*)/matches/summary/$', views.MatchSummaryListPlayer.as_view(), name='match-summary-list-player'),
     re_path(r'^players/(?P<username>[a-zA-Z]+\w*)/games/$', views.GameListPlayer.as_view(), name='game-list-player'),
+    re_path(r'^players/(?P<username>[a-zA-Z]+\w*)/games/export/$', views.GameExportPlayer.as_view(), name='game-export-player'),
     re_path(r'^players/(?P<username>[a-zA-Z]+\w*)/scores/$', views.ScoreListPlayer.as_view(), name='score-list-player'),
     re_path(r'^players/(?P<username>[a-zA-Z]+\w*)/outcomes/$', views.OutcomeListPlayer.as_view(), name='outcome-list-player'),
 
+    # Rivalry
+    re_path(r'^players/(?P<username>[a-zA-Z]+\w*)/vs/(?P<other>[a-zA-Z]+\w*)/$', views.RivalryDetail.as_view(), name='rivalry-detail'),
+    re_path(r'^players/(?P<username>[a-zA-Z]+\w*)/rivals/$', views.RivalryListPlayer.as_view(), name='rivalry-list-player'),
+
     # Match
     re_path(r'^matches/(?P<match_pk>[0-9]+)/$', views.MatchDetail.as_view(), name='match-detail'),
+    re_path(r'^matches/(?P<match_pk>[0-9]+)/snapshot/$', views.MatchSnapshot.as_view(), name='match-snapshot'),
     re_path(r'^matches/create/$', views.MatchCreate.as_view(), name='match-create'),
     
     # Lists by Match
     re_path(r'^matches/(?P<match_pk>[0-9]+)/players/$', views.PlayerListMatch.as_view(), name='player-list-match'),
     re_path(r'^matches/(?P<match_pk>[0-9]+)/games/$', views.GameListMatch.as_view(), name='game-list-match'),
+    re_path(r'^matches/(?P<match_pk>[0-9]+)/games/export/$', views.GameExportMatch.as_view(), name='game-export-match'),
     re_path(r'^matches/(?P<match_pk>[0-9]+)/scores/$', views.ScoreListMatch.as_view(), name='score-list-match'),
     re_path(r'^matches/(?P<match_pk>[0-9]+)/outcomes/$', views.OutcomeListMatch.as_view(), name='outcome-list-match'),    
 
     # Game
     re_path(r'^matches/(?P<match_pk>[0-9]+)/games/(?P<game_pk>[0-9]+)/$', views.GameDetail.as_view(), name='game-detail'),
     re_path(r'^matches/(?P<match_pk>[0-9]+)/games/create/$', views.GameCreate.as_view(), name='game-create'),
+    re_path(r'^matches/(?P<match_pk>[0-9]+)/games/bulk/$', views.GameBulkCreate.as_view(), name='game-bulk-create'),
 
     # Score and Outcome
     re_path(r'^matches/(?P<match_pk>[0-9]+)/players/(?P<username>[a-zA-Z]+\w*)/scores/$', views.ScoreDetail.as_view(), name='score-detail'),
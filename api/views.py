@@ -1,35 +1,508 @@
-from django.db.models import Q
+import hashlib
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q, QuerySet, Sum
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_etags, parse_http_date
 
+from rest_framework import serializers
 from rest_framework.decorators import api_view
-from rest_framework.generics import (CreateAPIView, ListAPIView,
+from rest_framework.generics import (CreateAPIView, GenericAPIView,
+                                     ListAPIView,
                                      ListCreateAPIView, RetrieveAPIView,
                                      RetrieveUpdateDestroyAPIView,
                                      UpdateAPIView)
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import SAFE_METHODS, AllowAny
+from rest_framework.renderers import (BrowsableAPIRenderer,
+                                      TemplateHTMLRenderer)
 from rest_framework.response import Response
 from rest_framework.reverse import reverse
+from rest_framework.utils.encoders import JSONEncoder
 from rest_framework.views import APIView
 
+from api.exceptions import (IdempotencyKeyConflict, IdempotencyKeyReused,
+                            PreconditionFailed)
+from api.filters import NullsLastOrderingFilter
+from api.pagination import (GameCursorPagination, MatchCursorPagination,
+                            OptionalLimitOffsetPagination)
 from api.permissions import IsAuthenticatedOrObjectPlayer
-from api.serializers import (GameSerializer, MatchSerializer, OutcomeSerializer,
-                             PlayerSerializer, ScoreSerializer)
+from api.renderers import CSVRenderer, NDJSONRenderer
+from api.serializers import (CompactGameSerializer, CompactMatchSerializer,
+                             CompactOutcomeSerializer,
+                             CompactPlayerListSerializer,
+                             CompactScoreSerializer, GameBulkSerializer,
+                             GameSerializer,
+                             MatchSerializer, MatchSnapshotSerializer,
+                             MatchSummarySerializer,
+                             OutcomeSerializer,
+                             PlayerListSerializer, PlayerSerializer,
+                             PlayerStatsSerializer, RivalrySerializer,
+                             ScoreSerializer)
 
 from accounts.models import Player
-from base.models import Game, Match, Outcome, Score
+from base.cache import (KEY_PREFIX, generation_key, get_generations,
+                        get_player_pks, record, response_cache)
+from base.models import (Game, IdempotencyKey, Match, Outcome, Rivalry,
+                         Score)
+from base.services import (GameService, StaleMatchVersion, bump_version,
+                           lock_matches)
+
+# Columns of the Game exports, as (column, lookup) pairs
+GAME_EXPORT_COLUMNS = (
+    ('id', 'pk'),
+    ('match', 'match_id'),
+    ('datetime_played', 'datetime_played'),
+    ('winner', 'winner__username'),
+    ('loser', 'loser__username'),
+    ('points', 'points'),
+    ('gin', 'gin'),
+    ('undercut', 'undercut'),
+)
+
+
+class MatchVersionMixin:
+    """
+    Optimistic concurrency for writes to a Match and its Games.
+
+    A client sends the Match version it last saw in an If-Match header, and
+    the write is rejected with 412 if the Match has moved on since. Responses
+    carry the Match's version in an X-Match-Version header.
+    """
+    version_header = 'X-Match-Version'
+    # Set by a write to the Match's version after it
+    match_version = None
+
+    def get_expected_version(self):
+        """Return the version in the If-Match header, or None if no
+        precondition was given."""
+        header = self.request.headers.get('If-Match')
+        if not header or header.strip() == '*':
+            return None
+        etags = parse_etags(header)
+        if len(etags) != 1:
+            raise serializers.ValidationError(
+                {'If-Match': 'Give a single match version.'})
+        # The ETags of other representations add a digest to the version
+        etag = etags[0].removeprefix('W/').strip('"').split('-', 1)[0]
+        if not etag.isdigit():
+            raise serializers.ValidationError(
+                {'If-Match': f'{etag} is not a match version.'})
+        return int(etag)
+
+    def set_match_version(self, response, version):
+        response[self.version_header] = str(version)
+        response['ETag'] = f'"{version}"'
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        if self.match_version is not None:
+            self.set_match_version(response, self.match_version)
+        return response
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        if self.match_version is not None:
+            self.set_match_version(response, self.match_version)
+        return response
+
+    def destroy(self, request, *args, **kwargs):
+        response = super().destroy(request, *args, **kwargs)
+        if self.match_version is not None:
+            self.set_match_version(response, self.match_version)
+        return response
+
+    def handle_exception(self, exc):
+        if isinstance(exc, StaleMatchVersion):
+            response = super().handle_exception(PreconditionFailed())
+            self.set_match_version(response, exc.match.version)
+            return response
+        return super().handle_exception(exc)
+
+class ConditionalGetMixin:
+    """
+    Conditional GET. A view's `get_change_marker()` returns its current
+    (ETag, last modified) pair from a cheap query, or None if there's nothing
+    to compare. A GET whose If-None-Match or If-Modified-Since matches is
+    answered with 304 Not Modified before anything is serialized; other
+    responses carry the ETag and Last-Modified headers.
+
+    The ETags of representations other than the default one (the view's
+    first renderer, without `?repr`) end in a digest of the representation,
+    so a client can't be told a different representation is current.
+    """
+    def get_change_marker(self) -> Optional[Tuple[str, Optional[datetime]]]:
+        raise NotImplementedError
+
+    def get_representation_digest(self) -> Optional[str]:
+        """Return a digest of the negotiated media type and `?repr`, or None
+        for the default representation."""
+        media_type = self.request.accepted_media_type
+        representation = self.request.query_params.get('repr')
+        default_renderer = self.renderer_classes[0]
+        if (representation is None
+                and type(self.request.accepted_renderer) is default_renderer
+                and media_type == default_renderer.media_type):
+            return None
+        return hashlib.sha256(json.dumps(
+            [media_type, representation]).encode()).hexdigest()[:8]
+
+    def set_change_marker(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+
+    def get(self, request, *args, **kwargs):
+        marker = self.get_change_marker()
+        if marker is None:
+            return super().get(request, *args, **kwargs)
+
+        etag, last_modified = marker
+        digest = self.get_representation_digest()
+        if digest is not None:
+            etag = f'{etag[:-1]}-{digest}"'
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=last_modified and int(last_modified.timestamp()),
+        )
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        self.set_change_marker(response, etag, last_modified)
+        return response
+
+class MatchChangeMarkerMixin(ConditionalGetMixin):
+    """
+    Conditional GET for reads scoped to the Match in the URL, which change
+    whenever the Match moves to a new version.
+    """
+    def get_change_marker(self):
+        marker = Match.objects.filter(pk=self.kwargs['match_pk']).values_list(
+            'version', 'datetime_modified').first()
+        if marker is None:
+            return None
+        version, datetime_modified = marker
+        return f'"{version}"', datetime_modified
+
+class PlayerChangeMarkerMixin(ConditionalGetMixin):
+    """
+    Conditional GET for lists of Players, which change when any of the
+    Players or their PlayerStats do, or when Players join or leave the list.
+    The Players are found by `get_marker_queryset()`.
+    """
+    def get_marker_queryset(self) -> QuerySet:
+        raise NotImplementedError
+
+    def get_change_marker(self):
+        marker = self.get_marker_queryset().aggregate(
+            count=Count('pk'),
+            pk_sum=Sum('pk'),
+            modified=Max('datetime_modified'),
+            last_login=Max('last_login'),
+            stats_modified=Max('stats__datetime_modified'),
+        )
+        digest = hashlib.sha256(
+            json.dumps(marker, cls=JSONEncoder, sort_keys=True).encode())
+        last_modified = max(filter(None, [
+            marker['modified'], marker['last_login'],
+            marker['stats_modified']]), default=None)
+        return f'"{digest.hexdigest()[:32]}"', last_modified
+
+class CompactRepresentationMixin:
+    """
+    Reads in a compact representation. A GET with `?repr=compact` is
+    serialized by `compact_serializer_class`, which gives related objects by
+    pk (and Players by username) instead of by URL, so no URLs are reversed.
+    The compact serializer's `setup_eager_loading`, if it has one, is applied
+    with the view's filters.
+    """
+    compact_serializer_class = None
+
+    def is_compact(self):
+        return (self.request.method in SAFE_METHODS
+                and self.request.query_params.get('repr') == 'compact')
+
+    def get_serializer_class(self):
+        if self.is_compact():
+            return self.compact_serializer_class
+        return super().get_serializer_class()
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        setup_eager_loading = getattr(self.compact_serializer_class,
+                                      'setup_eager_loading', None)
+        if self.is_compact() and setup_eager_loading is not None:
+            queryset = setup_eager_loading(queryset)
+        return queryset
+
+class CachedResponseMixin:
+    """
+    Keep rendered GET responses in the response cache, keyed by the request
+    and by the generations of the Matches and Players the view reads. Writes
+    to those Matches and Players move them to a new generation, which evicts
+    the responses (see `base.cache`).
+
+    The Matches and Players are named by URL kwargs: `cache_match_kwargs`
+    hold Match pks and `cache_player_kwargs` hold usernames. Views listing
+    every Player set `cache_all_players`.
+
+    Only authenticated requests are cached, since they pass every object
+    permission check on a GET, and only in renderers whose output is the
+    same for every user: HTML pages, which show the user and their forms,
+    aren't cached. Responses carry an X-Cache header of HIT or MISS, and
+    hits and misses are counted per view.
+    """
+    cache_match_kwargs = ()
+    cache_player_kwargs = ()
+    cache_all_players = False
+    # Set on a cache miss, to store the response under
+    response_cache_key = None
+
+    def get_response_cache_key(self):
+        """Return the key of the request's response, or None if it isn't
+        cached."""
+        if response_cache() is None or not self.request.user.is_authenticated:
+            return None
+        if isinstance(self.request.accepted_renderer,
+                      (BrowsableAPIRenderer, TemplateHTMLRenderer)):
+            return None
+
+        usernames = [self.kwargs[kwarg] for kwarg in self.cache_player_kwargs]
+        player_pks = get_player_pks(usernames)
+        # A Player that doesn't exist has nothing to cache
+        if len(player_pks) < len(set(usernames)):
+            return None
+
+        keys = [generation_key('match', self.kwargs[kwarg])
+                for kwarg in self.cache_match_kwargs]
+        keys += [generation_key('player', player_pks[username])
+                 for username in usernames]
+        if self.cache_all_players:
+            keys.append(generation_key('players'))
+        generations = get_generations(keys)
+
+        digest = hashlib.sha256(json.dumps([
+            self.request.get_full_path(),
+            self.request.accepted_media_type,
+            [generations[key] for key in keys],
+        ]).encode()).hexdigest()
+        return f'{KEY_PREFIX}:response:{type(self).__name__}:{digest}'
+
+    def get(self, request, *args, **kwargs):
+        key = self.get_response_cache_key()
+        if key is None:
+            return super().get(request, *args, **kwargs)
+
+        cached = response_cache().get(key)
+        if cached is None:
+            record(type(self).__name__, 'misses')
+            self.response_cache_key = key
+            return super().get(request, *args, **kwargs)
+
+        record(type(self).__name__, 'hits')
+        headers = cached['headers']
+        last_modified = headers.get('Last-Modified')
+        not_modified = get_conditional_response(
+            request,
+            etag=headers.get('ETag'),
+            last_modified=last_modified and parse_http_date(last_modified),
+        )
+        if not_modified is None:
+            response = HttpResponse(cached['content'])
+        else:
+            response = not_modified
+            headers = {header: value for header, value in headers.items()
+                       if header in ('ETag', 'Last-Modified', 'Vary')}
+        for header, value in headers.items():
+            response[header] = value
+        response['X-Cache'] = 'HIT'
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args,
+                                             **kwargs)
+        if request.method == 'GET':
+            patch_vary_headers(response, ('Accept', 'Cookie', 'Authorization'))
+        if self.response_cache_key is None:
+            return response
+
+        response['X-Cache'] = 'MISS'
+        if response.status_code == 200 and isinstance(response, Response):
+            response.render()
+            response_cache().set(
+                self.response_cache_key,
+                {
+                    'content': response.content,
+                    'headers': {header: value for header, value
+                                in response.items() if header != 'X-Cache'},
+                },
+                settings.API_RESPONSE_CACHE_TIMEOUT,
+            )
+        return response
+
+class ExportMixin:
+    """
+    Streamed exports. A GET with `?format=ndjson` or `?format=csv` (or the
+    matching Accept header) streams a row for each object in the view's
+    queryset, with the columns in `export_columns`: (column, lookup) pairs
+    read with `values_list`. Rows are fetched `chunk_size` at a time through
+    a server-side cursor where the database has them, and rendered as they
+    are sent, so memory use doesn't grow with the length of the export.
+    """
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+    export_columns = ()
+    chunk_size = 2000
+
+    def get_export_filename(self) -> str:
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        queryset = self.get_queryset().values_list(
+            *[lookup for column, lookup in self.export_columns])
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+
+        response = StreamingHttpResponse(
+            renderer.render_rows(
+                [column for column, lookup in self.export_columns],
+                queryset.iterator(chunk_size=self.chunk_size)),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.get_export_filename()}.'
+            f'{renderer.format}"')
+        return response
+
+class IdempotentCreateMixin:
+    """
+    Idempotency-Key support for POSTs that create objects.
+
+    The response to a POST sent with an Idempotency-Key header is stored in
+    the same transaction as the objects it creates. A retry with the same key
+    and body returns the stored response without writing again, until the key
+    is older than the IDEMPOTENCY_KEY_TTL setting.
+    """
+    idempotency_header = 'Idempotency-Key'
+    stored_headers = ('Location', 'ETag', 'X-Match-Version')
+
+    def create(self, request, *args, **kwargs):
+        header = request.headers.get(self.idempotency_header)
+        if not header:
+            return super().create(request, *args, **kwargs)
+
+        user_pk = request.user.pk if request.user.is_authenticated else ''
+        key = hashlib.sha256(
+            f'{user_pk}:{request.path}:{header}'.encode()).hexdigest()
+        request_hash = hashlib.sha256(json.dumps(
+            request.data, cls=JSONEncoder, sort_keys=True).encode()).hexdigest()
+
+        with transaction.atomic():
+            record = IdempotencyKey.objects.filter(pk=key).first()
+            if record is not None and not record.is_expired:
+                if record.request_hash != request_hash:
+                    raise IdempotencyKeyReused()
+                headers = dict(record.headers, **{'Idempotent-Replayed': 'true'})
+                return Response(record.response, status=record.status_code,
+                                headers=headers)
+
+            response = super().create(request, *args, **kwargs)
+            record = IdempotencyKey(
+                key=key,
+                request_hash=request_hash,
+                status_code=response.status_code,
+                response=response.data,
+                headers={name: response[name] for name in self.stored_headers
+                         if response.has_header(name)},
+            )
+            # If a concurrent request with the same key committed first,
+            # everything written here is rolled back
+            try:
+                with transaction.atomic():
+                    IdempotencyKey.objects.filter(pk=key).expired().delete()
+                    record.save(force_insert=True)
+            except IntegrityError:
+                raise IdempotencyKeyConflict()
+        return response
 
 # Player
 
-class PlayerDetail(RetrieveUpdateDestroyAPIView):
+class PlayerDetail(CachedResponseMixin, RetrieveUpdateDestroyAPIView):
     """GET a Player object."""
+    cache_player_kwargs = ['username']
     queryset = Player.objects.all()
     serializer_class = PlayerSerializer
     lookup_field = 'username'
 
-class PlayerListAll(ListAPIView):
+class PlayerListMixin(CompactRepresentationMixin, PlayerChangeMarkerMixin):
+    """
+    Lists of Players use the lightweight PlayerListSerializer. Each Player's
+    full `match_set` is only included with `?expand=match_set`, and not in
+    the compact representation.
+    """
+    compact_serializer_class = CompactPlayerListSerializer
+
+    def expand_match_set(self):
+        if self.is_compact():
+            return False
+        expand = self.request.query_params.get('expand', '')
+        return 'match_set' in expand.split(',')
+
+    def get_serializer_class(self):
+        if self.is_compact():
+            return self.compact_serializer_class
+        if self.expand_match_set():
+            return PlayerSerializer
+        return PlayerListSerializer
+
+    def setup_eager_loading(self, queryset):
+        if self.expand_match_set():
+            return queryset.prefetch_related('match_set')
+        return PlayerListSerializer.setup_eager_loading(queryset)
+
+class PlayerListAll(CachedResponseMixin, PlayerListMixin, ListAPIView):
     """GET all Player instances."""
-    queryset = Player.objects.all()
-    serializer_class = PlayerSerializer
+    cache_all_players = True
+    def get_marker_queryset(self):
+        return Player.objects.all()
+
+    def get_queryset(self):
+        return self.setup_eager_loading(self.get_marker_queryset())
+
+class PlayerStats(CachedResponseMixin, PlayerChangeMarkerMixin, ListAPIView):
+    """GET every Player's PlayerStats, with Match and Game win percentages.
+    Sort with `?ordering=` (default: best Match win percentage first) and
+    paginate with `?limit=` and `?offset=`.
+    """
+    cache_all_players = True
+    queryset = PlayerStatsSerializer.setup_eager_loading(Player.objects.all())
+    serializer_class = PlayerStatsSerializer
+    pagination_class = OptionalLimitOffsetPagination
+    filter_backends = [NullsLastOrderingFilter]
+    ordering_fields = [
+        'username',
+        'matches_played',
+        'matches_won',
+        'matches_lost',
+        'match_win_pct',
+        'games_won',
+        'games_lost',
+        'game_win_pct',
+        'total_points',
+        'gin_count',
+        'undercut_count',
+        'last_played',
+    ]
+    ordering = ['-match_win_pct', '-matches_won', 'username']
+
+    def get_marker_queryset(self):
+        return Player.objects.all()
 
 class PlayerCreate(CreateAPIView):
     """POST a new Player"""
@@ -51,129 +524,336 @@ class RequestPlayer(APIView):
 
 # Lists by Player
 
-class MatchListPlayer(ListAPIView):
+class MatchListPlayer(CachedResponseMixin, CompactRepresentationMixin,
+                      ListAPIView):
     """GET a list of Match objects for the specified user."""
+    cache_player_kwargs = ['username']
     serializer_class = MatchSerializer
+    compact_serializer_class = CompactMatchSerializer
+    pagination_class = MatchCursorPagination
+    def get_queryset(self):
+        username = self.kwargs['username']
+        return MatchSerializer.setup_eager_loading(
+            Match.objects.filter(players__username=username))
+
+class MatchSummaryListPlayer(CachedResponseMixin, ListAPIView):
+    """GET the specified user's Matches for their match list page: each with
+    their opponent, both Scores, their Outcome, and formatted dates, from one
+    query.
+    """
+    cache_player_kwargs = ['username']
+    serializer_class = MatchSummarySerializer
+    pagination_class = MatchCursorPagination
     def get_queryset(self):
         username = self.kwargs['username']
-        return Match.objects.filter(players__username=username)
+        return MatchSummarySerializer.setup_eager_loading(
+            Match.objects.filter(players__username=username), username)
 
-class GameListPlayer(ListAPIView):
+class GameListPlayer(CachedResponseMixin, CompactRepresentationMixin,
+                     ListAPIView):
     """GET a list of Game objects for the specified user."""
+    cache_player_kwargs = ['username']
     serializer_class = GameSerializer
+    compact_serializer_class = CompactGameSerializer
+    pagination_class = GameCursorPagination
     def get_queryset(self):
         username = self.kwargs['username']
-        return Game.objects.filter(Q(winner__username=username) |
-                                    Q(loser__username=username))
+        return Game.objects.filter(
+            Q(winner__username=username) | Q(loser__username=username)
+        ).select_related('winner', 'loser')
+
+class GameExportPlayer(ExportMixin, GenericAPIView):
+    """GET every Game of the specified user, oldest first, streamed as
+    NDJSON or CSV."""
+    export_columns = GAME_EXPORT_COLUMNS
+
+    def get_queryset(self):
+        player = get_object_or_404(Player, username=self.kwargs['username'])
+        return Game.objects.filter(Q(winner=player) | Q(loser=player)).order_by(
+            'datetime_played', 'pk')
 
-class ScoreListPlayer(ListAPIView):
+    def get_export_filename(self):
+        return f"{self.kwargs['username']}-games"
+
+class ScoreListPlayer(CachedResponseMixin, CompactRepresentationMixin,
+                      ListAPIView):
     """GET a list of Score objects for the specified user."""
+    cache_player_kwargs = ['username']
     serializer_class = ScoreSerializer
+    compact_serializer_class = CompactScoreSerializer
     def get_queryset(self):
         username = self.kwargs['username']
-        return Score.objects.filter(player__username=username)
+        return Score.objects.filter(
+            player__username=username).select_related('player')
 
-class OutcomeListPlayer(ListAPIView):
+class OutcomeListPlayer(CachedResponseMixin, CompactRepresentationMixin,
+                        ListAPIView):
     """GET a list of Outcome objects for the specified user."""
+    cache_player_kwargs = ['username']
     serializer_class = OutcomeSerializer
+    compact_serializer_class = CompactOutcomeSerializer
+    def get_queryset(self):
+        username = self.kwargs['username']
+        return Outcome.objects.filter(
+            player__username=username).select_related('player')
+
+
+# Rivalry
+
+class RivalryDetail(CachedResponseMixin, RetrieveAPIView):
+    """GET the specified user's Rivalry with another Player: their
+    head-to-head Match and Game record. Players who have never shared a
+    Match have no Rivalry.
+    """
+    cache_player_kwargs = ['username', 'other']
+    serializer_class = RivalrySerializer
+    def get_object(self):
+        username, other = self.kwargs['username'], self.kwargs['other']
+        queryset = Rivalry.objects.filter(
+            Q(player_a__username=username, player_b__username=other)
+            | Q(player_a__username=other, player_b__username=username))
+        return get_object_or_404(
+            RivalrySerializer.setup_eager_loading(queryset, username))
+
+class RivalryListPlayer(CachedResponseMixin, ListAPIView):
+    """GET the specified user's Rivalries, most Games played first (their
+    top rivals). Sort with `?ordering=` and paginate with `?limit=` and
+    `?offset=`.
+    """
+    cache_player_kwargs = ['username']
+    serializer_class = RivalrySerializer
+    pagination_class = OptionalLimitOffsetPagination
+    filter_backends = [NullsLastOrderingFilter]
+    ordering_fields = [
+        'opponent_username',
+        'matches_played',
+        'matches_won',
+        'matches_lost',
+        'match_win_pct',
+        'games_played',
+        'games_won',
+        'games_lost',
+        'game_win_pct',
+        'points',
+        'last_played',
+    ]
+    ordering = ['-games_played', '-last_played', 'opponent_username']
     def get_queryset(self):
         username = self.kwargs['username']
-        return Outcome.objects.filter(player__username=username)
+        queryset = Rivalry.objects.filter(Q(player_a__username=username) |
+                                          Q(player_b__username=username))
+        return RivalrySerializer.setup_eager_loading(queryset, username)
 
 
 # Match
 
-class MatchDetail(RetrieveUpdateDestroyAPIView):
-    """GET, PUT/PATCH, or DELETE a Match."""
-    queryset = Match.objects.all()
+class MatchDetail(CachedResponseMixin, CompactRepresentationMixin,
+                  MatchChangeMarkerMixin, MatchVersionMixin,
+                  RetrieveUpdateDestroyAPIView):
+    """GET, PUT/PATCH, or DELETE a Match.
+    GET takes the Match's version in an If-None-Match header, and PUT,
+    PATCH, and DELETE take it in an If-Match header.
+    """
+    cache_match_kwargs = ['match_pk']
+    queryset = MatchSerializer.setup_eager_loading(Match.objects.all())
     serializer_class = MatchSerializer
+    compact_serializer_class = CompactMatchSerializer
+    lookup_url_kwarg = 'match_pk'
+    lookup_field = 'pk'
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        self.set_match_version(response, response.data['version'])
+        return response
+
+    @transaction.atomic
+    def perform_update(self, serializer):
+        match = lock_matches([serializer.instance.pk])[serializer.instance.pk]
+        bump_version(match, self.get_expected_version())
+        serializer.save(version=match.version)
+        self.match_version = match.version
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        match = lock_matches([instance.pk])[instance.pk]
+        bump_version(match, self.get_expected_version())
+        instance.delete()
+
+class MatchSnapshot(CachedResponseMixin, MatchChangeMarkerMixin, RetrieveAPIView):
+    """GET a Match with its Players, Games, Scores, and Outcomes."""
+    cache_match_kwargs = ['match_pk']
+    queryset = MatchSnapshotSerializer.setup_eager_loading(Match.objects.all())
+    serializer_class = MatchSnapshotSerializer
     lookup_url_kwarg = 'match_pk'
     lookup_field = 'pk'
 
-class MatchCreate(CreateAPIView):
-    """POST a Match."""
+class MatchCreate(IdempotentCreateMixin, CreateAPIView):
+    """POST a Match. Takes an optional Idempotency-Key header."""
     queryset = Match.objects.all()
     serializer_class = MatchSerializer
 
 
 # Lists by Match
 
-class PlayerListMatch(ListAPIView):
+class PlayerListMatch(CachedResponseMixin, PlayerListMixin, ListAPIView):
     """GET a Match's list of Players."""
-    serializer_class = PlayerSerializer
+    cache_match_kwargs = ['match_pk']
+    cache_all_players = True
+    def get_marker_queryset(self):
+        return Player.objects.filter(match_set=self.kwargs['match_pk'])
+
     def get_queryset(self):
         match_pk = self.kwargs['match_pk']
         match = Match.objects.get(pk=match_pk)
-        return Player.objects.filter(match_set=match)
+        return self.setup_eager_loading(Player.objects.filter(match_set=match))
 
-class GameListMatch(ListAPIView):
+class GameListMatch(CachedResponseMixin, CompactRepresentationMixin,
+                    MatchChangeMarkerMixin, ListAPIView):
     """GET a Match's list of Games."""
+    cache_match_kwargs = ['match_pk']
     serializer_class = GameSerializer
+    compact_serializer_class = CompactGameSerializer
+    pagination_class = GameCursorPagination
     def get_queryset(self):
         match_pk = self.kwargs['match_pk']
         match = Match.objects.get(pk=match_pk)
-        return Game.objects.filter(match=match)
+        return Game.objects.filter(match=match).select_related('winner',
+                                                               'loser')
+
+class GameExportMatch(ExportMixin, GenericAPIView):
+    """GET a Match's Games, oldest first, streamed as NDJSON or CSV."""
+    export_columns = GAME_EXPORT_COLUMNS
 
-class ScoreListMatch(ListAPIView):
+    def get_queryset(self):
+        match = get_object_or_404(Match, pk=self.kwargs['match_pk'])
+        return Game.objects.filter(match=match).order_by(
+            'datetime_played', 'pk')
+
+    def get_export_filename(self):
+        return f"match-{self.kwargs['match_pk']}-games"
+
+class ScoreListMatch(CachedResponseMixin, CompactRepresentationMixin,
+                     MatchChangeMarkerMixin, ListAPIView):
     """GET a Match's list of Scores."""
+    cache_match_kwargs = ['match_pk']
     serializer_class = ScoreSerializer
+    compact_serializer_class = CompactScoreSerializer
     def get_queryset(self):
         match_pk = self.kwargs['match_pk']
         match = Match.objects.get(pk=match_pk)
-        return Score.objects.filter(match=match)
+        return Score.objects.filter(match=match).select_related('player')
 
-class OutcomeListMatch(ListAPIView):
+class OutcomeListMatch(CachedResponseMixin, CompactRepresentationMixin,
+                       MatchChangeMarkerMixin, ListAPIView):
     """GET a Match's list of Outcomes."""
+    cache_match_kwargs = ['match_pk']
     serializer_class = OutcomeSerializer
+    compact_serializer_class = CompactOutcomeSerializer
     def get_queryset(self):
         match_pk = self.kwargs['match_pk']
         match = Match.objects.get(pk=match_pk)
-        return Outcome.objects.filter(match=match)
+        return Outcome.objects.filter(match=match).select_related('player')
 
 
 # Game
 
-class GameDetail(RetrieveUpdateDestroyAPIView):
-    """GET, PUT/PATCH, or DELETE a Game."""
-    queryset = Game.objects.all()
+class GameDetail(CachedResponseMixin, CompactRepresentationMixin,
+                 MatchVersionMixin, RetrieveUpdateDestroyAPIView):
+    """GET, PUT/PATCH, or DELETE a Game.
+    PUT, PATCH, and DELETE take the Match's version in an If-Match header.
+    """
+    cache_match_kwargs = ['match_pk']
+    queryset = Game.objects.select_related('winner', 'loser')
     serializer_class = GameSerializer
+    compact_serializer_class = CompactGameSerializer
 
     def get_object(self):
-        queryset = self.get_queryset()
+        queryset = self.filter_queryset(self.get_queryset())
         obj = get_object_or_404(queryset,
                                 match__pk=self.kwargs['match_pk'],
                                 pk=self.kwargs['game_pk'])
         self.check_object_permissions(self.request, obj)
         return obj
 
-class GameCreate(CreateAPIView):
-    """POST a Game."""
+    def perform_update(self, serializer):
+        game = serializer.instance
+        for attr, value in serializer.validated_data.items():
+            setattr(game, attr, value)
+        match = GameService.update(game, self.get_expected_version())
+        self.match_version = match.version
+
+    def perform_destroy(self, instance):
+        match = GameService.delete(instance, self.get_expected_version())
+        self.match_version = match.version
+
+class GameCreate(IdempotentCreateMixin, MatchVersionMixin, CreateAPIView):
+    """POST a Game. Takes the Match's version in an If-Match header and an
+    optional Idempotency-Key header.
+    """
     queryset = Game.objects.all()
     serializer_class = GameSerializer
 
+    def perform_create(self, serializer):
+        game = Game(**serializer.validated_data)
+        serializer.instance = GameService.create(
+            game, self.get_expected_version())
+        self.match_version = game.match.version
+
+class GameBulkCreate(MatchVersionMixin, CreateAPIView):
+    """POST a list of Games to a Match.
+    Takes the Match's version in an If-Match header.
+    """
+    queryset = Game.objects.all()
+    serializer_class = GameBulkSerializer
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs['many'] = True
+        return super().get_serializer(*args, **kwargs)
+
+    def perform_create(self, serializer):
+        match = get_object_or_404(Match, pk=self.kwargs['match_pk'])
+        player_pks = set(match.players.values_list('pk', flat=True))
+
+        games = []
+        for game_data in serializer.validated_data:
+            if not {game_data['winner'].pk, game_data['loser'].pk} <= player_pks:
+                raise serializers.ValidationError(
+                    'Winners and losers must be players in the match.')
+            games.append(Game(match=match, **game_data))
+
+        serializer.instance = GameService.bulk_create(
+            match, games, self.get_expected_version())
+        self.match_version = match.version
+
 
 # Score and Outcome
 
-class ScoreDetail(RetrieveAPIView):
+class ScoreDetail(CachedResponseMixin, CompactRepresentationMixin,
+                  RetrieveAPIView):
     """GET a Player's Score for a Match."""
-    queryset = Score.objects.all()
+    cache_match_kwargs = ['match_pk']
+    queryset = Score.objects.select_related('player')
     serializer_class = ScoreSerializer
+    compact_serializer_class = CompactScoreSerializer
 
     def get_object(self):
-        queryset = self.get_queryset()
+        queryset = self.filter_queryset(self.get_queryset())
         obj = get_object_or_404(queryset,
                                 player__username=self.kwargs['username'],
                                 match__pk=self.kwargs['match_pk'])
         self.check_object_permissions(self.request, obj)
         return obj
 
-class OutcomeDetail(RetrieveAPIView):
+class OutcomeDetail(CachedResponseMixin, CompactRepresentationMixin,
+                    RetrieveAPIView):
     """GET an Outcome instance for a Match."""
-    queryset = Outcome.objects.all()
+    cache_match_kwargs = ['match_pk']
+    queryset = Outcome.objects.select_related('player')
     serializer_class = OutcomeSerializer
+    compact_serializer_class = CompactOutcomeSerializer
 
     def get_object(self):
-        queryset = self.get_queryset()
+        queryset = self.filter_queryset(self.get_queryset())
         obj = get_object_or_404(queryset,
                                 player__username=self.kwargs['username'],
                                 match__pk=self.kwargs['match_pk'])
@@ -1,8 +1,66 @@
 from django.contrib import admin
+from django.db import transaction
 
-from base.models import Match, Game, Score, Outcome
+from base.models import (Match, Game, LedgerEntry, PlayerStats, Rivalry,
+                         Score, ScoreCheckpoint, Outcome)
+from base.services import GameService, bump_version, lock_matches
+
+class GameAdmin(admin.ModelAdmin):
+    """Admin for Games that writes them through GameService."""
+    readonly_fields = ['_points_cache']
+
+    def save_model(self, request, obj, form, change):
+        if change:
+            GameService.update(obj)
+        else:
+            GameService.create(obj)
+
+    def delete_model(self, request, obj):
+        GameService.delete(obj)
+
+    def delete_queryset(self, request, queryset):
+        for obj in queryset:
+            GameService.delete(obj)
+
+class MatchPlayerAdmin(admin.ModelAdmin):
+    """Admin for Scores and Outcomes that moves their Matches to a new
+    version, so the Matches' ETags change with them."""
+    @transaction.atomic
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.bump_versions([obj.match_id])
+
+    @transaction.atomic
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.bump_versions([obj.match_id])
+
+    @transaction.atomic
+    def delete_queryset(self, request, queryset):
+        match_pks = list(queryset.values_list('match_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self.bump_versions(match_pks)
+
+    def bump_versions(self, match_pks):
+        for match in lock_matches(set(match_pks) - {None}).values():
+            bump_version(match)
+
+class LedgerEntryAdmin(admin.ModelAdmin):
+    """Read-only admin for the append-only game ledger."""
+    list_display = ['pk', 'match', 'player', 'game_id', 'delta', 'reason',
+                    'datetime_recorded']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
 
 admin.site.register(Match)
-admin.site.register(Game)
-admin.site.register(Score)
-admin.site.register(Outcome)
\ No newline at end of file
+admin.site.register(Game, GameAdmin)
+admin.site.register(Score, MatchPlayerAdmin)
+admin.site.register(Outcome, MatchPlayerAdmin)
+admin.site.register(LedgerEntry, LedgerEntryAdmin)
+admin.site.register(ScoreCheckpoint)
+admin.site.register(PlayerStats)
+admin.site.register(Rivalry)
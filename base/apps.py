@@ -6,4 +6,5 @@ class BaseConfig(AppConfig):
     name = 'base'
 
     def ready(self):
+        import base.checks
         import base.signals
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""
+Scopes for the API response cache.
+
+Each Match and Player, and the list of all Players, has a generation number
+kept in the response cache. Cached responses are keyed by the generations of
+the scopes they read, so moving a scope to its next generation evicts every
+response in it. Writes move the scopes they change once their transaction
+commits. A write to a Match also moves its Players, whose lists of Matches
+include it.
+"""
+import time
+from typing import Dict, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.db import transaction
+
+from accounts.models import Player
+from base.models import Match
+
+KEY_PREFIX = 'api-cache'
+
+def response_cache() -> Optional[BaseCache]:
+    """Return the cache that API responses are kept in, or None if the
+    response cache is turned off."""
+    alias = getattr(settings, 'API_RESPONSE_CACHE', '')
+    return caches[alias] if alias else None
+
+def generation_key(scope: str, pk=None) -> str:
+    """Return the key of a scope's generation: 'match' or 'player' with a
+    pk, or 'players' for the list of all Players."""
+    if pk is None:
+        return f'{KEY_PREFIX}:generation:{scope}'
+    return f'{KEY_PREFIX}:generation:{scope}:{pk}'
+
+def get_generations(keys: Iterable[str]) -> Dict[str, int]:
+    """Return the current generation of each scope in `keys`."""
+    cache = response_cache()
+    keys = list(keys)
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            # Start from the clock, so a scope whose generation was evicted
+            # can't find responses from before the eviction
+            cache.add(key, time.time_ns(), timeout=None)
+            generations[key] = cache.get(key)
+    return generations
+
+def bump_generations(keys: Iterable[str]) -> None:
+    """Move scopes to their next generation."""
+    cache = response_cache()
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), timeout=None)
+
+def match_player_keys(match_pks: Iterable[int]) -> List[str]:
+    """Return the generation keys of the Players of Matches."""
+    player_pks = Match.players.through.objects.filter(
+        match_id__in=match_pks).values_list('player_id', flat=True).distinct()
+    return [generation_key('player', pk) for pk in player_pks]
+
+def invalidate(match_pks: Iterable[Optional[int]] = (),
+               player_pks: Iterable[Optional[int]] = ()) -> None:
+    """
+    Evict the cached responses of Matches and their Players, of Players, and
+    of lists of all Players if any Player is given, once the current
+    transaction commits.
+
+    A Match's Players are read once the write has committed, so it costs the
+    write no queries. The Players of a deleted Match are gone by then, and
+    are evicted by the PlayerStats changes of the delete.
+    """
+    if response_cache() is None:
+        return
+    match_pks = set(match_pks) - {None}
+    player_pks = set(player_pks) - {None}
+    keys = ([generation_key('match', pk) for pk in match_pks]
+            + [generation_key('player', pk) for pk in player_pks])
+    if player_pks:
+        keys.append(generation_key('players'))
+    if not keys:
+        return
+
+    def bump():
+        bump_generations(set(keys) | set(match_player_keys(match_pks)))
+    transaction.on_commit(bump)
+
+def username_key(username: str) -> str:
+    return f'{KEY_PREFIX}:username:{username}'
+
+def get_player_pks(usernames: Iterable[str]) -> Dict[str, int]:
+    """
+    Return {username: pk} for the Players with `usernames`, reading the
+    database only for usernames that aren't cached yet. Usernames without a
+    Player are left out.
+    """
+    cache = response_cache()
+    usernames = set(usernames)
+    cached = cache.get_many([username_key(username) for username in usernames])
+    player_pks = {username: cached[username_key(username)]
+                  for username in usernames if username_key(username) in cached}
+
+    missing = usernames - set(player_pks)
+    if missing:
+        found = dict(Player.objects.filter(username__in=missing).values_list(
+            'username', 'pk'))
+        cache.set_many({username_key(username): pk
+                        for username, pk in found.items()}, timeout=None)
+        player_pks.update(found)
+    return player_pks
+
+def forget_username(username: str) -> None:
+    """Drop a cached username, after its Player is created or deleted."""
+    cache = response_cache()
+    if cache is not None:
+        cache.delete(username_key(username))
+
+def stats_key(view_name: str, outcome: str) -> str:
+    return f'{KEY_PREFIX}:stats:{view_name}:{outcome}'
+
+def record(view_name: str, outcome: str) -> None:
+    """Count a cache 'hits' or 'misses' for a view."""
+    cache = response_cache()
+    key = stats_key(view_name, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+def get_stats(view_names: List[str]) -> Dict[str, Dict[str, int]]:
+    """Return {view name: {'hits': n, 'misses': n}} for each view."""
+    cache = response_cache()
+    keys = {(view_name, outcome): stats_key(view_name, outcome)
+            for view_name in view_names for outcome in ('hits', 'misses')}
+    counts = cache.get_many(list(keys.values()))
+    stats = {view_name: {} for view_name in view_names}
+    for (view_name, outcome), key in keys.items():
+        stats[view_name][outcome] = counts.get(key, 0)
+    return stats
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+
+# Backends whose entries only the process that wrote them can see, so one
+# worker's writes can't evict the responses cached by another
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+@register(Tags.caches)
+def check_response_cache(app_configs, **kwargs):
+    """Check that the API response cache, if turned on, is kept in a cache
+    that every worker shares."""
+    alias = getattr(settings, 'API_RESPONSE_CACHE', '')
+    if not alias:
+        return []
+    if alias not in settings.CACHES:
+        return [Error(
+            f"API_RESPONSE_CACHE is '{alias}', which isn't in CACHES.",
+            hint="Add the cache to CACHES, or set API_RESPONSE_CACHE to ''.",
+            id='base.E001',
+        )]
+    backend = settings.CACHES[alias]['BACKEND']
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Warning(
+            f"API_RESPONSE_CACHE is '{alias}', a {backend.rsplit('.', 1)[-1]} "
+            f"that isn't shared between processes, so writes handled by one "
+            f"worker leave stale responses cached by the others.",
+            hint="Use a shared backend such as Redis or Memcached, or set "
+                 "API_RESPONSE_CACHE to ''.",
+            id='base.W001',
+        )]
+    return []
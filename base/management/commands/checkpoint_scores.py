@@ -0,0 +1,50 @@
+"""
+Snapshot Scores from the game ledger, or rebuild them from their snapshots.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from base.models import Score
+from base.services import checkpoint_scores, rebuild_scores
+
+
+class Command(BaseCommand):
+    help = (
+        'Create a ScoreCheckpoint for every Score with LedgerEntry records '
+        'since its last checkpoint. With --rebuild, instead set each Score to '
+        'its last checkpoint plus the LedgerEntry records written after it.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rebuild',
+            action='store_true',
+            help='Rebuild Scores from their checkpoints and the ledger.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of Scores handled per transaction (default 500).',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        score_pks = list(Score.objects.order_by('pk').values_list(
+            'pk', flat=True))
+
+        total = 0
+        for i in range(0, len(score_pks), batch_size):
+            scores = Score.objects.filter(
+                pk__in=score_pks[i:i + batch_size]).order_by('pk')
+            if options['rebuild']:
+                total += rebuild_scores(scores)
+            else:
+                total += checkpoint_scores(scores)
+
+        if options['rebuild']:
+            self.stdout.write(f'Rebuilt {total} scores.')
+        else:
+            self.stdout.write(f'Created {total} checkpoints.')
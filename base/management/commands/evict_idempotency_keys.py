@@ -0,0 +1,17 @@
+"""
+Delete stored Idempotency-Key responses older than their TTL.
+"""
+from django.core.management.base import BaseCommand
+
+from base.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete IdempotencyKey records older than the IDEMPOTENCY_KEY_TTL '
+        'setting. Retries sent with those keys will be run as new requests.'
+    )
+
+    def handle(self, *args, **options):
+        deleted, _ = IdempotencyKey.objects.expired().delete()
+        self.stdout.write(f'Deleted {deleted} expired idempotency keys.')
@@ -0,0 +1,375 @@
+"""
+Import historical scoresheets: Games, with the Players and Matches they
+belong to, from CSV, JSON, or NDJSON files.
+"""
+import csv
+import io
+import json
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from accounts.models import Player, PlayerProfile
+from base.cache import invalidate
+from base.models import Game, LedgerEntry, Match, Outcome, Score
+from base.services import (ledger_enabled, rebuild_player_stats,
+                           rebuild_rivalries)
+
+FORMATS = ('csv', 'json', 'ndjson')
+TRUE_VALUES = {'1', 't', 'true', 'y', 'yes'}
+FALSE_VALUES = {'', '0', 'f', 'false', 'n', 'no'}
+DEFAULT_TARGET_SCORE = Match._meta.get_field('target_score').default
+
+
+class Command(BaseCommand):
+    help = (
+        'Import Games from scoresheet files, creating their Players, '
+        'Matches, Scores, and Outcomes. Each row is a Game with the columns '
+        'match (a name for the Match, shared by its Games within a file), '
+        'datetime_played, winner, loser, points, and optionally gin, '
+        'undercut, and target_score. The columns of the Game exports are '
+        'accepted as they are. A Match with the same Players and start '
+        '(its first datetime_played) as one already in the database is '
+        'skipped, so re-running an import doesn\'t duplicate its Matches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', type=Path,
+                            help='CSV, JSON, or NDJSON files to import.')
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Format of the files (default: from their extensions).',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of rows written per INSERT or COPY (default 5000).',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Check the files and report what would be imported.',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        matches = []
+        for path in options['paths']:
+            file_format = options['format'] or path.suffix.lstrip('.').lower()
+            if file_format not in FORMATS:
+                raise CommandError(
+                    f'{path}: give --format for files not ending in '
+                    f"{', '.join('.' + name for name in FORMATS)}.")
+            try:
+                with path.open(newline='', encoding='utf-8') as file:
+                    matches += build_matches(path, read_rows(file, file_format))
+            except (OSError, ValueError) as exc:
+                raise CommandError(exc)
+
+        matches, skipped = skip_imported_matches(matches, batch_size)
+        if skipped:
+            self.stdout.write(f'Skipped {skipped} matches that were already '
+                              'imported.')
+
+        game_count = sum(len(match['games']) for match in matches)
+        if options['dry_run']:
+            self.stdout.write(f'Would import {game_count} games in '
+                              f'{len(matches)} matches.')
+            return
+
+        connection = connections[router.db_for_write(Match)]
+        if not connection.features.can_return_rows_from_bulk_insert:
+            raise CommandError(
+                "The database can't return the ids of bulk inserted "
+                'Matches.')
+
+        with transaction.atomic(using=connection.alias):
+            player_pks, created = get_or_create_players(
+                {username for match in matches for username in match['players']},
+                batch_size)
+            import_matches(matches, player_pks, batch_size)
+
+            player_pks = sorted(player_pks.values())
+            for i in range(0, len(player_pks), batch_size):
+                rebuild_player_stats(player_pks[i:i + batch_size])
+                rebuild_rivalries(player_pks[i:i + batch_size])
+            # The Players' lists of Matches and Games have grown
+            invalidate(player_pks=player_pks)
+
+        self.stdout.write(f'Created {created} players.')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {game_count} games in {len(matches)} matches.'))
+
+
+def read_rows(file, file_format: str) -> Iterator[Tuple[int, dict]]:
+    """Yield (line or item number, row) for each row of a scoresheet file."""
+    if file_format == 'csv':
+        reader = csv.DictReader(file)
+        for row in reader:
+            yield reader.line_num, row
+    elif file_format == 'ndjson':
+        for line_num, line in enumerate(file, 1):
+            if line.strip():
+                try:
+                    yield line_num, json.loads(line)
+                except ValueError as exc:
+                    raise ValueError(f'{file.name}:{line_num}: {exc}')
+    else:
+        rows = json.load(file)
+        if not isinstance(rows, list):
+            raise ValueError('A JSON scoresheet must be a list of Games.')
+        yield from enumerate(rows, 1)
+
+def parse_bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    value = '' if value is None else str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f'{value!r} is not true or false')
+
+def parse_game(row: dict) -> dict:
+    """Return the Game in a row, raising ValueError if it's invalid."""
+    for column in ('match', 'datetime_played', 'winner', 'loser', 'points'):
+        if row.get(column) in (None, ''):
+            raise ValueError(f'{column} is missing')
+
+    datetime_played = parse_datetime(str(row['datetime_played']))
+    if datetime_played is None:
+        raise ValueError(f"{row['datetime_played']!r} is not a datetime")
+    if timezone.is_naive(datetime_played):
+        datetime_played = timezone.make_aware(datetime_played)
+
+    game = {
+        'match': str(row['match']),
+        'datetime_played': datetime_played,
+        'winner': str(row['winner']),
+        'loser': str(row['loser']),
+        'points': int(row['points']),
+        'gin': parse_bool(row.get('gin')),
+        'undercut': parse_bool(row.get('undercut')),
+        'target_score': int(row.get('target_score') or DEFAULT_TARGET_SCORE),
+    }
+    if game['points'] <= 0:
+        raise ValueError('points must be greater than 0')
+    if game['target_score'] <= 0:
+        raise ValueError('target_score must be greater than 0')
+    if game['winner'] == game['loser']:
+        raise ValueError('winner and loser are the same Player')
+    for column in ('winner', 'loser'):
+        try:
+            Player.username_validator(game[column])
+        except ValidationError as exc:
+            raise ValueError(f'{column}: {exc.messages[0]}')
+    return game
+
+def build_matches(path: Path, rows: Iterable[Tuple[int, dict]]) -> List[dict]:
+    """
+    Group a file's Games into Matches, and work out each Match's Scores,
+    completion, and Outcomes the way GameService would have as the Games
+    were entered, in order of `datetime_played`.
+    """
+    matches = {}
+    for line_num, row in rows:
+        try:
+            game = parse_game(row)
+            match = matches.setdefault(game['match'], {
+                'target_score': game['target_score'],
+                'players': {},
+                'games': [],
+            })
+            if game['target_score'] != match['target_score']:
+                raise ValueError(f"match {game['match']} has more than one "
+                                 'target_score')
+        except (AttributeError, TypeError, ValueError) as exc:
+            raise ValueError(f'{path}:{line_num}: {exc}')
+        # Players in the order they appear
+        match['players'].setdefault(game['winner'])
+        match['players'].setdefault(game['loser'])
+        match['games'].append(game)
+
+    for match in matches.values():
+        match['games'].sort(key=lambda game: game['datetime_played'])
+        match['datetime_started'] = match['games'][0]['datetime_played']
+        match['datetime_ended'] = None
+        match['outcomes'] = {}
+
+        scores = Counter({username: 0 for username in match['players']})
+        for game in match['games']:
+            scores[game['winner']] += game['points']
+            if (match['datetime_ended'] is None
+                    and scores[game['winner']] >= match['target_score']):
+                match['datetime_ended'] = game['datetime_played']
+                match['outcomes'] = {
+                    username: (Outcome.WIN if username == game['winner']
+                               else Outcome.LOSS)
+                    for username in match['players']
+                }
+        match['scores'] = scores
+    return list(matches.values())
+
+def skip_imported_matches(matches: List[dict],
+                          batch_size: int) -> Tuple[List[dict], int]:
+    """
+    Leave out Matches with the same Players and `datetime_started` as a Match
+    already in the database or earlier in `matches`. Return the Matches left
+    and the number left out.
+    """
+    imported = set()
+    starts = sorted({match['datetime_started'] for match in matches})
+    for i in range(0, len(starts), batch_size):
+        match_players = defaultdict(set)
+        match_starts = {}
+        for match_pk, datetime_started, username in (
+                Match.players.through.objects.filter(
+                    match__datetime_started__in=starts[i:i + batch_size])
+                .values_list('match_id', 'match__datetime_started',
+                             'player__username')):
+            match_players[match_pk].add(username)
+            match_starts[match_pk] = datetime_started
+        imported.update((match_starts[match_pk], frozenset(usernames))
+                        for match_pk, usernames in match_players.items())
+
+    kept = []
+    for match in matches:
+        key = (match['datetime_started'], frozenset(match['players']))
+        if key not in imported:
+            imported.add(key)
+            kept.append(match)
+    return kept, len(matches) - len(kept)
+
+def get_or_create_players(usernames: Iterable[str],
+                          batch_size: int) -> Tuple[Dict[str, int], int]:
+    """
+    Return {username: pk} for `usernames`, creating the Players that don't
+    exist yet (with unusable passwords) and their PlayerProfiles. Also return
+    the number of Players created.
+    """
+    usernames = set(usernames)
+    player_pks = dict(Player.objects.filter(username__in=usernames).values_list(
+        'username', 'pk'))
+    missing = usernames - set(player_pks)
+    if missing:
+        Player.objects.bulk_create(
+            [Player(username=username, password=make_password(None))
+             for username in sorted(missing)],
+            batch_size=batch_size,
+        )
+        created = dict(Player.objects.filter(username__in=missing).values_list(
+            'username', 'pk'))
+        PlayerProfile.objects.bulk_create(
+            [PlayerProfile(player_id=pk) for pk in created.values()],
+            batch_size=batch_size,
+        )
+        player_pks.update(created)
+    return player_pks, len(missing)
+
+def import_matches(matches: List[dict], player_pks: Dict[str, int],
+                   batch_size: int) -> None:
+    """Write Matches with their Players, Scores, Outcomes, and Games."""
+    match_objs = Match.objects.bulk_create(
+        [Match(target_score=match['target_score'],
+               datetime_started=match['datetime_started'],
+               datetime_ended=match['datetime_ended'],
+               complete=match['datetime_ended'] is not None)
+         for match in matches],
+        batch_size=batch_size,
+    )
+    for match, match_obj in zip(matches, match_objs):
+        match['pk'] = match_obj.pk
+
+    copy_rows(Match.players.through, ['match', 'player'], (
+        (match['pk'], player_pks[username])
+        for match in matches for username in match['players']
+    ), batch_size)
+    copy_rows(Score, ['match', 'player', 'player_score'], (
+        (match['pk'], player_pks[username], player_score)
+        for match in matches for username, player_score in match['scores'].items()
+    ), batch_size)
+    copy_rows(Outcome, ['match', 'player', 'player_outcome'], (
+        (match['pk'], player_pks[username], player_outcome)
+        for match in matches
+        for username, player_outcome in match['outcomes'].items()
+    ), batch_size)
+
+    fields = ['match', 'winner', 'loser', 'points', '_points_cache', 'gin',
+              'undercut', 'datetime_played']
+    games = (
+        (match['pk'], player_pks[game['winner']], player_pks[game['loser']],
+         game['points'], game['points'], game['gin'], game['undercut'],
+         game['datetime_played'])
+        for match in matches for game in match['games']
+    )
+    if not ledger_enabled():
+        copy_rows(Game, fields, games, batch_size)
+        return
+
+    # LedgerEntry records point at their Games, so the Games' ids are needed
+    for batch in batches(games, batch_size):
+        game_objs = Game.objects.bulk_create(
+            [Game(**row_kwargs(Game, fields, row)) for row in batch])
+        LedgerEntry.objects.bulk_create([
+            LedgerEntry(match_id=game.match_id, player_id=game.winner_id,
+                        game=game, delta=game.points,
+                        reason=LedgerEntry.CREATE)
+            for game in game_objs
+        ])
+
+def batches(rows: Iterable[tuple], batch_size: int) -> Iterator[List[tuple]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def row_kwargs(model, fields: List[str], row: tuple) -> dict:
+    return {model._meta.get_field(field).attname: value
+            for field, value in zip(fields, row)}
+
+def copy_rows(model, fields: List[str], rows: Iterable[tuple],
+              batch_size: int) -> None:
+    """
+    Insert rows of values for `fields` into `model`'s table, `batch_size`
+    rows at a time: with COPY on Postgres, and bulk_create elsewhere. No
+    signals are sent and no ids are returned.
+    """
+    connection = connections[router.db_for_write(model)]
+    if connection.vendor != 'postgresql':
+        for batch in batches(rows, batch_size):
+            model._base_manager.using(connection.alias).bulk_create(
+                [model(**row_kwargs(model, fields, row)) for row in batch])
+        return
+
+    quote_name = connection.ops.quote_name
+    columns = ', '.join(quote_name(model._meta.get_field(field).column)
+                        for field in fields)
+    sql = (f'COPY {quote_name(model._meta.db_table)} ({columns}) '
+           'FROM STDIN WITH (FORMAT csv)')
+    with connection.cursor() as cursor:
+        for batch in batches(rows, batch_size):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            # None is written as an empty, unquoted field: NULL in COPY's CSV
+            writer.writerows(
+                [value.isoformat() if hasattr(value, 'isoformat') else value
+                 for value in row]
+                for row in batch)
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
@@ -0,0 +1,41 @@
+"""
+Rebuild every Player's PlayerStats and Rivalries from their Matches,
+Outcomes, and Games.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.models import Player
+from base.services import rebuild_player_stats, rebuild_rivalries
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute every Player's PlayerStats and Rivalries from their "
+        'Matches, Outcomes, and Games, creating any that are missing. Run '
+        'after migrating to backfill them, or to repair them.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of Players rebuilt per transaction (default 500).',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        player_pks = list(Player.objects.order_by('pk').values_list(
+            'pk', flat=True))
+
+        total = rivalries = 0
+        for i in range(0, len(player_pks), batch_size):
+            batch = player_pks[i:i + batch_size]
+            total += rebuild_player_stats(batch)
+            rivalries += rebuild_rivalries(batch)
+
+        self.stdout.write(f'Rebuilt stats for {total} players.')
+        self.stdout.write(f'Rebuilt {rivalries} rivalries.')
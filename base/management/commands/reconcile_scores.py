@@ -0,0 +1,283 @@
+"""
+Recompute Scores, Match completion, and Outcomes from Games.
+"""
+import datetime
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.db.models import Max, Min, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from base.cache import invalidate
+from base.models import Game, LedgerEntry, Match, Outcome, Score
+from base.services import (game_points, ledger_enabled, rebuild_player_stats,
+                           rebuild_rivalries)
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute every Score from the points of its Games, and each '
+        "Match's completion and Outcomes from its target_score. Report the "
+        'drift found, and repair it with --repair.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repair',
+            action='store_true',
+            help='Write the recomputed values over any drift found.',
+        )
+        parser.add_argument(
+            '--since',
+            type=parse_since,
+            help=('Only check Matches started, ended, or with Games played '
+                  'on or after this date or datetime (ISO 8601).'),
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of Match ids checked per batch (default 500).',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Number of processes to spread the batches across.',
+        )
+
+    def handle(self, *args, **options):
+        repair = options['repair']
+        since = options['since']
+        batch_size = options['batch_size']
+        workers = options['workers']
+        verbose = options['verbosity'] >= 2
+
+        if batch_size < 1 or workers < 1:
+            raise CommandError('--batch-size and --workers must be at least 1.')
+
+        bounds = select_matches(since).aggregate(Min('pk'), Max('pk'))
+        if bounds['pk__min'] is None:
+            self.stdout.write('No matches to check.')
+            return
+
+        batches = [
+            (start_pk, min(start_pk + batch_size - 1, bounds['pk__max']),
+             since, repair, verbose)
+            for start_pk in range(bounds['pk__min'], bounds['pk__max'] + 1,
+                                  batch_size)
+        ]
+
+        if workers > 1:
+            # Each process opens its own database connection
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(reconcile_batch, *zip(*batches)))
+        else:
+            results = [reconcile_batch(*batch) for batch in batches]
+
+        totals = Counter()
+        for counts, details in results:
+            totals.update(counts)
+            for detail in details:
+                self.stdout.write(detail)
+
+        self.stdout.write(f"Checked {totals['matches']} matches.")
+        self.stdout.write(f"Scores with drift: {totals['scores']}")
+        self.stdout.write(f"Matches with drift: {totals['match_states']}")
+        self.stdout.write(f"Outcomes with drift: {totals['outcomes']}")
+
+        drift = totals['scores'] + totals['match_states'] + totals['outcomes']
+        if drift and repair:
+            self.stdout.write(self.style.SUCCESS('Repaired drift.'))
+        elif drift:
+            self.stdout.write(self.style.WARNING(
+                'Run with --repair to fix drift.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No drift found.'))
+
+
+def parse_since(value: str) -> datetime.datetime:
+    """Parse the --since argument as an aware datetime."""
+    since = parse_datetime(value)
+    if since is None:
+        date = parse_date(value)
+        if date is None:
+            raise ValueError(f'{value} is not a date or datetime.')
+        since = datetime.datetime.combine(date, datetime.time())
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+def select_matches(since: Optional[datetime.datetime] = None):
+    """Return the Matches to check."""
+    matches = Match.objects.all()
+    if since:
+        active = Match.objects.filter(
+            Q(datetime_started__gte=since)
+            | Q(datetime_ended__gte=since)
+            | Q(games__datetime_played__gte=since)
+        )
+        matches = matches.filter(pk__in=active.values('pk'))
+    return matches
+
+def reconcile_batch(start_pk: int, end_pk: int,
+                    since: Optional[datetime.datetime] = None,
+                    repair: bool = False,
+                    verbose: bool = False) -> Tuple[Counter, List[str]]:
+    """
+    Check the Matches with ids from `start_pk` to `end_pk` (inclusive) in one
+    transaction, repairing any drift if `repair` is True. Return counts of
+    the Matches checked and of drifted Scores, Match states, and Outcomes,
+    and a description of each drift if `verbose` is True.
+    """
+    counts = Counter()
+    details = []
+
+    with transaction.atomic():
+        matches = select_matches(since).filter(
+            pk__range=(start_pk, end_pk)).order_by('pk')
+        if repair:
+            matches = matches.select_for_update()
+        matches = {match.pk: match for match in matches}
+        counts['matches'] = len(matches)
+        if not matches:
+            return counts, details
+
+        in_batch = Q(match__in=list(matches))
+
+        # Scores
+        expected_scores = defaultdict(list)
+        drifted_scores = []
+        ledger_entries = []
+        scores = Score.objects.filter(in_batch).annotate(
+            expected_score=game_points())
+        for score in scores:
+            if score.player_id is not None:
+                expected_scores[score.match_id].append(
+                    (score.expected_score, score.player_id))
+            if score.player_score != score.expected_score:
+                if verbose:
+                    details.append(
+                        f'Score {score.pk} (match {score.match_id}): '
+                        f'{score.player_score} != {score.expected_score}')
+                ledger_entries.append(LedgerEntry(
+                    match_id=score.match_id,
+                    player_id=score.player_id,
+                    delta=score.expected_score - score.player_score,
+                    reason=LedgerEntry.REPAIR,
+                ))
+                score.player_score = score.expected_score
+                drifted_scores.append(score)
+        counts['scores'] = len(drifted_scores)
+
+        # Match completion and Outcomes
+        outcomes = defaultdict(dict)
+        for match_id, player_id, player_outcome in Outcome.objects.filter(
+                in_batch).values_list('match_id', 'player_id',
+                                      'player_outcome'):
+            outcomes[match_id][player_id] = player_outcome
+
+        drifted_matches = []
+        drifted_outcomes = {}
+        for match_pk, match in matches.items():
+            expected = expected_outcomes(match, expected_scores[match_pk],
+                                         outcomes[match_pk])
+            if outcomes[match_pk] != expected:
+                if verbose:
+                    details.append(f'Outcomes (match {match_pk}): '
+                                   f'{outcomes[match_pk]} != {expected}')
+                drifted_outcomes[match_pk] = expected
+
+            complete = bool(expected)
+            if (match.complete != complete
+                    or (match.datetime_ended is None) == complete):
+                if verbose:
+                    details.append(f'Match {match_pk}: complete is '
+                                   f'{match.complete}, expected {complete}')
+                match.complete = complete
+                if not complete:
+                    match.datetime_ended = None
+                drifted_matches.append(match)
+
+        counts['match_states'] = len(drifted_matches)
+        counts['outcomes'] = len(drifted_outcomes)
+
+        if repair:
+            repair_batch(drifted_scores, drifted_matches, drifted_outcomes)
+            if ledger_enabled():
+                LedgerEntry.objects.bulk_create(ledger_entries)
+
+    return counts, details
+
+def expected_outcomes(match: Match, scores: List[Tuple[int, int]],
+                      outcomes: Dict[int, int]) -> Dict[int, int]:
+    """
+    Return the Outcomes a Match should have, as {player_id: player_outcome},
+    given its recomputed `scores` as (player_score, player_id) pairs.
+
+    If more than one Player is at or above the target score, existing
+    Outcomes that name one of them as the winner are kept, since that Player
+    crossed the target first.
+    """
+    scores = sorted(scores, reverse=True)
+    if len(scores) < 2 or scores[0][0] < match.target_score:
+        return {}
+
+    finishers = {player_id for player_score, player_id in scores
+                 if player_score >= match.target_score}
+    winners = [player_id for player_id, player_outcome in outcomes.items()
+               if player_outcome == Outcome.WIN]
+    if len(winners) == 1 and winners[0] in finishers:
+        winner_id = winners[0]
+    else:
+        winner_id = scores[0][1]
+
+    return {
+        player_id: Outcome.WIN if player_id == winner_id else Outcome.LOSS
+        for player_score, player_id in scores
+    }
+
+def repair_batch(scores: List[Score], matches: List[Match],
+                 outcomes: Dict[int, Dict[int, int]]) -> None:
+    """Write the recomputed Scores, Match states, and Outcomes."""
+    Score.objects.bulk_update(scores, ['player_score'], batch_size=500)
+
+    # Matches that have just been completed end with their last Game
+    ended = [match.pk for match in matches
+             if match.complete and match.datetime_ended is None]
+    last_played = dict(
+        Game.objects.filter(match__in=ended).values('match').annotate(
+            last_played=Max('datetime_played')).values_list(
+                'match', 'last_played')
+    )
+    for match in matches:
+        if match.complete and match.datetime_ended is None:
+            match.datetime_ended = last_played.get(match.pk, timezone.now())
+    Match.objects.bulk_update(matches, ['complete', 'datetime_ended'],
+                              batch_size=500)
+
+    Outcome.objects.filter(match__in=list(outcomes)).delete()
+    Outcome.objects.bulk_create([
+        Outcome(match_id=match_pk, player_id=player_id,
+                player_outcome=player_outcome)
+        for match_pk, match_outcomes in outcomes.items()
+        for player_id, player_outcome in match_outcomes.items()
+    ])
+
+    # Outcome repairs change Players' Match wins and losses
+    player_pks = list(Match.players.through.objects.filter(
+        match_id__in=list(outcomes)).values_list('player_id', flat=True))
+    rebuild_player_stats(player_pks)
+    rebuild_rivalries(player_pks)
+
+    # Repaired Matches are at a new version
+    repaired = ({score.match_id for score in scores}
+                | {match.pk for match in matches} | set(outcomes))
+    if repaired:
+        Match.objects.filter(pk__in=repaired).bump_version()
+        invalidate(match_pks=repaired)
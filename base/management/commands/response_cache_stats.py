@@ -0,0 +1,31 @@
+"""
+Report the API response cache's hits and misses per view.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from api import views
+from base.cache import get_stats, response_cache
+
+
+class Command(BaseCommand):
+    help = (
+        'Print the number of API response cache hits and misses, and the hit '
+        'rate, of each cached view.'
+    )
+
+    def handle(self, *args, **options):
+        if response_cache() is None:
+            raise CommandError('The API response cache is turned off.')
+
+        view_names = sorted(
+            name for name, view in vars(views).items()
+            if isinstance(view, type)
+            and issubclass(view, views.CachedResponseMixin)
+            and view is not views.CachedResponseMixin
+        )
+        for view_name, counts in get_stats(view_names).items():
+            requests = counts['hits'] + counts['misses']
+            hit_rate = counts['hits'] / requests if requests else 0
+            self.stdout.write(
+                f"{view_name}: {counts['hits']} hits, {counts['misses']} "
+                f'misses, {hit_rate:.1%} hit rate')
@@ -0,0 +1,17 @@
+# Generated by Django 4.0.7 on 2026-10-18 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0008_game__points_cache'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='outcome',
+            constraint=models.UniqueConstraint(condition=models.Q(('player_outcome', 1)), fields=('match',), name='unique_match_winner'),
+        ),
+    ]
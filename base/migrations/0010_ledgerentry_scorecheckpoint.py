@@ -0,0 +1,45 @@
+# Generated by Django 4.0.7 on 2026-10-18 12:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('base', '0009_outcome_unique_match_winner'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LedgerEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('reason', models.CharField(choices=[('create', 'Game created'), ('edit', 'Game edited'), ('delete', 'Game deleted'), ('repair', 'Score repaired')], max_length=6)),
+                ('datetime_recorded', models.DateTimeField(auto_now_add=True)),
+                ('game', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='base.game')),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ledger_entries', to='base.match')),
+                ('player', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ledger_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'ledger entries',
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ScoreCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('player_score', models.IntegerField()),
+                ('datetime_created', models.DateTimeField(auto_now_add=True)),
+                ('last_entry', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='base.ledgerentry')),
+                ('score', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='checkpoints', to='base.score')),
+            ],
+            options={
+                'ordering': ['pk'],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.0.7 on 2026-10-18 13:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.db.models.expressions
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('base', '0013_playerstats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Rivalry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('matches_played', models.IntegerField(default=0)),
+                ('a_matches_won', models.IntegerField(default=0)),
+                ('b_matches_won', models.IntegerField(default=0)),
+                ('games_played', models.IntegerField(default=0)),
+                ('a_games_won', models.IntegerField(default=0)),
+                ('b_games_won', models.IntegerField(default=0)),
+                ('a_points', models.IntegerField(default=0)),
+                ('b_points', models.IntegerField(default=0)),
+                ('a_gin_count', models.IntegerField(default=0)),
+                ('b_gin_count', models.IntegerField(default=0)),
+                ('a_undercut_count', models.IntegerField(default=0)),
+                ('b_undercut_count', models.IntegerField(default=0)),
+                ('last_played', models.DateTimeField(blank=True, null=True)),
+                ('player_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rivalries_as_a', to=settings.AUTH_USER_MODEL)),
+                ('player_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rivalries_as_b', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'rivalries',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='rivalry',
+            index=models.Index(fields=['player_a', '-games_played'], name='rivalry_a_games_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rivalry',
+            index=models.Index(fields=['player_b', '-games_played'], name='rivalry_b_games_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='rivalry',
+            constraint=models.UniqueConstraint(fields=('player_a', 'player_b'), name='unique_rivalry_pair'),
+        ),
+        migrations.AddConstraint(
+            model_name='rivalry',
+            constraint=models.CheckConstraint(check=models.Q(('player_a__lt', django.db.models.expressions.F('player_b'))), name='rivalry_player_a_lt_player_b'),
+        ),
+    ]
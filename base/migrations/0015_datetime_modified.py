@@ -0,0 +1,23 @@
+# Generated by Django 4.0.7 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0014_rivalry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='match',
+            name='datetime_modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='playerstats',
+            name='datetime_modified',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
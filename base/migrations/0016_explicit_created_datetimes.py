@@ -0,0 +1,24 @@
+# Generated by Django 4.0.7 on 2026-10-18 13:27
+
+import base.models.match
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0015_datetime_modified'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='game',
+            name='datetime_played',
+            field=models.DateTimeField(default=base.models.match.created_now),
+        ),
+        migrations.AlterField(
+            model_name='match',
+            name='datetime_started',
+            field=models.DateTimeField(default=base.models.match.created_now),
+        ),
+    ]
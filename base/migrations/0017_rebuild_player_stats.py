@@ -0,0 +1,36 @@
+from django.db import migrations
+
+from base.services import build_player_stats, build_rivalries
+
+# Players rebuilt per batch, which keeps each query's parameters under
+# SQLite's limit
+BATCH_SIZE = 500
+
+
+def rebuild_player_stats(apps, schema_editor):
+    """Fill in the PlayerStats and Rivalries of existing Players, which were
+    created empty."""
+    Player = apps.get_model('accounts', 'Player')
+    PlayerStats = apps.get_model('base', 'PlayerStats')
+    Rivalry = apps.get_model('base', 'Rivalry')
+    player_pks = list(Player.objects.order_by('pk').values_list('pk', flat=True))
+    for i in range(0, len(player_pks), BATCH_SIZE):
+        batch = player_pks[i:i + BATCH_SIZE]
+        stats = build_player_stats(batch, apps)
+        PlayerStats.objects.filter(player_id__in=batch).delete()
+        PlayerStats.objects.bulk_create(stats.values())
+        rivalries = build_rivalries(batch, apps)
+        Rivalry.objects.filter(player_a_id__in=batch).delete()
+        Rivalry.objects.bulk_create(rivalries.values())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_datetime_modified'),
+        ('base', '0016_explicit_created_datetimes'),
+    ]
+
+    operations = [
+        migrations.RunPython(rebuild_player_stats, migrations.RunPython.noop),
+    ]
@@ -3,4 +3,12 @@ from .match import MatchPlayer
 from .match import Outcome
 from .match import Score
 
-from .game import Game
\ No newline at end of file
+from .game import Game
+
+from .ledger import LedgerEntry
+from .ledger import ScoreCheckpoint
+
+from .idempotency import IdempotencyKey
+
+from .stats import PlayerStats
+from .stats import Rivalry
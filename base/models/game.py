@@ -1,6 +1,6 @@
 from django.db import models
 
-from .match import Match
+from .match import Match, created_now
 from accounts.models import Player
 from base.validators import validate_gt_zero
 
@@ -31,7 +31,7 @@ class Game(models.Model):
     gin = models.BooleanField(default=False)
     undercut = models.BooleanField(default=False)
 
-    datetime_played = models.DateTimeField(auto_now_add=True)
+    datetime_played = models.DateTimeField(default=created_now)
 
     class Meta:
         ordering = ['-datetime_played']
@@ -0,0 +1,44 @@
+import datetime
+
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+
+class IdempotencyKeyQuerySet(models.QuerySet):
+    def expired(self):
+        """Return the keys older than the `IDEMPOTENCY_KEY_TTL` setting."""
+        return self.filter(datetime_created__lt=expiry_cutoff())
+
+class IdempotencyKey(models.Model):
+    """
+    The stored response to a POST sent with an Idempotency-Key header, so a
+    retry of the same request returns the original response instead of
+    writing again.
+
+    `key` is a SHA-256 digest of the requesting Player, the request path, and
+    the header value, and `request_hash` is a digest of the request body, so
+    each row is a fixed, small size.
+    """
+    key = models.CharField(max_length=64, primary_key=True)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response = models.JSONField(null=True)
+    headers = models.JSONField(default=dict)
+
+    datetime_created = models.DateTimeField(default=timezone.now,
+                                            db_index=True)
+
+    objects = IdempotencyKeyQuerySet.as_manager()
+
+    def __str__(self):
+        return f'{self.key[:12]} ({self.status_code})'
+
+    @property
+    def is_expired(self) -> bool:
+        return self.datetime_created < expiry_cutoff()
+
+def expiry_cutoff() -> datetime.datetime:
+    """Return the creation time before which IdempotencyKeys have expired."""
+    return timezone.now() - datetime.timedelta(
+        seconds=settings.IDEMPOTENCY_KEY_TTL)
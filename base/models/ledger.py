@@ -0,0 +1,85 @@
+from django.db import models
+
+from .game import Game
+from .match import Match, Score
+from accounts.models import Player
+
+class LedgerEntry(models.Model):
+    """
+    An append-only record of a change to a Player's Score for a Match,
+    written when the `GAME_LEDGER` setting is on.
+    """
+    CREATE = 'create'
+    EDIT = 'edit'
+    DELETE = 'delete'
+    REPAIR = 'repair'
+    REASON_CHOICES = (
+        (CREATE, 'Game created'),
+        (EDIT, 'Game edited'),
+        (DELETE, 'Game deleted'),
+        (REPAIR, 'Score repaired'),
+    )
+
+    match = models.ForeignKey(
+        Match,
+        on_delete=models.CASCADE,
+        related_name='ledger_entries',
+    )
+    player = models.ForeignKey(
+        Player,
+        null=True,
+        on_delete=models.SET_NULL,
+        related_name='ledger_entries',
+    )
+    # Keeps the id of Games that have since been deleted
+    game = models.ForeignKey(
+        Game,
+        null=True,
+        blank=True,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=6, choices=REASON_CHOICES)
+
+    datetime_recorded = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['pk']
+        verbose_name_plural = 'ledger entries'
+
+    def __str__(self):
+        return f'{self.reason} {self.delta:+} (Match {self.match_id}) ({self.pk})'
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Ledger entries cannot be changed.')
+        super().save(*args, **kwargs)
+
+class ScoreCheckpoint(models.Model):
+    """
+    A snapshot of a Score as of a LedgerEntry. The Score can be rebuilt from
+    its last checkpoint plus the LedgerEntry records written after it.
+    """
+    score = models.ForeignKey(
+        Score,
+        on_delete=models.CASCADE,
+        related_name='checkpoints',
+    )
+    player_score = models.IntegerField()
+    # The last LedgerEntry included in `player_score` (None: before any)
+    last_entry = models.ForeignKey(
+        LedgerEntry,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='+',
+    )
+
+    datetime_created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['pk']
+
+    def __str__(self):
+        return f'{self.score} @ {self.last_entry_id} ({self.pk})'
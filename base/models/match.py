@@ -1,9 +1,104 @@
-from django.db import models
+from typing import Dict, Optional
+
+from django.db import connections, models, router, transaction
+from django.dispatch import Signal
 from django.urls import reverse
+from django.utils import timezone
 
 from accounts.models import Player
 from base.validators import validate_gt_zero
 
+def created_now():
+    """Default for the datetime a record was created at, which imports of
+    past records give explicitly."""
+    return timezone.now()
+
+# Sent with a queryset of Matches (`matches`) about to be deleted, while
+# their Players, Outcomes, and Games can still be read
+pre_delete_matches = Signal()
+
+def delete_match_games(matches: models.QuerySet) -> Dict[str, int]:
+    """
+    Delete the Games of a queryset of Matches with a single DELETE statement.
+    Return the number of Games deleted, keyed by model label (in the format
+    of `QuerySet.delete()`'s counts).
+
+    The Games' delete signals aren't sent: the Matches are being deleted, so
+    their Scores and Outcomes don't need to be updated game by game. Instead
+    `pre_delete_matches` is sent once for all of the Matches.
+    """
+    pre_delete_matches.send(sender=matches.model, matches=matches)
+    Game = matches.model._meta.get_field('games').related_model
+    games = Game._base_manager.using(matches.db).filter(
+        match__in=matches.values('pk'))
+    game_count = games._raw_delete(games.db)
+    return {Game._meta.label: game_count} if game_count else {}
+
+class MatchQuerySet(models.QuerySet):
+    """
+    QuerySet for Match objects.
+    """
+    def delete(self):
+        """Delete Matches and everything that cascades from them, deleting
+        their Games in one statement rather than one Game at a time.
+        """
+        with transaction.atomic(using=self.db):
+            # Read the pks first: a filter on the Matches' Games would match
+            # nothing once the Games are deleted
+            matches = self.model._base_manager.using(self.db).filter(
+                pk__in=list(self.values_list('pk', flat=True)))
+            game_counts = delete_match_games(matches)
+            deleted, rows_count = models.QuerySet.delete(matches)
+        rows_count.update(game_counts)
+        return deleted + sum(game_counts.values()), rows_count
+
+    def bump_version(self) -> int:
+        """Move Matches to a new version, marking them as modified now.
+        Return the number of Matches updated.
+        """
+        return self.update(version=models.F('version') + 1,
+                           datetime_modified=timezone.now())
+
+    def lock_and_bump_version(self, match_id: int) -> Optional['Match']:
+        """Move a Match to a new version, locking its row for the rest of the
+        transaction, as a single UPDATE that returns the fields Game writes
+        read (the others are deferred). Return the Match at its new version,
+        or None if there is no such Match.
+        """
+        connection = connections[self.db]
+
+        # Backends that can return columns from an INSERT also support
+        # UPDATE ... RETURNING (Postgres, SQLite >= 3.35).
+        if not connection.features.can_return_columns_from_insert:
+            match = self.select_for_update().filter(pk=match_id).first()
+            if match is None:
+                return None
+            self.filter(pk=match_id).bump_version()
+            match.version += 1
+            return match
+
+        # In model order, which `from_db` expects
+        fields = [field for field in self.model._meta.concrete_fields
+                  if field.name in ('id', 'target_score', 'complete', 'version')]
+        quote_name = connection.ops.quote_name
+        sql = (
+            f'UPDATE {quote_name(self.model._meta.db_table)} '
+            f'SET {quote_name("version")} = {quote_name("version")} + 1, '
+            f'{quote_name("datetime_modified")} = %s '
+            f'WHERE {quote_name("id")} = %s '
+            f'RETURNING {", ".join(quote_name(field.column) for field in fields)}'
+        )
+        datetime_modified = connection.ops.adapt_datetimefield_value(
+            timezone.now())
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [datetime_modified, match_id])
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return self.model.from_db(
+            self.db, [field.attname for field in fields],
+            [field.to_python(value) for field, value in zip(fields, row)])
+
 class Match(models.Model):
     """
     A Match consists of multiple Game objects. 
@@ -11,8 +106,9 @@ class Match(models.Model):
     """
     players = models.ManyToManyField(Player, related_name='match_set')
 
-    datetime_started = models.DateTimeField(auto_now_add=True)
+    datetime_started = models.DateTimeField(default=created_now)
     datetime_ended = models.DateTimeField(null=True, blank=True)
+    datetime_modified = models.DateTimeField(auto_now=True)
 
     target_score = models.IntegerField(
         default=500,
@@ -20,6 +116,11 @@ class Match(models.Model):
     )
     complete = models.BooleanField(default=False)
 
+    # Bumped by every write to the Match or its Games
+    version = models.PositiveIntegerField(default=1)
+
+    objects = MatchQuerySet.as_manager()
+
     class Meta:
         ordering = ['-datetime_started']
 
@@ -30,6 +131,37 @@ class Match(models.Model):
     def get_absolute_url(self):
         return reverse('api:match-detail', kwargs={'match_pk': self.pk})
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        match = super().from_db(db, field_names, values)
+        match._loaded_version = match.__dict__.get('version')
+        return match
+
+    def save(self, *args, **kwargs):
+        """Save the Match, moving it to its next version unless the write has
+        already moved it (as API and GameService writes do)."""
+        bump = (not self._state.adding and 'version' in self.__dict__
+                and self.version == getattr(self, '_loaded_version', None))
+        if bump:
+            self.version = models.F('version') + 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'version'}
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=['version'])
+        self._loaded_version = self.version
+
+    def delete(self, using=None, keep_parents=False):
+        """Delete the Match, deleting its Games in one statement."""
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            game_counts = delete_match_games(
+                type(self)._base_manager.using(using).filter(pk=self.pk))
+            deleted, rows_count = super().delete(using, keep_parents)
+        rows_count.update(game_counts)
+        return deleted + sum(game_counts.values()), rows_count
+
 class MatchPlayer(models.Model):
     """
     An abstract base class for individual Players and each of their Matches.
@@ -45,12 +177,47 @@ class MatchPlayer(models.Model):
         unique_together = ('match', 'player')
         ordering = ['match']
 
+class ScoreManager(models.Manager):
+    """
+    Manager for Score objects.
+    """
+    def add_points(self, match_id: int, player_id: int,
+                   points: int) -> Optional[int]:
+        """Add `points` (which may be negative) to a Player's Score for a
+        Match as a single UPDATE statement, so that concurrent writes to the
+        same Score can't overwrite each other. Return the new `player_score`,
+        or None if there is no matching Score.
+        """
+        connection = connections[self.db]
+        queryset = self.filter(match_id=match_id, player_id=player_id)
+
+        # Backends that can return columns from an INSERT also support
+        # UPDATE ... RETURNING (Postgres, SQLite >= 3.35).
+        if not connection.features.can_return_columns_from_insert:
+            if not queryset.update(player_score=models.F('player_score') + points):
+                return None
+            return queryset.values_list('player_score', flat=True).get()
+
+        quote_name = connection.ops.quote_name
+        sql = (
+            f'UPDATE {quote_name(self.model._meta.db_table)} '
+            f'SET {quote_name("player_score")} = {quote_name("player_score")} + %s '
+            f'WHERE {quote_name("match_id")} = %s AND {quote_name("player_id")} = %s '
+            f'RETURNING {quote_name("player_score")}'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [points, match_id, player_id])
+            row = cursor.fetchone()
+        return row[0] if row else None
+
 class Score(MatchPlayer):
     """
     The score for each player in a match.
     """
     player_score = models.IntegerField(default=0)
 
+    objects = ScoreManager()
+
     def __str__(self):
         date_started_str = self.match.datetime_started.strftime('%D')
         return f'{self.player.username} {date_started_str} - {self.player_score} ({self.pk})'
@@ -75,6 +242,15 @@ class Outcome(MatchPlayer):
         blank=True,
     )
 
+    class Meta(MatchPlayer.Meta):
+        constraints = [
+            models.UniqueConstraint(
+                fields=['match'],
+                condition=models.Q(player_outcome=1),
+                name='unique_match_winner',
+            ),
+        ]
+
     def __str__(self):
         date_started_str = self.match.datetime_started.strftime('%D')
         return f'{self.player.username} {date_started_str} ({self.pk})'
@@ -0,0 +1,101 @@
+from typing import Tuple
+
+from django.db import models
+
+from accounts.models import Player
+
+class PlayerStats(models.Model):
+    """
+    Running totals of a Player's Matches and Games, kept up to date by every
+    Game and Match write so they can be read without aggregating Games.
+    Filled in for existing Players by a migration, and rebuilt with
+    `manage.py rebuild_player_stats`.
+    """
+    player = models.OneToOneField(
+        Player,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='stats',
+    )
+    matches_played = models.IntegerField(default=0)
+    matches_won = models.IntegerField(default=0)
+    matches_lost = models.IntegerField(default=0)
+    games_won = models.IntegerField(default=0)
+    games_lost = models.IntegerField(default=0)
+    # Points from the Games the Player won
+    total_points = models.IntegerField(default=0)
+    gin_count = models.IntegerField(default=0)
+    undercut_count = models.IntegerField(default=0)
+
+    last_played = models.DateTimeField(null=True, blank=True)
+    datetime_modified = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name_plural = 'player stats'
+
+    def __str__(self):
+        return f'{self.player.username} stats'
+
+class Rivalry(models.Model):
+    """
+    Running head-to-head totals of two Players against each other, kept up
+    to date by every Game and Match write. Each pair has one row, with
+    `player_a` the Player with the lower pk; the `a_` and `b_` fields are
+    each side's totals. Filled in for existing pairs by a migration, and
+    rebuilt with `manage.py rebuild_player_stats`.
+    """
+    player_a = models.ForeignKey(
+        Player,
+        on_delete=models.CASCADE,
+        related_name='rivalries_as_a',
+    )
+    player_b = models.ForeignKey(
+        Player,
+        on_delete=models.CASCADE,
+        related_name='rivalries_as_b',
+    )
+    matches_played = models.IntegerField(default=0)
+    a_matches_won = models.IntegerField(default=0)
+    b_matches_won = models.IntegerField(default=0)
+    games_played = models.IntegerField(default=0)
+    a_games_won = models.IntegerField(default=0)
+    b_games_won = models.IntegerField(default=0)
+    # Points from the Games each side won
+    a_points = models.IntegerField(default=0)
+    b_points = models.IntegerField(default=0)
+    a_gin_count = models.IntegerField(default=0)
+    b_gin_count = models.IntegerField(default=0)
+    a_undercut_count = models.IntegerField(default=0)
+    b_undercut_count = models.IntegerField(default=0)
+
+    last_played = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'rivalries'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['player_a', 'player_b'],
+                name='unique_rivalry_pair',
+            ),
+            models.CheckConstraint(
+                check=models.Q(player_a__lt=models.F('player_b')),
+                name='rivalry_player_a_lt_player_b',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['player_a', '-games_played'],
+                         name='rivalry_a_games_idx'),
+            models.Index(fields=['player_b', '-games_played'],
+                         name='rivalry_b_games_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.player_a.username} vs {self.player_b.username}'
+
+    @staticmethod
+    def pair(player_id: int, other_id: int) -> Tuple[int, int]:
+        """Return two Player pks in (`player_a`, `player_b`) order."""
+        if player_id < other_id:
+            return player_id, other_id
+        return other_id, player_id
+
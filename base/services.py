@@ -0,0 +1,987 @@
+"""
+Services to create, edit, and delete Game records.
+
+Each write runs in one transaction with its Match row locked, and keeps the
+Match's Scores, Outcomes, and completion state in step with its Games.
+"""
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from functools import reduce
+from operator import or_
+from typing import (Callable, Dict, Hashable, Iterable, List, Optional, Set,
+                    Tuple)
+
+from django.apps import apps as global_apps
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from base.cache import invalidate
+from base.models import (Game, LedgerEntry, Match, Outcome, PlayerStats,
+                         Rivalry, Score, ScoreCheckpoint)
+
+# A Rivalry's (`player_a`, `player_b`) pks
+Pair = Tuple[int, int]
+rivalry_pair = Rivalry.pair
+# Outcome values, which historical models passed by migrations don't carry
+WIN, LOSS = Outcome.WIN, Outcome.LOSS
+
+
+class StaleMatchVersion(Exception):
+    """
+    A write was made against an out-of-date version of a Match.
+    """
+    def __init__(self, match: Match):
+        self.match = match
+        super().__init__(f'Match {match.pk} is at version {match.version}.')
+
+
+class GameService:
+    """
+    Write Games along with their Score and Outcome bookkeeping.
+
+    A Game create takes five queries: one UPDATE that locks the Match and
+    bumps its version, one for the Game itself, one UPDATE for the winner's
+    Score, and one UPDATE each for its Players' PlayerStats and Rivalry. An
+    update also reads the Game's previous values first. Match and Outcome
+    writes are only made when a Score crosses the Match's target_score.
+
+    Each write takes an optional `expected_version` and raises
+    StaleMatchVersion if the Match isn't at that version.
+    """
+    @classmethod
+    def create(cls, game: Game,
+               expected_version: Optional[int] = None) -> Game:
+        """Save an unsaved Game and add its points to the winner's Score."""
+        with transaction.atomic():
+            match = lock_match(game.match_id, expected_version)
+            game.match = match
+            game._points_cache = game.points
+
+            with service_write(game):
+                game.save()
+
+            winner_score = add_points(match, game.winner_id, game.points,
+                                      game.pk, LedgerEntry.CREATE)
+            update_game_stats(None, game)
+            if crosses_target(match, winner_score, game.points):
+                complete_match(match, game.winner_id)
+        return game
+
+    @classmethod
+    def update(cls, game: Game,
+               expected_version: Optional[int] = None) -> Match:
+        """Save changes to a Game and move its points between Scores.
+
+        `game` should already have its new attribute values set. Its
+        previous values are read from the database, and read again under
+        lock if its Match was written in between. A Game moved to another
+        Match is checked against `expected_version` of the Match it was in.
+        Return that Match, at its new version.
+        """
+        with transaction.atomic():
+            # Read the Game before locking, so its current and new Matches are
+            # locked in one call, in pk order
+            previous = previous_game(game.pk)
+            if previous.match_id == game.match_id:
+                match = lock_match(game.match_id, expected_version)
+                matches = {match.pk: match}
+                read_version = match.version - 1
+            # The Game has been moved to another Match
+            else:
+                matches = lock_matches([previous.match_id, game.match_id])
+                read_version = matches[previous.match_id].version
+                bump_version(matches[previous.match_id], expected_version)
+                bump_version(matches[game.match_id])
+
+            # Every Game write bumps its Match's version, so the Game was only
+            # written since it was read if its Match has moved on
+            if read_version != previous.match.version:
+                previous = previous_game(game.pk, lock=True)
+                if previous.match_id not in matches:
+                    matches.update(lock_matches([previous.match_id]))
+                    bump_version(matches[previous.match_id])
+
+            game.match = matches[game.match_id]
+            game._points_cache = game.points
+
+            with service_write(game):
+                game.save()
+
+            update_game_stats(previous, game)
+
+            same_score = (previous.match_id == game.match_id
+                          and previous.winner_id == game.winner_id)
+            if same_score:
+                points = game.points - previous._points_cache
+                winner_score = add_points(game.match, game.winner_id, points,
+                                          game.pk, LedgerEntry.EDIT)
+                if crosses_target(game.match, winner_score, points):
+                    complete_match(game.match, game.winner_id)
+                elif points < 0:
+                    reopen_match(game.match, winner_score)
+            else:
+                previous_match = matches[previous.match_id]
+                previous_score = apply_points(
+                    previous_match.pk, previous.winner_id,
+                    -previous._points_cache, game.pk, LedgerEntry.EDIT)
+                if previous_score is not None:
+                    reopen_match(previous_match, previous_score)
+
+                winner_score = add_points(game.match, game.winner_id,
+                                          game.points, game.pk,
+                                          LedgerEntry.EDIT)
+                if crosses_target(game.match, winner_score, game.points):
+                    complete_match(game.match, game.winner_id)
+        return matches[previous.match_id]
+
+    @classmethod
+    def bulk_create(cls, match: Match, games: List[Game],
+                    expected_version: Optional[int] = None) -> List[Game]:
+        """Insert many unsaved Games for one Match with a single INSERT.
+
+        Rather than updating Scores game by game, each affected Score is
+        recomputed once from the sum of its Games' points, and the Match's
+        completion is decided once at the end. `match` is moved to its new
+        version.
+        """
+        with transaction.atomic():
+            locked = lock_match(match.pk, expected_version)
+            match.version = locked.version
+            match = locked
+            for game in games:
+                game.match = match
+                game._points_cache = game.points
+
+            games = Game.objects.bulk_create(games)
+            if ledger_enabled():
+                LedgerEntry.objects.bulk_create([
+                    LedgerEntry(match=match, player_id=game.winner_id,
+                                game=game, delta=game.points,
+                                reason=LedgerEntry.CREATE)
+                    for game in games
+                ])
+
+            update_player_stats(
+                merge_stats(game_stats(game) for game in games),
+                merge_last_played(game_last_played(game) for game in games))
+            update_rivalries(
+                merge_stats(game_rivalry_stats(game) for game in games),
+                merge_last_played(game_rivalry_last_played(game)
+                                  for game in games))
+
+            winner_ids = {game.winner_id for game in games}
+            updated = recompute_scores(match, winner_ids)
+            if updated != len(winner_ids):
+                raise Score.DoesNotExist('Score matching query does not exist.')
+
+            scores = Score.objects.filter(match=match).order_by(
+                '-player_score').values_list('player_id', 'player_score')
+            scores = list(scores)
+            if (not match.complete and len(scores) > 1
+                    and scores[0][1] >= match.target_score):
+                complete_match(match, scores[0][0])
+        return games
+
+    @classmethod
+    def delete(cls, game: Game,
+               expected_version: Optional[int] = None) -> Match:
+        """Delete a Game and remove its points from the winner's Score.
+        Return the Game's Match, at its new version.
+        """
+        with transaction.atomic():
+            match = lock_match(game.match_id, expected_version)
+            game_pk = game.pk
+
+            with service_write(game):
+                game.delete()
+
+            winner_score = apply_points(match.pk, game.winner_id,
+                                        -game.points, game_pk,
+                                        LedgerEntry.DELETE)
+            update_game_stats(game, None)
+            if winner_score is not None:
+                reopen_match(match, winner_score)
+        return match
+
+
+@contextmanager
+def service_write(game: Game):
+    """
+    Mark a Game as being written by GameService, so the Game signals leave
+    the Score and Outcome bookkeeping to the service.
+    """
+    game._service_write = True
+    try:
+        yield game
+    finally:
+        del game._service_write
+
+def is_service_write(game: Game) -> bool:
+    return getattr(game, '_service_write', False)
+
+def lock_matches(match_pks: Iterable[int]) -> Dict[int, Match]:
+    """
+    Lock Match rows (in primary key order, to avoid deadlocks) for the rest
+    of the transaction. Return a dict of Match instances keyed by pk.
+    """
+    matches = Match.objects.select_for_update().filter(
+        pk__in=set(match_pks)).order_by('pk')
+    return {match.pk: match for match in matches}
+
+def lock_match(match_pk: int, expected_version: Optional[int] = None) -> Match:
+    """
+    Lock a Match for the rest of the transaction and move it to its next
+    version, in one query where the database can return the updated row.
+    Raise StaleMatchVersion if `expected_version` is given and the Match was
+    at a different version.
+    """
+    match = Match.objects.lock_and_bump_version(match_pk)
+    if match is None:
+        raise Match.DoesNotExist('Match matching query does not exist.')
+    invalidate(match_pks=[match.pk])
+    # The bump is rolled back with the rest of the write
+    if expected_version is not None and match.version - 1 != expected_version:
+        match.version -= 1
+        raise StaleMatchVersion(match)
+    return match
+
+def previous_game(game_pk: int, lock: bool = False) -> Game:
+    """
+    Read the values of a Game that a write changes, with its Match's
+    version, optionally locking the Game's row.
+    """
+    games = Game.objects.select_related('match').only(
+        'match__version', 'winner_id', 'loser_id', 'points', 'gin',
+        'undercut', '_points_cache')
+    if lock:
+        games = games.select_for_update(of=('self',))
+    return games.get(pk=game_pk)
+
+def check_version(match: Match, expected_version: Optional[int]) -> None:
+    """
+    Raise StaleMatchVersion if `expected_version` is given and the Match is
+    at a different version.
+    """
+    if expected_version is not None and match.version != expected_version:
+        raise StaleMatchVersion(match)
+
+def bump_version(match: Match, expected_version: Optional[int] = None) -> int:
+    """
+    Check a locked Match's version against `expected_version`, then increment
+    it. Return the new version.
+    """
+    check_version(match, expected_version)
+    Match.objects.filter(pk=match.pk).bump_version()
+    invalidate(match_pks=[match.pk])
+    match.version += 1
+    return match.version
+
+def ledger_enabled() -> bool:
+    """Return True if Score changes are recorded as LedgerEntry records."""
+    return getattr(settings, 'GAME_LEDGER', False)
+
+def apply_points(match_id: int, player_id: int, points: int,
+                 game_id: Optional[int] = None,
+                 reason: str = LedgerEntry.CREATE) -> Optional[int]:
+    """
+    Add points to a Player's Score for a Match and return the new score, or
+    None if the Player has no Score. When the ledger is on, also append a
+    LedgerEntry for the change.
+    """
+    player_score = Score.objects.add_points(match_id, player_id, points)
+    if player_score is not None and points and ledger_enabled():
+        LedgerEntry.objects.create(match_id=match_id, player_id=player_id,
+                                   game_id=game_id, delta=points,
+                                   reason=reason)
+    return player_score
+
+def add_points(match: Match, player_id: int, points: int,
+               game_id: Optional[int] = None,
+               reason: str = LedgerEntry.CREATE) -> int:
+    """
+    Add points to a Player's Score for a Match and return the new score.
+    """
+    player_score = apply_points(match.pk, player_id, points, game_id, reason)
+    if player_score is None:
+        raise Score.DoesNotExist('Score matching query does not exist.')
+    return player_score
+
+def game_points() -> Coalesce:
+    """
+    Expression for the sum of the points of the Games won by a Score's Player
+    in the Score's Match. Used to annotate or update Score querysets.
+    """
+    points = Game.objects.filter(
+        match=models.OuterRef('match'),
+        winner=models.OuterRef('player'),
+    ).values('winner').annotate(total=models.Sum('points')).values('total')
+    return Coalesce(models.Subquery(points), 0)
+
+def recompute_scores(match: Match, player_ids: Iterable[int]) -> int:
+    """
+    Set Players' Scores for a Match to the sum of the points of the Games
+    they won, in one UPDATE. Return the number of Scores updated.
+    """
+    return Score.objects.filter(
+        match=match,
+        player_id__in=set(player_ids),
+    ).update(player_score=game_points())
+
+def crosses_target(match: Match, player_score: int, points: int) -> bool:
+    """
+    Return True if adding `points` took `player_score` from below the Match's
+    target_score to at or above it.
+    """
+    return player_score - points < match.target_score <= player_score
+
+def complete_match(match: Match, winner_id: int) -> bool:
+    """
+    Move a Match from incomplete to complete: set Match.complete and
+    `datetime_ended`, and create Outcome records for the winner and for each
+    of the Match's other Players as a loser. Return True if the Match was
+    completed.
+
+    The Match is only updated if it isn't already complete, so concurrent
+    writes that both cross the target score can't both create Outcomes.
+    """
+    datetime_ended = timezone.now()
+    completed = Match.objects.filter(pk=match.pk, complete=False).update(
+        complete=True,
+        datetime_ended=datetime_ended,
+    )
+    if not completed:
+        return False
+
+    match.complete = True
+    match.datetime_ended = datetime_ended
+
+    # The losers are the Match's Players rather than the crossing Game's
+    # loser, which may be missing (e.g. a deleted Player)
+    loser_ids = list(Match.players.through.objects.filter(
+        match_id=match.pk).exclude(player_id=winner_id).values_list(
+            'player_id', flat=True))
+    Outcome.objects.bulk_create(
+        [Outcome(match=match, player_id=winner_id, player_outcome=Outcome.WIN)]
+        + [Outcome(match=match, player_id=loser_id,
+                   player_outcome=Outcome.LOSS) for loser_id in loser_ids]
+    )
+    update_player_stats({winner_id: Counter(matches_won=1),
+                         **{loser_id: Counter(matches_lost=1)
+                            for loser_id in loser_ids}})
+    update_rivalries(merge_stats(match_rivalry_stats(winner_id, loser_id)
+                                 for loser_id in loser_ids))
+    return True
+
+def reopen_match(match: Match, player_score: int) -> bool:
+    """
+    If `player_score` has dropped below the Match's target_score and no other
+    Score in the Match still meets it, undo `complete` and `datetime_ended` on
+    the Match and delete its Outcome objects. Return True if the Match was
+    reopened.
+    """
+    if player_score >= match.target_score:
+        return False
+
+    # Conditional UPDATE, so the database decides whether the Match is
+    # complete and every Score is below target
+    reopened = Match.objects.filter(
+        pk=match.pk,
+        complete=True,
+    ).exclude(
+        score__player_score__gte=models.F('target_score'),
+    ).update(complete=False, datetime_ended=None)
+
+    if not reopened:
+        return False
+
+    match.complete = False
+    match.datetime_ended = None
+    outcomes = Outcome.objects.filter(match=match)
+    changes = defaultdict(Counter)
+    winner_id = None
+    loser_ids = []
+    for player_id, player_outcome in outcomes.values_list(
+            'player_id', 'player_outcome'):
+        if player_outcome == Outcome.WIN:
+            changes[player_id].subtract(matches_won=1)
+            winner_id = player_id
+        elif player_outcome == Outcome.LOSS:
+            changes[player_id].subtract(matches_lost=1)
+            loser_ids.append(player_id)
+    outcomes.delete()
+    update_player_stats(changes)
+    update_rivalries(game_stats_change(
+        merge_stats(match_rivalry_stats(winner_id, loser_id)
+                    for loser_id in loser_ids), {}))
+    return True
+
+def checkpoint_scores(scores: models.QuerySet) -> int:
+    """
+    Snapshot Scores as of their latest LedgerEntry, skipping Scores with no
+    LedgerEntry records since their last checkpoint. Return the number of
+    checkpoints created.
+    """
+    with transaction.atomic():
+        scores = scores.select_for_update().annotate(
+            latest_entry=models.Subquery(
+                player_ledger_entries().order_by('-pk').values('pk')[:1]),
+            checkpoint_entry=models.Subquery(
+                latest_checkpoints().values('last_entry')[:1]),
+            checkpoint_exists=models.Exists(latest_checkpoints()),
+        )
+        checkpoints = [
+            ScoreCheckpoint(score=score, player_score=score.player_score,
+                            last_entry_id=score.latest_entry)
+            for score in scores
+            if not (score.checkpoint_exists
+                    and score.checkpoint_entry == score.latest_entry)
+        ]
+        ScoreCheckpoint.objects.bulk_create(checkpoints)
+    return len(checkpoints)
+
+def rebuild_scores(scores: models.QuerySet) -> int:
+    """
+    Set Scores to their last checkpoint plus the LedgerEntry records written
+    after it. Return the number of Scores changed.
+    """
+    with transaction.atomic():
+        checkpoint_entry = models.Subquery(
+            latest_checkpoints().values('last_entry')[:1])
+        tail = player_ledger_entries().filter(
+            pk__gt=Coalesce(models.OuterRef('checkpoint_entry'), 0),
+        ).values('match').annotate(total=models.Sum('delta')).values('total')
+
+        scores = scores.select_for_update().annotate(
+            checkpoint_entry=checkpoint_entry,
+            checkpoint_score=Coalesce(models.Subquery(
+                latest_checkpoints().values('player_score')[:1]), 0),
+            tail_score=Coalesce(models.Subquery(tail), 0),
+        )
+        changed = []
+        for score in scores:
+            player_score = score.checkpoint_score + score.tail_score
+            if score.player_score != player_score:
+                score.player_score = player_score
+                changed.append(score)
+        Score.objects.bulk_update(changed, ['player_score'], batch_size=500)
+    return len(changed)
+
+def player_ledger_entries() -> models.QuerySet:
+    """LedgerEntry records for the Score in an outer query."""
+    return LedgerEntry.objects.filter(
+        match=models.OuterRef('match'),
+        player=models.OuterRef('player'),
+    )
+
+def latest_checkpoints() -> models.QuerySet:
+    """ScoreCheckpoint records for the Score in an outer query, newest first."""
+    return ScoreCheckpoint.objects.filter(
+        score=models.OuterRef('pk'),
+    ).order_by('-pk')
+
+def game_stats(game: Game) -> Dict[int, Counter]:
+    """
+    Return what a Game adds to its Players' PlayerStats, as
+    {player_id: Counter of field changes}.
+    """
+    stats = defaultdict(Counter)
+    stats[game.winner_id].update(
+        games_won=1,
+        total_points=game.points,
+        gin_count=int(game.gin),
+        undercut_count=int(game.undercut),
+    )
+    stats[game.loser_id].update(games_lost=1)
+    stats.pop(None, None)
+    return stats
+
+def game_last_played(game: Game) -> Dict[int, datetime]:
+    """Return {player_id: datetime_played} for a Game's Players."""
+    return {player_id: game.datetime_played
+            for player_id in (game.winner_id, game.loser_id)
+            if player_id is not None}
+
+def game_stats_change(before: Dict[Hashable, Counter],
+                      after: Dict[Hashable, Counter]
+                      ) -> Dict[Hashable, Counter]:
+    """Return the PlayerStats or Rivalry changes from `before` to `after`."""
+    change = defaultdict(Counter)
+    for player_id, stats in after.items():
+        change[player_id].update(stats)
+    for player_id, stats in before.items():
+        change[player_id].subtract(stats)
+    return change
+
+def merge_stats(stats: Iterable[Dict[Hashable, Counter]]
+                ) -> Dict[Hashable, Counter]:
+    """Return the sum of several Games' PlayerStats or Rivalry changes."""
+    merged = defaultdict(Counter)
+    for changes in stats:
+        for key, key_changes in changes.items():
+            merged[key].update(key_changes)
+    return merged
+
+def merge_last_played(last_played: Iterable[Dict[Hashable, datetime]]
+                      ) -> Dict[Hashable, datetime]:
+    """Return the latest of several Games' `last_played` times, by key."""
+    merged = {}
+    for played in last_played:
+        for key, datetime_played in played.items():
+            merged[key] = max(datetime_played,
+                              merged.get(key, datetime_played))
+    return merged
+
+def update_counts(queryset: models.QuerySet,
+                  lookup: Callable[[Hashable], models.Q],
+                  changes: Dict[Hashable, Counter],
+                  last_played: Optional[Dict[Hashable, datetime]] = None,
+                  **values) -> None:
+    """
+    Add `changes` ({key: Counter of field changes}) to rows of `queryset`,
+    and move each row's `last_played` forward to the time in `last_played`
+    ({key: datetime}), all in one UPDATE. `lookup(key)` returns the Q object
+    that finds a key's row. Changed rows also have their fields set from
+    `values`.
+    """
+    last_played = last_played or {}
+    fields = count_fields(lookup, changes)
+    if last_played:
+        fields['last_played'] = models.Case(*[
+            models.When(lookup(key), then=Greatest(
+                Coalesce(models.F('last_played'), models.Value(played)),
+                models.Value(played)))
+            for key, played in last_played.items()
+        ], default=models.F('last_played'))
+    if not fields:
+        return
+
+    keys = set(changes) | set(last_played)
+    queryset.filter(reduce(or_, map(lookup, keys))).update(**fields, **values)
+
+def count_fields(lookup: Callable[[Hashable], models.Q],
+                 changes: Dict[Hashable, Counter]) -> Dict[str, models.Expression]:
+    """
+    Return the expressions that add `changes` ({key: Counter of field
+    changes}) to the fields of rows, for an UPDATE of the rows of every key.
+    """
+    field_changes = defaultdict(list)
+    for key, key_changes in changes.items():
+        for field, value in key_changes.items():
+            if value:
+                field_changes[field].append(
+                    models.When(lookup(key), then=models.Value(value)))
+    return {
+        field: models.F(field) + models.Case(*whens, default=models.Value(0))
+        for field, whens in field_changes.items()
+    }
+
+def update_player_stats(changes: Dict[int, Counter],
+                        last_played: Optional[Dict[int, datetime]] = None
+                        ) -> None:
+    """
+    Add `changes` ({player_id: Counter of field changes}) to Players'
+    PlayerStats, and move each Player's `last_played` forward to the time in
+    `last_played` ({player_id: datetime}), all in one UPDATE.
+
+    Players without a PlayerStats row are skipped; it's built with all their
+    history by `rebuild_player_stats`.
+    """
+    changes = {key: value for key, value in changes.items() if key is not None}
+    last_played = {key: value for key, value in (last_played or {}).items()
+                   if key is not None}
+    update_counts(PlayerStats.objects.all(),
+                  lambda player_id: models.Q(player_id=player_id),
+                  changes, last_played, datetime_modified=timezone.now())
+    invalidate(player_pks=set(changes) | set(last_played))
+
+def refresh_last_played(player_ids: Iterable[Optional[int]],
+                        exclude_game_pk: Optional[int] = None) -> None:
+    """
+    Set Players' PlayerStats `last_played` from their latest Game (other than
+    `exclude_game_pk`), after a Game has been edited or deleted.
+    """
+    player_ids = set(player_ids) - {None}
+    if not player_ids:
+        return
+    latest = Game.objects.filter(
+        models.Q(winner=models.OuterRef('player'))
+        | models.Q(loser=models.OuterRef('player'))
+    ).exclude(pk=exclude_game_pk).order_by('-datetime_played').values(
+        'datetime_played')[:1]
+    PlayerStats.objects.filter(player_id__in=player_ids).update(
+        last_played=models.Subquery(latest),
+        datetime_modified=timezone.now(),
+    )
+    invalidate(player_pks=player_ids)
+
+def build_player_stats(player_ids: Iterable[int],
+                       apps=global_apps) -> Dict[int, PlayerStats]:
+    """
+    Compute Players' PlayerStats from all of their Matches, Outcomes, and
+    Games, keyed by Player pk and not yet saved. Models are taken from
+    `apps`, so migrations can pass their historical models.
+    """
+    Game, Match, Outcome, PlayerStats = (
+        apps.get_model('base', name)
+        for name in ('Game', 'Match', 'Outcome', 'PlayerStats'))
+    stats = {player_id: PlayerStats(player_id=player_id)
+             for player_id in player_ids}
+    if stats:
+        played = Match.players.through.objects.filter(
+            player_id__in=player_ids).values('player_id').annotate(
+                count=models.Count('match_id'))
+        for row in played:
+            stats[row['player_id']].matches_played = row['count']
+
+        outcomes = Outcome.objects.filter(player_id__in=player_ids).values(
+            'player_id', 'player_outcome').annotate(count=models.Count('pk'))
+        for row in outcomes:
+            if row['player_outcome'] == WIN:
+                stats[row['player_id']].matches_won = row['count']
+            elif row['player_outcome'] == LOSS:
+                stats[row['player_id']].matches_lost = row['count']
+
+        wins = Game.objects.filter(winner_id__in=player_ids).values(
+            'winner_id').annotate(
+                count=models.Count('pk'),
+                points=models.Sum('points'),
+                gin=models.Count('pk', filter=models.Q(gin=True)),
+                undercut=models.Count('pk', filter=models.Q(undercut=True)),
+                last_played=models.Max('datetime_played'),
+            )
+        for row in wins:
+            player_stats = stats[row['winner_id']]
+            player_stats.games_won = row['count']
+            player_stats.total_points = row['points']
+            player_stats.gin_count = row['gin']
+            player_stats.undercut_count = row['undercut']
+            player_stats.last_played = row['last_played']
+
+        losses = Game.objects.filter(loser_id__in=player_ids).values(
+            'loser_id').annotate(count=models.Count('pk'),
+                                 last_played=models.Max('datetime_played'))
+        for row in losses:
+            player_stats = stats[row['loser_id']]
+            player_stats.games_lost = row['count']
+            player_stats.last_played = max(
+                filter(None, [player_stats.last_played, row['last_played']]))
+    return stats
+
+def rebuild_player_stats(player_ids: Iterable[int]) -> int:
+    """
+    Recompute Players' PlayerStats from all of their Matches, Outcomes, and
+    Games, creating any that are missing. Return the number rebuilt.
+    """
+    player_ids = set(player_ids) - {None}
+    if not player_ids:
+        return 0
+    with transaction.atomic():
+        stats = build_player_stats(player_ids)
+        PlayerStats.objects.filter(player_id__in=player_ids).delete()
+        PlayerStats.objects.bulk_create(stats.values())
+    invalidate(player_pks=player_ids)
+    return len(stats)
+
+def remove_match_stats(matches: models.QuerySet) -> None:
+    """
+    Take Matches that are about to be deleted out of their Players'
+    PlayerStats and Rivalries: their Players, Outcomes, and Games are
+    subtracted, and `last_played` is read back from the Players' other
+    Games. Rivalries of pairs left without a shared Match are deleted. Takes
+    five queries however many Matches and Games there are.
+    """
+    stats = defaultdict(Counter)
+    rivalries = defaultdict(Counter)
+
+    members = Match.players.through.objects.filter(
+        match__in=matches,
+    ).annotate(outcome=models.Subquery(Outcome.objects.filter(
+        match=models.OuterRef('match'), player=models.OuterRef('player'),
+    ).values('player_outcome')[:1])).values_list(
+        'match_id', 'player_id', 'outcome')
+    match_players = defaultdict(dict)
+    for match_id, player_id, outcome in members:
+        match_players[match_id][player_id] = outcome
+        stats[player_id].subtract(matches_played=1)
+        if outcome == Outcome.WIN:
+            stats[player_id].subtract(matches_won=1)
+        elif outcome == Outcome.LOSS:
+            stats[player_id].subtract(matches_lost=1)
+    if not match_players:
+        return
+
+    for players in match_players.values():
+        for player_id in players:
+            for other_id in players:
+                if player_id < other_id:
+                    rivalries[(player_id, other_id)].subtract(matches_played=1)
+        winners = [player_id for player_id, outcome in players.items()
+                   if outcome == Outcome.WIN]
+        for winner_id in winners:
+            for loser_id, outcome in players.items():
+                if outcome == Outcome.LOSS:
+                    for pair, changes in match_rivalry_stats(
+                            winner_id, loser_id).items():
+                        rivalries[pair].subtract(changes)
+
+    games = Game.objects.filter(match__in=matches).values(
+        'winner_id', 'loser_id').annotate(
+            count=models.Count('pk'),
+            points=models.Sum('points'),
+            gin=models.Count('pk', filter=models.Q(gin=True)),
+            undercut=models.Count('pk', filter=models.Q(undercut=True)),
+        )
+    for row in games:
+        stats[row['winner_id']].subtract(
+            games_won=row['count'], total_points=row['points'],
+            gin_count=row['gin'], undercut_count=row['undercut'])
+        stats[row['loser_id']].subtract(games_lost=row['count'])
+        if None in (row['winner_id'], row['loser_id']):
+            continue
+        pair = Rivalry.pair(row['winner_id'], row['loser_id'])
+        side = rivalry_side(row['winner_id'], pair)
+        rivalries[pair].subtract({
+            'games_played': row['count'],
+            f'{side}games_won': row['count'],
+            f'{side}points': row['points'],
+            f'{side}gin_count': row['gin'],
+            f'{side}undercut_count': row['undercut'],
+        })
+    stats.pop(None, None)
+
+    def latest_other_game(players: models.Q) -> models.Subquery:
+        return models.Subquery(Game.objects.filter(players).exclude(
+            match_id__in=match_players).order_by('-datetime_played').values(
+                'datetime_played')[:1])
+
+    PlayerStats.objects.filter(player_id__in=stats).update(
+        **count_fields(lambda player_id: models.Q(player_id=player_id),
+                       stats),
+        last_played=latest_other_game(
+            models.Q(winner=models.OuterRef('player'))
+            | models.Q(loser=models.OuterRef('player'))),
+        datetime_modified=timezone.now(),
+    )
+    if rivalries:
+        Rivalry.objects.filter(
+            reduce(or_, map(rivalry_lookup, rivalries)),
+        ).update(
+            **count_fields(rivalry_lookup, rivalries),
+            last_played=latest_other_game(
+                models.Q(winner=models.OuterRef('player_a'),
+                         loser=models.OuterRef('player_b'))
+                | models.Q(winner=models.OuterRef('player_b'),
+                           loser=models.OuterRef('player_a'))),
+        )
+        delete_empty_rivalries(rivalries)
+    invalidate(player_pks=stats)
+
+def update_game_stats(before: Optional[Game], after: Optional[Game],
+                      exclude_game_pk: Optional[int] = None) -> None:
+    """
+    Apply a Game write to its Players' PlayerStats and Rivalry. `before` and
+    `after` are the Game's values before and after the write (None for a
+    create or a delete).
+
+    A new Game moves `last_played` forward. When a Game is deleted or its
+    Players change, `last_played` is read back from the remaining Games
+    (other than `exclude_game_pk`).
+    """
+    if before is None:
+        update_player_stats(game_stats(after), game_last_played(after))
+        update_rivalries(game_rivalry_stats(after),
+                         game_rivalry_last_played(after))
+        return
+
+    games = [game for game in (before, after) if game is not None]
+    update_player_stats(game_stats_change(
+        game_stats(before), game_stats(after) if after else {}))
+    update_rivalries(game_stats_change(
+        game_rivalry_stats(before), game_rivalry_stats(after) if after else {}))
+
+    player_ids = [{game.winner_id, game.loser_id} for game in games]
+    if len(games) == 1 or player_ids[0] != player_ids[1]:
+        refresh_last_played(set.union(*player_ids), exclude_game_pk)
+        refresh_rivalry_last_played(
+            [pair for game in games for pair in game_rivalry_stats(game)],
+            exclude_game_pk)
+
+def rivalry_lookup(pair: Pair) -> models.Q:
+    """Return the Q object that finds a pair's Rivalry."""
+    return models.Q(player_a_id=pair[0], player_b_id=pair[1])
+
+def rivalry_side(player_id: int, pair: Pair) -> str:
+    """Return the Rivalry field prefix ('a_' or 'b_') of a Player's totals."""
+    return 'a_' if player_id == pair[0] else 'b_'
+
+def pair_players(pairs: Iterable[Pair]) -> Set[int]:
+    """Return the pks of the Players in Rivalry pairs."""
+    return {player_id for pair in pairs for player_id in pair}
+
+def game_rivalry_stats(game: Game) -> Dict[Pair, Counter]:
+    """
+    Return what a Game adds to its Players' Rivalry, as
+    {(player_a_id, player_b_id): Counter of field changes}.
+    """
+    if (None in (game.winner_id, game.loser_id)
+            or game.winner_id == game.loser_id):
+        return {}
+    pair = Rivalry.pair(game.winner_id, game.loser_id)
+    side = rivalry_side(game.winner_id, pair)
+    return {pair: Counter({
+        'games_played': 1,
+        f'{side}games_won': 1,
+        f'{side}points': game.points,
+        f'{side}gin_count': int(game.gin),
+        f'{side}undercut_count': int(game.undercut),
+    })}
+
+def game_rivalry_last_played(game: Game) -> Dict[Pair, datetime]:
+    """Return {(player_a_id, player_b_id): datetime_played} for a Game."""
+    return {pair: game.datetime_played for pair in game_rivalry_stats(game)}
+
+def match_rivalry_stats(winner_id: Optional[int],
+                        loser_id: Optional[int]) -> Dict[Pair, Counter]:
+    """Return what a Match's Outcomes add to its Players' Rivalry."""
+    if None in (winner_id, loser_id) or winner_id == loser_id:
+        return {}
+    pair = Rivalry.pair(winner_id, loser_id)
+    return {pair: Counter({f'{rivalry_side(winner_id, pair)}matches_won': 1})}
+
+def create_rivalries(pairs: Iterable[Pair]) -> None:
+    """Create an empty Rivalry for each pair that doesn't have one yet."""
+    Rivalry.objects.bulk_create(
+        [Rivalry(player_a_id=player_a_id, player_b_id=player_b_id)
+         for player_a_id, player_b_id in set(pairs)],
+        ignore_conflicts=True,
+    )
+
+def update_rivalries(changes: Dict[Pair, Counter],
+                     last_played: Optional[Dict[Pair, datetime]] = None
+                     ) -> None:
+    """
+    Add `changes` ({(player_a_id, player_b_id): Counter of field changes}) to
+    Rivalries, and move each Rivalry's `last_played` forward to the time in
+    `last_played`, all in one UPDATE.
+
+    Pairs without a Rivalry row are skipped; it's created when the Players
+    first share a Match, and built with all their history by
+    `rebuild_rivalries`.
+    """
+    update_counts(Rivalry.objects.all(), rivalry_lookup, changes, last_played)
+    invalidate(player_pks=pair_players(set(changes) | set(last_played or {})))
+
+def delete_empty_rivalries(pairs: Iterable[Pair]) -> None:
+    """Delete the Rivalries of pairs that no longer share a Match."""
+    pairs = set(pairs)
+    if pairs:
+        Rivalry.objects.filter(reduce(or_, map(rivalry_lookup, pairs)),
+                               matches_played__lte=0).delete()
+
+def refresh_rivalry_last_played(pairs: Iterable[Pair],
+                                exclude_game_pk: Optional[int] = None) -> None:
+    """
+    Set Rivalries' `last_played` from the pair's latest Game (other than
+    `exclude_game_pk`), after a Game has been edited or deleted.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+    latest = Game.objects.filter(
+        models.Q(winner=models.OuterRef('player_a'),
+                 loser=models.OuterRef('player_b'))
+        | models.Q(winner=models.OuterRef('player_b'),
+                   loser=models.OuterRef('player_a'))
+    ).exclude(pk=exclude_game_pk).order_by('-datetime_played').values(
+        'datetime_played')[:1]
+    Rivalry.objects.filter(reduce(or_, map(rivalry_lookup, pairs))).update(
+        last_played=models.Subquery(latest))
+    invalidate(player_pks=pair_players(pairs))
+
+def build_rivalries(player_ids: Iterable[int],
+                    apps=global_apps) -> Dict[Pair, Rivalry]:
+    """
+    Compute the Rivalries of each of `player_ids` with every Player with a
+    higher pk, from their shared Matches, Outcomes, and Games, keyed by pair
+    and not yet saved. Models are taken from `apps`, so migrations can pass
+    their historical models.
+    """
+    Game, Match, Outcome, Rivalry = (
+        apps.get_model('base', name)
+        for name in ('Game', 'Match', 'Outcome', 'Rivalry'))
+    player_ids = set(player_ids)
+    rivalries = {}
+
+    def rivalry(pair: Pair) -> Rivalry:
+        if pair not in rivalries:
+            rivalries[pair] = Rivalry(player_a_id=pair[0], player_b_id=pair[1])
+        return rivalries[pair]
+
+    if player_ids:
+        shared = Match.players.through.objects.filter(
+            player_id__in=player_ids,
+            match__players__pk__gt=models.F('player_id'),
+        ).values('player_id', other_id=models.F('match__players')).annotate(
+            count=models.Count('match_id'))
+        for row in shared:
+            pair = (row['player_id'], row['other_id'])
+            rivalry(pair).matches_played = row['count']
+
+        wins = Outcome.objects.filter(
+            models.Q(player_id__in=player_ids,
+                     match__outcome__player_id__gt=models.F('player_id'))
+            | models.Q(match__outcome__player_id__in=player_ids,
+                       player_id__gt=models.F('match__outcome__player_id')),
+            player_outcome=WIN,
+            match__outcome__player_outcome=LOSS,
+        ).values('player_id', loser_id=models.F('match__outcome__player_id')
+                 ).annotate(count=models.Count('pk'))
+        for row in wins:
+            pair = rivalry_pair(row['player_id'], row['loser_id'])
+            side = rivalry_side(row['player_id'], pair)
+            setattr(rivalry(pair), f'{side}matches_won', row['count'])
+
+        games = Game.objects.filter(
+            models.Q(winner_id__in=player_ids,
+                     loser_id__gt=models.F('winner_id'))
+            | models.Q(loser_id__in=player_ids,
+                       winner_id__gt=models.F('loser_id')),
+        ).values('winner_id', 'loser_id').annotate(
+            count=models.Count('pk'),
+            points=models.Sum('points'),
+            gin=models.Count('pk', filter=models.Q(gin=True)),
+            undercut=models.Count('pk', filter=models.Q(undercut=True)),
+            last_played=models.Max('datetime_played'),
+        )
+        for row in games:
+            pair = rivalry_pair(row['winner_id'], row['loser_id'])
+            player_rivalry = rivalry(pair)
+            side = rivalry_side(row['winner_id'], pair)
+            player_rivalry.games_played += row['count']
+            setattr(player_rivalry, f'{side}games_won', row['count'])
+            setattr(player_rivalry, f'{side}points', row['points'])
+            setattr(player_rivalry, f'{side}gin_count', row['gin'])
+            setattr(player_rivalry, f'{side}undercut_count', row['undercut'])
+            player_rivalry.last_played = max(filter(None, [
+                player_rivalry.last_played, row['last_played']]))
+    return rivalries
+
+def rebuild_rivalries(player_ids: Iterable[int]) -> int:
+    """
+    Recompute the Rivalries of each of `player_ids` with every Player with a
+    higher pk, from their shared Matches, Outcomes, and Games, creating any
+    that are missing. Passing every Player of a Match rebuilds every Rivalry
+    within it. Return the number rebuilt.
+    """
+    player_ids = set(player_ids) - {None}
+    if not player_ids:
+        return 0
+    with transaction.atomic():
+        rivalries = build_rivalries(player_ids)
+        Rivalry.objects.filter(player_a_id__in=player_ids).delete()
+        Rivalry.objects.bulk_create(rivalries.values())
+    invalidate(player_pks=pair_players(rivalries))
+    return len(rivalries)
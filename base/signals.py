@@ -1,29 +1,51 @@
 """
 Signals to update Game and Match records.
 """
-from django.db.models import Q
-from django.db.models.signals import pre_delete, post_save, pre_save, m2m_changed, post_init
+from collections import Counter
+
+from django.db.models.signals import pre_delete, post_delete, post_save, pre_save, m2m_changed, post_init
 from django.dispatch import receiver
-from django.utils import timezone
 
 from accounts.models import Player
-from base.models import Game, Match, Outcome, Score
+from base.cache import forget_username, invalidate
+from base.models import (Game, LedgerEntry, Match, Outcome, PlayerStats,
+                         Rivalry, Score)
+from base.models.match import pre_delete_matches
+from base.services import (apply_points, complete_match, create_rivalries,
+                           crosses_target, delete_empty_rivalries,
+                           is_service_write, ledger_enabled,
+                           remove_match_stats, reopen_match,
+                           update_game_stats, update_player_stats,
+                           update_rivalries)
 
 
 @receiver(m2m_changed, sender=Match.players.through)
-def create_score(sender, **kwargs):
+def create_score(sender, instance, action, reverse, pk_set, **kwargs):
     """
-    When a Match is created, create an associated Score.
+    When Players are added to a Match, create an associated Score for each
+    Player that doesn't have one yet, with one query to find the existing
+    Scores and one bulk INSERT.
     """
-    if kwargs['action'] == 'post_add':
-        for player_pk in kwargs['pk_set']:
-            try:
-                Score.objects.get(Q(player__pk=player_pk),
-                                  Q(match__pk=kwargs['instance'].pk))
-            except Score.DoesNotExist:
-                Score.objects.create(match=kwargs['instance'],
-                                     player=Player.objects.get(pk=player_pk),
-                                     player_score=0)
+    if action != 'post_add' or not pk_set:
+        return
+
+    # `reverse` is True when Matches are added from the Player side
+    if reverse:
+        match_player_pks = {(match_pk, instance.pk) for match_pk in pk_set}
+        existing = Score.objects.filter(player=instance, match_id__in=pk_set)
+    else:
+        match_player_pks = {(instance.pk, player_pk) for player_pk in pk_set}
+        existing = Score.objects.filter(match=instance, player_id__in=pk_set)
+
+    match_player_pks -= set(existing.values_list('match_id', 'player_id'))
+
+    # Ignore conflicts on the (`match`, `player`) unique pair in case another
+    # request creates the same Score first
+    Score.objects.bulk_create(
+        [Score(match_id=match_pk, player_id=player_pk, player_score=0)
+         for match_pk, player_pk in match_player_pks],
+        ignore_conflicts=True,
+    )
 
 @receiver(pre_save, sender=Game)
 def update_score(sender, instance, **kwargs):
@@ -32,64 +54,70 @@ def update_score(sender, instance, **kwargs):
     and then increased by the Game instance's `.points` value. The Game 
     instance's `._points_cache` value is then set to the `.points` value.
 
-    Used for both creating new games and editing old games.
+    The Score is changed with a single atomic UPDATE. If the new
+    `.player_score` crosses the Match's target_score, the Match is completed.
+
+    Used for both creating new games and editing old games. Games written
+    through GameService are skipped, since the service does this itself.
     """
-    winner_score = Score.objects.get(
-        player=instance.winner,
-        match=instance.match
-    )
+    if is_service_write(instance):
+        return
+
     # Adjust down before adjusting up--for editing games
-    winner_score.player_score -= instance._points_cache
-    winner_score.player_score += instance.points
-    winner_score.save()
+    points = instance.points - instance._points_cache
+    winner_score = Score.objects.add_points(
+        match_id=instance.match_id,
+        player_id=instance.winner_id,
+        points=points,
+    )
+    if winner_score is None:
+        raise Score.DoesNotExist('Score matching query does not exist.')
 
     instance._points_cache = instance.points
+    bump_match_version(instance.match_id)
 
-@receiver(pre_save, sender=Score)
-def finish_match(sender, instance, **kwargs):
-    """
-    Whenever a Score is updated, check to see if it exceeds Match.target_score.
-    If it does, set the winner and loser on the Outcome records and set
-    Match.complete to True.
-    """
-    # Set conditions for when we activate this signal
-    target_score_gte = (instance.player_score >= instance.match.target_score)
-    
-    try:
-        outcome = Outcome.objects.get(
-            match=instance.match, player=instance.player)
-    except Outcome.DoesNotExist:
-        outcome = None
-
-    if target_score_gte and not outcome:
-        
-        # Get winner and loser
-        winner = instance.player
-        
-        loser_queryset = instance.match.players.exclude(
-            username=winner.username)
-        loser = loser_queryset[0]
-        
-        # Set `complete` and `datetime_ended` attrs
-        match = instance.match
-        match.complete = True
-        match.datetime_ended = timezone.now()
-        match.save()
-        
-        # Set winner's outcome as WIN (1)
-        Outcome.objects.create(
-            match=instance.match,
-            player=winner,
-            player_outcome=1
-        )
+    # PlayerStats and Rivalries are changed post-save, once
+    # `datetime_played` is set
+    if instance._state.adding:
+        instance._previous_game = None
+    else:
+        instance._previous_game = Game.objects.only(
+            'winner_id', 'loser_id', 'points', 'gin', 'undercut',
+        ).get(pk=instance.pk)
 
-        # Set loser's outcome as LOSE (0)
-        Outcome.objects.create(
-            match=instance.match,
-            player=loser,
-            player_outcome=0
+    # The Game may not have a pk yet, so its LedgerEntry is written post-save
+    if ledger_enabled():
+        instance._ledger_points = points
+
+    if crosses_target(instance.match, winner_score, points):
+        complete_match(instance.match, instance.winner_id)
+
+@receiver(post_save, sender=Game)
+def record_ledger_entry(sender, instance, created, **kwargs):
+    """
+    When the ledger is on, append a LedgerEntry for the Score change made by
+    `update_score`.
+    """
+    points = instance.__dict__.pop('_ledger_points', 0)
+    if points:
+        LedgerEntry.objects.create(
+            match_id=instance.match_id,
+            player_id=instance.winner_id,
+            game=instance,
+            delta=points,
+            reason=LedgerEntry.CREATE if created else LedgerEntry.EDIT,
         )
 
+@receiver(post_save, sender=Game)
+def record_player_stats(sender, instance, created, **kwargs):
+    """
+    Apply the Game's change to its Players' PlayerStats and Rivalry, from its
+    values before `update_score` ran.
+    """
+    if '_previous_game' not in instance.__dict__:
+        return
+    update_game_stats(instance.__dict__.pop('_previous_game'), instance)
+
 @receiver(pre_delete, sender=Game)
 def delete_game(sender, instance, **kwargs):
     """
@@ -97,23 +125,117 @@ def delete_game(sender, instance, **kwargs):
     If deleted points put the associated Match below its target_score,
     change Match.complete to False and delete the associated Outcome objects.
     """
+    if is_service_write(instance):
+        return
+
     # Remove points from Score
-    match_scores = Score.objects.filter(match=instance.match)
-    winner_score = match_scores.get(player=instance.winner)
-    
-    winner_score.player_score -= instance.points
-    winner_score.save()
-
-    # Make sure instance.match.complete is synced to database
-    instance.match.refresh_from_db()
-
-    all_scores_below_target = all([score.player_score < instance.match.target_score
-                                  for score in match_scores])
-    
-    # Undo complete and datetime_ended on Match
-    if instance.match.complete and all_scores_below_target:
-        instance.match.complete = False
-        instance.match.datetime_ended = None
-        instance.match.save()
-        
-        Outcome.objects.filter(match=instance.match).delete()
\ No newline at end of file
+    winner_score = apply_points(
+        match_id=instance.match_id,
+        player_id=instance.winner_id,
+        points=-instance.points,
+        game_id=instance.pk,
+        reason=LedgerEntry.DELETE,
+    )
+    bump_match_version(instance.match_id)
+    update_game_stats(instance, None, exclude_game_pk=instance.pk)
+    if winner_score is None:
+        return
+
+    reopen_match(instance.match, winner_score)
+
+@receiver(m2m_changed, sender=Match.players.through)
+def update_matches_played(sender, instance, action, reverse, pk_set,
+                          **kwargs):
+    """
+    When Players are added to or removed from a Match, change their
+    PlayerStats `matches_played`, and the `matches_played` of their Rivalry
+    with each other Player of the Match. Players who first share a Match get
+    an empty Rivalry.
+    """
+    if action in ('post_add', 'post_remove'):
+        change = 1 if action == 'post_add' else -1
+    elif action == 'pre_clear':
+        change = -1
+        if reverse:
+            pk_set = set(instance.match_set.values_list('pk', flat=True))
+        else:
+            pk_set = set(instance.players.values_list('pk', flat=True))
+    else:
+        return
+    if not pk_set:
+        return
+
+    # `reverse` is True when Matches are changed from the Player side
+    if reverse:
+        invalidate(match_pks=pk_set)
+        changes = {instance.pk: Counter(matches_played=change * len(pk_set))}
+    else:
+        invalidate(match_pks=[instance.pk])
+        changes = {player_pk: Counter(matches_played=change)
+                   for player_pk in pk_set}
+    update_player_stats(changes)
+
+    pairs = shared_match_pairs(instance, reverse, pk_set)
+    if action == 'post_add':
+        create_rivalries(pairs)
+    update_rivalries({pair: Counter(matches_played=change * count)
+                      for pair, count in pairs.items()})
+    if change < 0:
+        delete_empty_rivalries(pairs)
+
+@receiver(pre_delete_matches, sender=Match)
+def remove_match_player_stats(sender, matches, **kwargs):
+    """
+    Take deleted Matches' Players, Outcomes, and Games out of their Players'
+    PlayerStats and Rivalries, before their Games are deleted.
+    """
+    remove_match_stats(matches)
+
+@receiver(post_save, sender=Match)
+@receiver(post_delete, sender=Match)
+def invalidate_match(sender, instance, **kwargs):
+    """Evict a saved or deleted Match's cached API responses."""
+    invalidate(match_pks=[instance.pk])
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+def invalidate_player(sender, instance, **kwargs):
+    """
+    Evict a saved or deleted Player's cached API responses, and the cached
+    Player for their username, which may have belonged to another Player.
+    """
+    invalidate(player_pks=[instance.pk])
+    forget_username(instance.username)
+
+@receiver(post_save, sender=Player)
+def create_player_stats(sender, instance, created, raw, **kwargs):
+    """Give each new Player an empty PlayerStats row."""
+    if created and not raw:
+        PlayerStats.objects.create(player=instance)
+
+def bump_match_version(match_pk):
+    """
+    Increment a Match's version for a Game written outside GameService.
+    """
+    Match.objects.filter(pk=match_pk).bump_version()
+    invalidate(match_pks=[match_pk])
+
+def shared_match_pairs(instance, reverse, pk_set):
+    """
+    Return a Counter of the Rivalry pairs whose shared Matches are changed by
+    adding or removing `pk_set` on the `Match.players` relation of `instance`,
+    with how many Matches each pair gains or loses.
+    """
+    pairs = Counter()
+    if reverse:
+        other_pks = Match.players.through.objects.filter(
+            match_id__in=pk_set).exclude(player_id=instance.pk).values_list(
+                'player_id', flat=True)
+        pairs.update(Rivalry.pair(instance.pk, other_pk)
+                     for other_pk in other_pks)
+    else:
+        player_pks = set(instance.players.values_list('pk', flat=True)) | pk_set
+        pairs.update({Rivalry.pair(player_pk, other_pk)
+                      for player_pk in pk_set for other_pk in player_pks
+                      if player_pk != other_pk})
+    return pairs
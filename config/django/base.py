@@ -1,6 +1,7 @@
 """Django settings for gin_rummy_scoresheet project."""
 
 import os
+from importlib.util import find_spec
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -102,8 +103,24 @@ REST_FRAMEWORK = {
         'api.permissions.IsAuthenticatedOrObjectPlayer',
     ],
     'DEFAULT_SCHEMA_CLASS':'rest_framework.schemas.coreapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.OptionalCursorPagination',
 }
 
+# Render API JSON with orjson, and offer MessagePack to clients that send
+# `Accept: application/msgpack`. orjson and msgpack are optional and not in
+# requirements.txt (`pip install orjson msgpack`). MessagePack is only offered
+# when msgpack is installed; without orjson, JSON falls back to the stdlib
+# encoder.
+API_FAST_RENDERERS = os.environ.get('API_FAST_RENDERERS', 'False') == 'True'
+if API_FAST_RENDERERS:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+    if find_spec('msgpack') is not None:
+        REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append(
+            'api.renderers.MessagePackRenderer')
+
 # Internationalization
 
 LANGUAGE_CODE = 'en-us'
@@ -123,3 +140,27 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedStaticFilesStorage"
 # Default primary key field type
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Game ledger
+
+# Record every Score change as an append-only LedgerEntry, so Scores can be
+# audited and rebuilt from ScoreCheckpoint snapshots. Run `manage.py
+# checkpoint_scores` after turning this on, and periodically after that.
+GAME_LEDGER = os.environ.get('GAME_LEDGER', 'False') == 'True'
+
+# Seconds that the response to a POST with an Idempotency-Key header is kept
+# for retries. Run `manage.py evict_idempotency_keys` to delete older keys.
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 60 * 60 * 24))
+
+# API response cache
+
+# Alias of the cache (in CACHES) that API GET responses are kept in, or '' to
+# turn the response cache off. Writes evict the responses of the Matches and
+# Players they change. The cache must be shared by every worker (Redis or
+# Memcached), or a write leaves other workers serving stale responses; the
+# base.W001 check warns about per-process caches. See `manage.py
+# response_cache_stats` for hit rates.
+API_RESPONSE_CACHE = os.environ.get('API_RESPONSE_CACHE', '')
+# Seconds a cached response is kept for
+API_RESPONSE_CACHE_TIMEOUT = int(
+    os.environ.get('API_RESPONSE_CACHE_TIMEOUT', 60 * 5))
@@ -16,6 +16,12 @@ export function getPlayerDetailEndpoint(username) {
 export function getPlayersListAllEndpoint() {
   return basePlayerUrl;
 }
+/**
+ * Get API endpoint for player-stats.
+ */
+export function getPlayerStatsEndpoint() {
+  return baseUrl + 'stats/players/';
+}
 /**
  * Get API endpoint for player-create.
  */
@@ -34,6 +40,12 @@ export function getRequestPlayerEndpoint() {
 export function getMatchListPlayerEndpoint(username) {
   return basePlayerUrl + username + '/matches/';
 }
+/**
+ * Get API endpoint for match-summary-list-player.
+ */
+export function getMatchSummaryListPlayerEndpoint(username) {
+  return basePlayerUrl + username + '/matches/summary/';
+}
 /**
  * Get API endpoint for game-list-player.
  */
@@ -58,6 +70,12 @@ export function getMatchListPlayerEndpoint(username) {
  export function getMatchDetailEndpoint(match_pk) {
   return baseMatchUrl + match_pk + '/';
 }
+/**
+ * Get API endpoint for match-snapshot.
+ */
+ export function getMatchSnapshotEndpoint(match_pk) {
+  return baseMatchUrl + match_pk + '/snapshot/';
+}
 /**
  * Get API endpoint for match-create.
  */
@@ -6,11 +6,7 @@ import {
   setFormElemsAsEnabled,
   getValFromUrl,
 } from "./utils.js";
-import { getMatchDetailEndpoint, 
-         getPlayerListMatchEndpoint,
-         getGameListMatchEndpoint,
-         getScoreListMatchEndpoint,
-         getOutcomeListMatchEndpoint,
+import { getMatchSnapshotEndpoint,
          getFrontendURL,
 } from './endpoints.js';
 import { fillWinnerDropdown, submitGameForm } from "./game-form.js";
@@ -24,8 +20,8 @@ fillMatchDetailPage();
  */
 async function fillMatchDetailPage() {
   // Page constants
-  const endpoints = getEndpoints(matchPk);
-  let data = await getDataObj(endpoints);
+  const endpoint = getMatchSnapshotEndpoint(matchPk);
+  let data = await getDataObj(endpoint);
   
   fillWinnerDropdown(
     data.playerList[0].username,
@@ -55,19 +51,6 @@ async function addGameFormSubmitEvent(matchPk) {
   newGameForm.removeEventListener('submit', submitGameFormHandler);
   newGameForm.addEventListener("submit", submitGameFormHandler);
 }
-/**
- * Return an object containing the API endpoints for match-detail, 
- * game-list-match, player-list-match, and score-list-match.
- */
-function getEndpoints(matchPk) {
-  return [
-    getMatchDetailEndpoint(matchPk),
-    getGameListMatchEndpoint(matchPk),
-    getPlayerListMatchEndpoint(matchPk),
-    getScoreListMatchEndpoint(matchPk),
-    getOutcomeListMatchEndpoint(matchPk),
-  ];
-}
 /**
  * Function to use in addEventListener. Named here so that we can remove 
  * the event listener before adding a new one.
@@ -84,36 +67,19 @@ async function submitGameFormHandler(e) {
   fillMatchDetailPage();
 }
 /**
- * Return Promise object for the match, match's games, match's players,
- * and match's scores. `endpoints` is an object of key-value pairs: key is 
- * name of endpoint, value is endpoint URL.
+ * Fetch the match snapshot (the match with its players, games, scores, and
+ * outcomes) in one request, and return it as an object whose keys are the
+ * JSON types (matchDetail, gameList, playerList, scoreList, outcomeList).
  */
-async function getDataJsons(endpoints) {
-  let promises = []
-  for (let endpoint of endpoints) {
-    promises.push(getJsonResponse(endpoint));
+async function getDataObj(endpoint) {
+  const snapshot = await getJsonResponse(endpoint);
+  return {
+    matchDetail: snapshot.match,
+    gameList: snapshot.games,
+    playerList: snapshot.players,
+    scoreList: snapshot.scores,
+    outcomeList: snapshot.outcomes,
   };
-  return Promise.all(promises);
-}
-/**
- * Loop through JSONs produced by getDataJsons, assigning them as values 
- * to an object whose keys are the JSON types (matchDetail, gameList, 
- * playerList, scoreList).
- */
-async function getDataObj(endpoints) {
-  let dataVals = await getDataJsons(endpoints);
-  let dataKeys = [
-    'matchDetail',
-    'gameList',
-    'playerList',
-    'scoreList',
-    'outcomeList',
-  ];
-  let dataObj = {};
-  for (let i = 0; i < dataVals.length; i++) {
-    dataObj[dataKeys[i]] = dataVals[i];
-  };
-  return dataObj;
 }
 /** Fill the `game-wrapper` element with a list of game details */
 async function listGames(gamesJson) {
@@ -210,8 +176,6 @@ function fillScoreboard(playersJson, matchJson, gamesJson, scoresJson) {
   let scoreboardUsernameElems = document.getElementsByClassName('scoreboard-username');
   let scoreboardPointsElems = document.getElementsByClassName('scoreboard-points');
   let scoreboardWinsLossesElems = document.getElementsByClassName('scoreboard-wins-losses')
-  
-  countWinsAndLosses(playersJson, gamesJson);
 
   for (let i in playersJson) {
     
@@ -260,23 +224,6 @@ function fillScoreboardWinsLosses(scoreboardWinsLossesElem, wins, losses) {
   scoreboardWinsLossesElem.innerHTML = `(${wins} ${winWord}, ${losses} ${lossWord})`
 }
 
-function countWinsAndLosses(playersJson, gamesJson) {
-  for (let playerJson of playersJson) {
-    playerJson.wins = 0;
-    playerJson.losses = 0;
-  };
-  for (let gameJson of gamesJson) {
-    let winner = playersJson.filter(function(playerJson) {
-      return playerJson.url == gameJson.winner;
-    })[0];
-    let loser = playersJson.filter(function(playerJson) {
-      return playerJson.url == gameJson.loser;
-    })[0];
-    winner.wins += 1;
-    loser.losses += 1;
-  }
-}
-
 function checkMatchOutcome(outcomeList) {
   return outcomeList.length > 0;
 }
@@ -1,9 +1,6 @@
 import {
-  formatDate,
-  formatDateRange,
   getJsonResponse,
   getCookie,
-  getRequestPlayerUsername,
   getValFromUrl,
   setElemAsHidden,
   setFormElemsAsDisabled,
@@ -12,9 +9,7 @@ import {
 import {
   getFrontendURL,
   getMatchCreateEndpoint,
-  getMatchDetailEndpoint,
-  getMatchListPlayerEndpoint, 
-  getPlayerDetailEndpoint,
+  getMatchSummaryListPlayerEndpoint,
   getPlayersListAllEndpoint,
   getRequestPlayerEndpoint,
 } from "./endpoints.js";
@@ -27,63 +22,26 @@ async function fillPlayerMatchesPage() {
   const csrfToken = getCookie('csrftoken');
   const username = getValFromUrl(window.location.pathname, 'players');
   const requestPlayer = await getJsonResponse(getRequestPlayerEndpoint());
+  const isRequestPlayer = requestPlayer.username == username;
 
-  // Endpoints
-  const matchListEndpoint = getMatchListPlayerEndpoint(username);
-
-  // JSON data
-  let matchesData = await getJsonResponse(matchListEndpoint);
-  matchesData = matchesData;
-  
-  addDataToMatches(matchesData)
-  .then(function(matchesData) {
-    fillMatchesTables(matchesData, csrfToken)
-  })
+  // Each match comes with its opponent, scores, outcome, and formatted
+  // dates, so the tables are filled from this one request
+  const matchSummaryEndpoint = getMatchSummaryListPlayerEndpoint(username);
+  const matchesData = await getJsonResponse(matchSummaryEndpoint);
+  fillMatchesTables(matchesData, isRequestPlayer, csrfToken);
   
-  if (requestPlayer.username != username) {
+  if (!isRequestPlayer) {
     disableNewMatchFormFields();
     setElemAsHidden('new-match-card');
   } else {
-    fillNewMatchForm();
+    fillNewMatchForm(requestPlayer);
   };
 }
-/**
- * Loop through all matches, applying `addDataToMatch` function to each. Return 
- * matchesData array with added data included.
- */
-async function addDataToMatches(matchesData) {
-  for (let matchData of matchesData) {
-    matchData = await addDataToMatch(matchData);
-  };
-  return matchesData;
-}
-/**
- * Add key datapoints to match object:
- * - match PK
- * - formatted scores
- * - opponent username
- * - formatted dates
- * - formatted outcomes (if complete)
- */
-async function addDataToMatch(matchData) {
-  matchData = await addViewPlayerToMatch(matchData)
-  .then(addPkToMatch)
-  .then(addScoresObjToMatch)
-  .then(formatScoresFromObj)
-  .then(addOpponentToMatch)
-  .then(addFormattedDatesToMatch)
-  .then(function(matchData) {
-    if (matchData.complete) {
-      return addFormattedOutcomeToMatch(matchData);
-    };
-  })
-  return matchData;
-}
 
 /**
  * Add each match to either the current matches or the past matches table.
  */
-async function fillMatchesTables(matchesData, csrfToken) {
+async function fillMatchesTables(matchesData, isRequestPlayer, csrfToken) {
   let currentMatchesTable = await waitForElem('current-matches-table');
   let pastMatchesTable = await waitForElem('past-matches-table');
   
@@ -93,129 +51,40 @@ async function fillMatchesTables(matchesData, csrfToken) {
     } else {
       addHTMLRowToCurrentMatchesTable(matchData, currentMatchesTable);
     }
-
-    // Add buttons if current match-list view is for request player (user)
-  }
-  const matchesPromise = matchesData.map(async function(matchData) {
-    const requestPlayerUsername = await getRequestPlayerUsername();
-    if (matchData.viewPlayer.username == requestPlayerUsername) {
-      await addDeleteMatchButton(matchData.pk, csrfToken);
-    };
-  });
-  Promise.all(matchesPromise);
-}
-/**
- * Add view player's username (player in URL) to match object.
- */
-async function addViewPlayerToMatch(matchData) {
-  const viewPlayerUsername = getValFromUrl(window.location.href, 'players');
-  const viewPlayerEndpoint = getPlayerDetailEndpoint(viewPlayerUsername)
-  matchData.viewPlayer = await getJsonResponse(viewPlayerEndpoint);
-  return matchData;
-}
-/**
- * Add match's ID (PK) to the match object.
- */
-function addPkToMatch(match) {
-  const re = new RegExp('\\d+(?=\/$)')
-  return new Promise((resolve) => {
-    match.pk = re.exec(match.url);
-    resolve(match);
-  })
-}
-/**
- * Add data from GET requests to the match's `.scores` endpoints to the 
- * match object.
- */
-async function addScoresObjToMatch(match) {
-  let promises = [];
-  for (let scoreEndpoint of match.score_set) {
-    promises.push(getJsonResponse(scoreEndpoint));
-  };
-  return Promise.all(promises)
-    .then((scoreData) => {
-      for (let i in scoreData) {
-        match.score_set[i] = scoreData[i];
-        }
-      return match;
-      });
-}
-/**
- * Given two scores objects (nested within the match object), return a 
- * string that is formatted as 'score-score' (e.g., '25-10').
- */
-function formatScoresFromObj(match) {
-  let formattedScoresArray = [];
-  for (let scoreObj of match.score_set) {
-    if (scoreObj.player == match.viewPlayer.url) {
-      formattedScoresArray[0] = scoreObj.player_score;
-    } else {
-      formattedScoresArray[1] = scoreObj.player_score;
-    };
-  match.formattedScores =  `${formattedScoresArray[0]}-${formattedScoresArray[1]}`
   }
-  return match;
-}
-/**
- * Check if each player in the match's `.players` set is equal to the 
- * player whose username was passed in the URL (`match.viewPlayer`). If not, 
- * set that player as the opponent.
- */
-async function addOpponentToMatch(match) {
-  for (let playerEndpoint of match.players) {
-    if (playerEndpoint != match.viewPlayer.url) {
-      match.opponent = await getJsonResponse(playerEndpoint);
-    };
+
+  // Add buttons if current match-list view is for request player (user)
+  if (isRequestPlayer) {
+    await Promise.all(matchesData.map(
+      (matchData) => addDeleteMatchButton(matchData.pk, csrfToken)));
   };
-  return match;
 }
 /**
- * If the match has ended, add `.datetime_range_formatted` to the match object. 
- * If not, add a `.datetime_started_formatted` to the match object.
- * 
- * Format specified in formatDate function.
+ * Return the match's scores formatted as 'score-score' (e.g., '25-10'),
+ * view player first.
  */
-function addFormattedDatesToMatch(match) {
-  if (match.datetime_ended) {
-    // Match is complete
-    match.datetime_range_formatted = formatDateRange(
-      match.datetime_started, match.datetime_ended);
-  } else {
-    // Match is not complete
-    match.datetime_started_formatted = formatDate(match.datetime_started);
-  };
-  return match;
+function formatScores(matchData) {
+  return `${matchData.player_score}-${matchData.opponent_score}`;
 }
 /**
- * Add `.formattedOutcome` to the match object. The value will either be 'W' 
- * or 'L'.
+ * Return the view player's outcome for the match, either 'W' or 'L'.
  */
-async function addFormattedOutcomeToMatch(match) {
+function formatOutcome(matchData) {
   const outcomeTable = {
     0: 'L',
     1: 'W',
   }
-  if (match.complete) {
-    for (let playerOutcomeEndpoint of match.outcome_set) {
-      const playerOutcome = await getJsonResponse(playerOutcomeEndpoint);
-      // See if it's the request user
-      let playerUsername = getValFromUrl(playerOutcomeEndpoint, 'players');
-      if (playerUsername == match.viewPlayer.username) {
-        match.formattedOutcome = outcomeTable[playerOutcome.player_outcome];
-      };
-    };
-  }
-  return match;
+  return outcomeTable[matchData.player_outcome];
 }
 
 function addHTMLRowToCurrentMatchesTable(matchData, currentMatchesTable) {
   const matchDetailUrl = getFrontendURL(matchData.url);
-  const opponentDetailUrl = getFrontendURL(matchData.opponent.url);
+  const opponentDetailUrl = getFrontendURL(matchData.opponent);
   let matchHTML = `
       <tr id="row-match-${matchData.pk}" class="row-current-match">
         <td><a href="${matchDetailUrl}">${matchData.datetime_started_formatted}</a></td>
-        <td><a href="${opponentDetailUrl}">${matchData.opponent.username}</a></td>
-        <td>${matchData.formattedScores}</td>
+        <td><a href="${opponentDetailUrl}">${matchData.opponent_username}</a></td>
+        <td>${formatScores(matchData)}</td>
         <td>${matchData.target_score}</td>
       </tr>
     `
@@ -224,13 +93,13 @@ function addHTMLRowToCurrentMatchesTable(matchData, currentMatchesTable) {
 
 function addHTMLRowToPastMatchesTable(matchData, pastMatchesTable) {
   const matchDetailUrl = getFrontendURL(matchData.url);
-  const opponentDetailUrl = getFrontendURL(matchData.opponent.url);
+  const opponentDetailUrl = getFrontendURL(matchData.opponent);
   let matchHTML = `
       <tr id="row-match-${matchData.pk}" class="row-past-match">
         <td id="past-match-datetime-${matchData.pk}"><a href="${matchDetailUrl}">${matchData.datetime_range_formatted}</a></td>
-        <td id="past-match-opponent-username"><a href="${opponentDetailUrl}">${matchData.opponent.username}</a></td>
-        <td id="past-match-outcome-${matchData.pk}">${matchData.formattedOutcome}</td>
-        <td id="past-match-scores-${matchData.pk}">${matchData.formattedScores}</td>
+        <td id="past-match-opponent-username"><a href="${opponentDetailUrl}">${matchData.opponent_username}</a></td>
+        <td id="past-match-outcome-${matchData.pk}">${formatOutcome(matchData)}</td>
+        <td id="past-match-scores-${matchData.pk}">${formatScores(matchData)}</td>
     `
     pastMatchesTable.innerHTML += matchHTML;
 }
@@ -267,8 +136,7 @@ function deleteElem(matchRow) {
 /**
  * Fill the New Match form's opponent box and add a submit event to the button.
  */
-async function fillNewMatchForm() {
-  const requestPlayer = await getJsonResponse(getRequestPlayerEndpoint());
+async function fillNewMatchForm(requestPlayer) {
   fillOpponentDropdown(requestPlayer);
   fillDefaultTargetScore();
   addSubmitEventListener(requestPlayer);
@@ -1,9 +1,6 @@
 import { 
   getFrontendURL,
-  getGameListPlayerEndpoint,
-  getOutcomeListPlayerEndpoint,
-  getPlayersListAllEndpoint,
-  getRequestPlayerEndpoint,
+  getPlayerStatsEndpoint,
 } from "../endpoints.js";
 import {
   formatAsPct,
@@ -12,8 +9,7 @@ import {
 } from '../utils.js';
 
 // Page constants
-const playerListAllEndpoint = getPlayersListAllEndpoint();
-const requestPlayerEndpoint = getRequestPlayerEndpoint();
+const playerStatsEndpoint = getPlayerStatsEndpoint();
 
 fillPlayerListPage();
 
@@ -22,32 +18,23 @@ fillPlayerListPage();
  */
 async function fillPlayerListPage() {
   // Data
-  const playerListAllData = await getJsonResponse(playerListAllEndpoint);
-  const requestPlayerData = await getJsonResponse(requestPlayerEndpoint);
+  const playerStatsData = await getJsonResponse(playerStatsEndpoint);
 
   // Execution
-  fillPlayerListTable(playerListAllData);
+  fillPlayerListTable(playerStatsData);
 }
 /**
  * Fill the player list table.
  */
-async function fillPlayerListTable(playerListAllData) {
-  for (let playerData of playerListAllData) {
+function fillPlayerListTable(playerStatsData) {
+  let playersBody = document.getElementById('players-table-body');
+
+  for (let playerData of playerStatsData) {
     let playerUrl = getFrontendURL(playerData.url);
     let playerPk = getPlayerPk(playerData);
     let username = playerData.username;
-
-    let matchWinPct = await getMatchWinPct(username);
-    if (matchWinPct != '--') {
-      matchWinPct = formatAsPct(matchWinPct);
-    };
-
-    let gameWinPct = await getGameWinPct(username);
-    if (gameWinPct != '--') {
-      gameWinPct = formatAsPct(gameWinPct);
-    };
-
-    let playersBody = document.getElementById('players-table-body');
+    let matchWinPct = getWinPctText(playerData.match_win_pct);
+    let gameWinPct = getWinPctText(playerData.game_win_pct);
 
     fillPlayersTableRow(
       playerUrl, playerPk, username, matchWinPct, gameWinPct, playersBody);
@@ -72,43 +59,12 @@ function getPlayerPk(playerData) {
   return getValFromUrl(playerData.url, 'players');
 }
 /**
- * Calculate the percentage of matches the player has won.
+ * Format a win percentage from the API, which is null if the player
+ * hasn't finished any matches or games.
  */
-async function getMatchWinPct(username) {
-  const outcomeListPlayerEndpoint = getOutcomeListPlayerEndpoint(username);
-  const outcomeData = await getJsonResponse(outcomeListPlayerEndpoint);
-  
-  // If no completed matches
-  if (outcomeData.length == 0) {
+function getWinPctText(winPct) {
+  if (winPct === null) {
     return '--';
   };
-  // Add up wins, divide by number of completed matches
-  let playerWins = null;
-  for (let outcome of outcomeData) {
-    if (outcome.player_outcome == 1) {
-      playerWins += 1;
-    };
-  };
-  return playerWins / outcomeData.length;
-}
-/**
- * Calculate the percentage of games the player has won.
- */
- async function getGameWinPct(username) {
-  const gameListPlayerEndpoint = getGameListPlayerEndpoint(username);
-  const gameData = await getJsonResponse(gameListPlayerEndpoint);
-  
-  // If no completed matches
-  if (gameData.length == 0) {
-    return '--';
-  };
-  // Add up wins, divide by number of completed games
-  let playerWins = null;
-  for (let game of gameData) {
-    let winnerUsername = getValFromUrl(game.winner, 'players');
-    if (winnerUsername == username) {
-      playerWins += 1;
-    };
-  };
-  return playerWins / gameData.length;
+  return formatAsPct(winPct);
 }
@@ -1,6 +1,7 @@
 from datetime import datetime
 from typing import Callable, List, Tuple
 
+from django.core.cache import caches
 from django.middleware.csrf import get_token
 from django.test.client import Client
 from django.urls import reverse
@@ -222,7 +223,6 @@ def make_match(transactional_db) -> Callable:
     def _make_match(players: List[Player], *args, **kwargs) -> Match:
         match = Match.objects.create(*args, **kwargs)
         match.players.set(players)
-        match.save()
         return match
     return _make_match
 
@@ -323,6 +323,15 @@ def log_in_driver(live_server, log_in_client, rf) -> Callable:
         return driver
     return _log_in_driver
 
+@pytest.fixture
+def response_cache(settings):
+    """Turn the API response cache on, starting from an empty cache."""
+    settings.API_RESPONSE_CACHE = 'default'
+    cache = caches['default']
+    cache.clear()
+    yield cache
+    cache.clear()
+
 @pytest.fixture
 def authenticate_api_request(make_player) -> Callable:
     """Return an API Request object to pass to a view function."""
@@ -0,0 +1,72 @@
+"""
+Tests for the serializer fields in the api app.
+"""
+from django.core.exceptions import ImproperlyConfigured
+from django.urls import NoReverseMatch, reverse
+
+import pytest
+
+from rest_framework.test import APIRequestFactory
+
+from api.serializers import GameSerializer, MatchSerializer, ScoreSerializer
+from base.models import Game, Match, Score
+from tests.fixtures import *
+
+def test_parameterized_url_matches_reverse(player0, simple_match, simple_game,
+                                           django_assert_num_queries):
+    """ParameterizedHyperlinkedIdentityField builds the URL `reverse` would,
+    reading the Match's pk from the Game without fetching the Match.
+    """
+    request = APIRequestFactory().get('/')
+    field = GameSerializer(context={'request': request}).fields['url']
+    game = Game.objects.get(pk=simple_game.pk)
+
+    with django_assert_num_queries(0):
+        url = field.to_representation(game)
+
+    assert url == request.build_absolute_uri(reverse(
+        'api:game-detail',
+        kwargs={'match_pk': simple_match.pk, 'game_pk': simple_game.pk}))
+
+def test_parameterized_url_with_format(player0, simple_match):
+    """A format suffix and a `?format=` override are kept, as with
+    `reverse`."""
+    request = APIRequestFactory().get('/', {'format': 'json'})
+    field = ScoreSerializer(context={'request': request}).fields['url']
+    field.context['format'] = 'json'
+    score = Score.objects.select_related('player').get(
+        match=simple_match, player=player0)
+
+    url = field.to_representation(score)
+
+    assert url == request.build_absolute_uri(reverse(
+        'api:score-detail',
+        kwargs={'match_pk': simple_match.pk, 'username': 'player0',
+                'format': 'json'})) + '?format=json'
+
+def test_match_game_urls(player0, simple_match, simple_game):
+    """A Match links to its Games' detail URLs."""
+    request = APIRequestFactory().get('/')
+    data = MatchSerializer(Match.objects.get(pk=simple_match.pk),
+                           context={'request': request}).data
+
+    assert data['games'] == [request.build_absolute_uri(reverse(
+        'api:game-detail',
+        kwargs={'match_pk': simple_match.pk, 'game_pk': simple_game.pk}))]
+
+def test_parameterized_url_rejects_values_reverse_rejects(make_player,
+                                                          make_match):
+    """A username the route doesn't accept isn't filled into the compiled
+    template; the URL is left to `reverse`, which rejects it."""
+    player = make_player(username='first.last')
+    match = make_match([player])
+    request = APIRequestFactory().get('/')
+    field = ScoreSerializer(context={'request': request}).fields['url']
+    score = Score.objects.select_related('player').get(match=match,
+                                                        player=player)
+
+    with pytest.raises(NoReverseMatch):
+        reverse('api:score-detail',
+                kwargs={'match_pk': match.pk, 'username': player.username})
+    with pytest.raises(ImproperlyConfigured):
+        field.to_representation(score)
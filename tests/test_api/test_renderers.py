@@ -0,0 +1,57 @@
+"""
+Tests for the renderers in the api app.
+"""
+import json
+
+from django.urls import reverse
+
+import pytest
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import FastJSONRenderer, MessagePackRenderer
+from api.serializers import GameSerializer
+from base.models import Game
+from tests.fixtures import *
+
+@pytest.fixture
+def game_data(player0, player1, simple_match, make_games):
+    make_games(num=3, match=simple_match, winners=[player0, player1, player0],
+               losers=[player1, player0, player1], points=[25, 10, 5])
+    request = APIRequestFactory().get('/')
+    return GameSerializer(Game.objects.all(), many=True,
+                          context={'request': request}).data
+
+def test_fast_json_matches_json_renderer(game_data):
+    """FastJSONRenderer renders the same JSON as JSONRenderer, datetimes
+    included."""
+    pytest.importorskip('orjson')
+
+    fast = FastJSONRenderer().render(game_data)
+
+    assert json.loads(fast) == json.loads(JSONRenderer().render(game_data))
+    assert fast == JSONRenderer().render(game_data)
+
+def test_fast_json_escapes_line_separators():
+    """U+2028 and U+2029 are escaped, so the JSON is also valid
+    JavaScript."""
+    data = {'text': 'a\u2028b\u2029c'}
+
+    assert FastJSONRenderer().render(data) == JSONRenderer().render(data)
+
+def test_fast_json_indent_falls_back(game_data):
+    """Pretty-printed responses are left to JSONRenderer."""
+    renderer_context = {'indent': 4}
+
+    assert (FastJSONRenderer().render(game_data, None, renderer_context)
+            == JSONRenderer().render(game_data, None, renderer_context))
+
+def test_message_pack_round_trip(game_data):
+    """MessagePackRenderer's output decodes to the JSON renderer's values."""
+    msgpack = pytest.importorskip('msgpack')
+
+    packed = MessagePackRenderer().render(game_data)
+
+    assert msgpack.unpackb(packed) == json.loads(
+        JSONRenderer().render(game_data))
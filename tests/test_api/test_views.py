@@ -1,23 +1,32 @@
 from datetime import datetime
 import json
 import re
+from urllib.parse import parse_qs, urlparse
 
-from django.urls import reverse
+from django.contrib import admin
+from django.urls import resolve, reverse
 from django.utils import timezone
 
 import pytest
 
 from rest_framework.test import APIRequestFactory, force_authenticate
 
-from api.views import (MatchCreate, MatchDetail, MatchListPlayer, OutcomeDetail,
+from api.views import (GameExportMatch, GameExportPlayer, GameListPlayer,
+                       MatchCreate, MatchDetail, MatchListPlayer, MatchSnapshot,
+                       MatchSummaryListPlayer,
+                       OutcomeDetail,
                        ScoreDetail, GameDetail, GameListMatch, GameCreate, 
+                       GameBulkCreate,
                        OutcomeListPlayer, ScoreListPlayer, PlayerDetail,
-                       PlayerListAll, PlayerCreate, RequestPlayer)
-from base.models import Outcome, Score
+                       PlayerListAll, PlayerCreate, PlayerStats, RequestPlayer,
+                       RivalryDetail, RivalryListPlayer)
+from base.cache import get_stats
+from base.models import Game, Match, Outcome, Score
 from tests.fixtures import (make_match, make_matches, make_player, make_players,
                             make_game, make_games, authenticate_api_request,
                             mock_now, auth_client, csrftoken, player0, player1,
-                            unauth_api_rf, simple_match)
+                            unauth_api_rf, simple_match, simple_game, response_cache,
+                            matches_and_games_for_win_pct)
 
 def test_player_list(make_players, authenticate_api_request):
     """GET request to the PlayerList view returns multiple Player instances."""
@@ -32,6 +41,163 @@ def test_player_list(make_players, authenticate_api_request):
     assert response.status_code == 200
     assert len(response.data) == player_num
 
+def test_player_list_carries_counts_not_match_set(
+        make_players, make_matches, make_games, authenticate_api_request):
+    """Players in the PlayerList view carry Match and Game counts and a link
+    to their Match list instead of their `match_set`.
+    """
+    players = make_players(3)
+    matches = make_matches(2, players=players[:2])
+    make_games(3, matches[0], [players[0]] * 3, [players[1]] * 3, [20] * 3)
+    view = PlayerListAll.as_view()
+    url = reverse('api:player-list-all')
+
+    request = authenticate_api_request(view, url, 'get', players[0])
+    response = view(request)
+
+    player_data = {data['username']: data for data in response.data}
+    assert 'match_set' not in player_data['player0']
+    assert player_data['player0']['match_count'] == 2
+    assert player_data['player0']['game_count'] == 3
+    assert player_data['player2']['match_count'] == 0
+    assert player_data['player2']['game_count'] == 0
+    assert player_data['player0']['matches'].endswith(
+        reverse('api:match-list-player', kwargs={'username': 'player0'}))
+
+def test_player_list_expands_match_set(make_players, make_matches,
+                                       authenticate_api_request):
+    """With `?expand=match_set`, Players in the PlayerList view carry their
+    full `match_set`.
+    """
+    players = make_players(2)
+    make_matches(2, players=players)
+    view = PlayerListAll.as_view()
+    url = reverse('api:player-list-all')
+
+    request = authenticate_api_request(view, url, 'get', players[0],
+                                       {'expand': 'match_set'})
+    response = view(request)
+
+    assert all(len(data['match_set']) == 2 for data in response.data)
+
+def test_player_stats(player0, player1, make_player,
+                      matches_and_games_for_win_pct, authenticate_api_request,
+                      django_assert_num_queries):
+    """The PlayerStats view returns each Player's wins, losses, and win
+    percentages from one query (plus one for its ETag), best Match win
+    percentage first.
+    """
+    player2 = make_player(username='player2')
+    view = PlayerStats.as_view()
+    url = reverse('api:player-stats')
+
+    request = authenticate_api_request(view, url, 'get', player0)
+    with django_assert_num_queries(2):
+        response = view(request)
+        response.render()
+
+    assert [data['username'] for data in response.data] == [
+        'player0', 'player1', 'player2']
+    assert response.data[0]['matches_won'] == 2
+    assert response.data[0]['matches_lost'] == 1
+    assert response.data[0]['match_win_pct'] == pytest.approx(2 / 3)
+    assert response.data[0]['games_won'] == 8
+    assert response.data[0]['games_lost'] == 7
+    assert response.data[0]['game_win_pct'] == pytest.approx(8 / 15)
+    assert response.data[2]['match_win_pct'] is None
+
+def test_player_stats_sorts_and_paginates(
+        player0, player1, matches_and_games_for_win_pct,
+        authenticate_api_request):
+    """The PlayerStats view sorts by `ordering` and paginates by `limit` and
+    `offset`.
+    """
+    view = PlayerStats.as_view()
+    url = reverse('api:player-stats')
+
+    request = authenticate_api_request(
+        view, url, 'get', player0,
+        {'ordering': 'match_win_pct', 'limit': 1, 'offset': 0})
+    response = view(request)
+
+    assert response.data['count'] == 2
+    assert [data['username'] for data in response.data['results']] == [
+        'player1']
+    assert response.data['next']
+
+def test_player_stats_url_leaves_player_urls_free():
+    """The PlayerStats URL can't be taken for a Player's username."""
+    assert reverse('api:player-stats') == '/api/stats/players/'
+    assert resolve('/api/players/stats/').url_name == 'player-detail'
+
+def test_rivalry_detail(player0, player1, matches_and_games_for_win_pct,
+                        authenticate_api_request, django_assert_num_queries):
+    """The RivalryDetail view returns one Player's head-to-head record
+    against another from one query, from the side of the Player in the URL.
+    """
+    view = RivalryDetail.as_view()
+    records = {}
+    for username, other in [('player0', 'player1'), ('player1', 'player0')]:
+        kwargs = {'username': username, 'other': other}
+        url = reverse('api:rivalry-detail', kwargs=kwargs)
+        request = authenticate_api_request(view, url, 'get', player0)
+        with django_assert_num_queries(1):
+            response = view(request, **kwargs)
+            response.render()
+        assert response.status_code == 200
+        records[username] = response.data
+
+    assert records['player0']['opponent_username'] == 'player1'
+    assert records['player0']['url'].endswith('/players/player0/vs/player1/')
+    assert records['player0']['matches_played'] == 3
+    assert records['player0']['matches_won'] == 2
+    assert records['player0']['matches_lost'] == 1
+    assert records['player0']['games_played'] == 15
+    assert records['player0']['games_won'] == 8
+    assert records['player0']['points'] == 1600
+    assert records['player0']['opponent_points'] == 1400
+    assert records['player1']['matches_won'] == 1
+    assert records['player1']['games_won'] == 7
+    assert records['player1']['game_win_pct'] == pytest.approx(7 / 15)
+
+def test_rivalry_detail_not_found(player0, make_player,
+                                  authenticate_api_request):
+    """Players who have never shared a Match have no Rivalry."""
+    make_player(username='player2')
+    kwargs = {'username': 'player0', 'other': 'player2'}
+    view = RivalryDetail.as_view()
+    url = reverse('api:rivalry-detail', kwargs=kwargs)
+
+    response = view(authenticate_api_request(view, url, 'get', player0),
+                    **kwargs)
+
+    assert response.status_code == 404
+
+def test_rivalry_list_player(player0, player1, make_player, make_match,
+                             make_games, matches_and_games_for_win_pct,
+                             authenticate_api_request):
+    """The RivalryListPlayer view lists a Player's Rivalries, most Games
+    played first.
+    """
+    player2 = make_player(username='player2')
+    match = make_match([player0, player2])
+    make_games(2, match, [player2] * 2, [player0] * 2, [20] * 2)
+    kwargs = {'username': 'player0'}
+    view = RivalryListPlayer.as_view()
+    url = reverse('api:rivalry-list-player', kwargs=kwargs)
+
+    request = authenticate_api_request(view, url, 'get', player0)
+    response = view(request, **kwargs)
+
+    assert [data['opponent_username'] for data in response.data] == [
+        'player1', 'player2']
+    assert response.data[1]['games_lost'] == 2
+
+    request = authenticate_api_request(view, url, 'get', player0,
+                                       {'ordering': 'game_win_pct'})
+    response = view(request, **kwargs)
+    assert response.data[0]['opponent_username'] == 'player2'
+
 def test_player_detail(make_player, authenticate_api_request):
     """GET request to the PlayerDetail view returns the Player instance."""
     username = 'player0'
@@ -106,6 +272,40 @@ def test_match_list_view_returns_no_records_when_matches_are_w_other_players(
 
     assert len(response.data) == 0
 
+def test_match_summary_list_player(player0, player1,
+                                   matches_and_games_for_win_pct, make_match,
+                                   authenticate_api_request,
+                                   django_assert_num_queries):
+    """The MatchSummaryListPlayer view returns each of a Player's Matches
+    with their opponent, both Scores, and their Outcome from one query.
+    """
+    make_match([player0, player1])
+    kwargs = {'username': 'player1'}
+    view = MatchSummaryListPlayer.as_view()
+    url = reverse('api:match-summary-list-player', kwargs=kwargs)
+
+    request = authenticate_api_request(view, url, 'get', player1)
+    with django_assert_num_queries(1):
+        response = view(request, **kwargs)
+        response.render()
+
+    assert len(response.data) == 4
+    current, *past = response.data
+    assert current['opponent_username'] == 'player0'
+    assert current['opponent'].endswith('/api/players/player0/')
+    assert (current['player_score'], current['opponent_score']) == (0, 0)
+    assert current['player_outcome'] is None
+    assert current['datetime_range_formatted'] is None
+    assert re.fullmatch(r'\d+/\d+/\d+', current['datetime_started_formatted'])
+
+    assert sorted((data['player_score'], data['opponent_score'],
+                   data['player_outcome']) for data in past) == [
+        (400, 600, Outcome.LOSS), (400, 600, Outcome.LOSS),
+        (600, 400, Outcome.WIN)]
+    assert all(re.fullmatch(r'\d+/\d+/\d+-\d+/\d+/\d+',
+                            data['datetime_range_formatted'])
+               for data in past)
+
 @pytest.mark.parametrize('match_num', [1, 2, 10])
 def test_match_list_view_returns_records_when_matches_are_with_player(
         make_players, make_matches, authenticate_api_request, match_num):
@@ -124,6 +324,31 @@ def test_match_list_view_returns_records_when_matches_are_with_player(
 
     assert len(response.data) == match_num
 
+@pytest.mark.parametrize('match_num', [1, 10])
+def test_match_list_view_query_count_is_constant(
+        make_players, make_matches, make_games, authenticate_api_request,
+        django_assert_num_queries, match_num):
+    """The MatchList view runs the same number of queries however many
+    Matches, Games, Scores, and Outcomes it returns.
+    """
+    players = make_players(2)
+    for match in make_matches(match_num, players=players):
+        make_games(3, match, [players[0]] * 3, [players[1]] * 3, [20] * 3)
+        Outcome.objects.create(match=match, player=players[0],
+                               player_outcome=Outcome.WIN)
+    kwargs = {'username': players[0].username}
+
+    view = MatchListPlayer.as_view()
+    url = reverse('api:match-list-player', kwargs=kwargs)
+
+    request = authenticate_api_request(view, url, 'get', players[0])
+    with django_assert_num_queries(5):
+        response = view(request, **kwargs)
+        response.render()
+
+    assert len(response.data) == match_num
+    assert all(len(match['games']) == 3 for match in response.data)
+
 def test_match_create(make_players, authenticate_api_request):
     """Sending a POST request to the MatchCreate view creates a new Match."""
     players = make_players(2)
@@ -178,6 +403,61 @@ def test_match_detail_get(make_players, make_match, make_game,
 
     assert url in response.data['url']
 
+@pytest.mark.parametrize('game_num', [1, 10])
+def test_match_detail_query_count_is_constant(
+        make_players, make_match, make_games, authenticate_api_request,
+        django_assert_num_queries, game_num):
+    """The MatchDetail view runs the same number of queries however many
+    Games the Match has.
+    """
+    players = make_players(2)
+    match = make_match(players)
+    make_games(game_num, match, [players[0]] * game_num,
+               [players[1]] * game_num, [20] * game_num)
+    kwargs = {'match_pk': match.pk}
+
+    view = MatchDetail.as_view()
+    url = reverse('api:match-detail', kwargs=kwargs)
+
+    request = authenticate_api_request(view, url, 'get', players[0])
+    with django_assert_num_queries(6):
+        response = view(request, **kwargs)
+        response.render()
+
+    assert len(response.data['games']) == game_num
+
+@pytest.mark.parametrize('game_num', [2, 10])
+def test_match_snapshot(make_players, make_match, make_games,
+                        authenticate_api_request, django_assert_num_queries,
+                        game_num):
+    """The MatchSnapshot view returns a Match with its Players, their wins and
+    losses, and its Games, Scores, and Outcomes, in five queries (plus one
+    for its ETag).
+    """
+    players = make_players(2)
+    match = make_match(players)
+    make_games(game_num, match, [players[0]] * (game_num - 1) + [players[1]],
+               [players[1]] * (game_num - 1) + [players[0]], [20] * game_num)
+    kwargs = {'match_pk': match.pk}
+
+    view = MatchSnapshot.as_view()
+    url = reverse('api:match-snapshot', kwargs=kwargs)
+
+    request = authenticate_api_request(view, url, 'get', players[0])
+    with django_assert_num_queries(6):
+        response = view(request, **kwargs)
+        response.render()
+
+    assert response.status_code == 200
+    assert response.data['match']['target_score'] == match.target_score
+    assert len(response.data['games']) == game_num
+    assert len(response.data['scores']) == 2
+    assert response.data['outcomes'] == []
+    player_data = {data['username']: data for data in response.data['players']}
+    assert player_data['player0']['wins'] == game_num - 1
+    assert player_data['player0']['losses'] == 1
+    assert player_data['player1']['wins'] == 1
+
 def test_match_detail_patch(make_players, make_match,
         authenticate_api_request):
     """PATCH requests to the MatchDetail view update Match instance."""
@@ -272,6 +552,34 @@ def test_game_list(game_count, player0, player1, simple_match, make_games,
     assert response.status_code == 200
     assert len(response.data) == game_count
 
+def test_game_list_paginates_with_page_size(player0, player1, simple_match,
+                                             make_games, authenticate_api_request):
+    """With a `page_size` query parameter, the GameList view returns pages
+    of Games, newest first, linked by cursors.
+    """
+    games = make_games(num=5, match=simple_match, winners=[player0] * 5,
+                       losers=[player1] * 5, points=[5] * 5)
+
+    view = GameListMatch.as_view()
+    kwargs = {'match_pk': simple_match.pk}
+    url = reverse('api:game-list-match', kwargs=kwargs)
+
+    params = {'page_size': 2}
+    game_urls = []
+    for page in range(3):
+        request = authenticate_api_request(view, url, 'get', player0, params)
+        response = view(request, **kwargs)
+        assert response.status_code == 200
+        game_urls += [game['url'] for game in response.data['results']]
+        if response.data['next']:
+            params = parse_qs(urlparse(response.data['next']).query)
+
+    assert response.data['next'] is None
+    assert len(game_urls) == len(set(game_urls)) == 5
+    assert game_urls[0].endswith(
+        reverse('api:game-detail', kwargs={'match_pk': simple_match.pk,
+                                           'game_pk': games[-1].pk}))
+
 def test_game_detail_get(make_players, make_match, make_game,
                          authenticate_api_request, mock_now):
     """A GET request to the GameDetail view returns a Game instance."""
@@ -431,6 +739,62 @@ def test_outcome_list(make_players, make_matches, authenticate_api_request):
 
     assert len(response.data) == match_count
 
+@pytest.mark.parametrize('view_class, url_name, match_kwarg', [
+    (GameListPlayer, 'api:game-list-player', False),
+    (GameListMatch, 'api:game-list-match', True),
+])
+@pytest.mark.parametrize('game_num', [1, 10])
+def test_game_list_query_count_is_constant(
+        player0, player1, simple_match, make_games, authenticate_api_request,
+        django_assert_num_queries, view_class, url_name, match_kwarg,
+        game_num):
+    """The GameListPlayer and GameListMatch views run the same number of
+    queries however many Games they return, linking each Game to its winner
+    and loser without fetching them Game by Game.
+    """
+    make_games(game_num, simple_match, [player0] * game_num,
+               [player1] * game_num, [5] * game_num)
+    kwargs = ({'match_pk': simple_match.pk} if match_kwarg
+              else {'username': player0.username})
+
+    view = view_class.as_view()
+    url = reverse(url_name, kwargs=kwargs)
+
+    request = authenticate_api_request(view, url, 'get', player0)
+    with django_assert_num_queries(3 if match_kwarg else 1):
+        response = view(request, **kwargs)
+        response.render()
+
+    assert len(response.data) == game_num
+
+@pytest.mark.parametrize('view_class, url_name', [
+    (ScoreListPlayer, 'api:score-list-player'),
+    (OutcomeListPlayer, 'api:outcome-list-player'),
+])
+@pytest.mark.parametrize('match_num', [1, 10])
+def test_score_and_outcome_list_query_count_is_constant(
+        make_players, make_matches, authenticate_api_request,
+        django_assert_num_queries, view_class, url_name, match_num):
+    """The ScoreListPlayer and OutcomeListPlayer views run the same number of
+    queries however many rows they return, linking each row to its Player
+    without fetching the Player row by row.
+    """
+    players = make_players(2)
+    for match in make_matches(match_num, players):
+        Outcome.objects.create(match=match, player=players[0],
+                               player_outcome=Outcome.WIN)
+    kwargs = {'username': players[0].username}
+
+    view = view_class.as_view()
+    url = reverse(url_name, kwargs=kwargs)
+
+    request = authenticate_api_request(view, url, 'get', players[0])
+    with django_assert_num_queries(1):
+        response = view(request, **kwargs)
+        response.render()
+
+    assert len(response.data) == match_num
+
 def test_outcome_detail(make_players, make_match, authenticate_api_request):
     """Sending a GET request to the OutcomeDetail view returns a response
     containing data on the requested Outcome instance.
@@ -452,3 +816,616 @@ def test_outcome_detail(make_players, make_match, authenticate_api_request):
     assert response.data['match'].endswith(match.get_absolute_url())
     assert response.data['player'].endswith(players[0].get_absolute_url())
     assert response.data['player_outcome'] == 1
+
+def test_game_bulk_create(make_players, make_match, authenticate_api_request,
+                          django_assert_max_num_queries):
+    """A POST request to the GameBulkCreate view creates every Game in the
+    list with a fixed number of queries.
+    """
+    players = make_players(2)
+    match = make_match(players)
+    url_kwargs = {'match_pk': match.pk}
+    url = reverse('api:game-bulk-create', kwargs=url_kwargs)
+
+    games_data = [
+        {
+            'winner': players[i % 2].get_absolute_url(),
+            'loser': players[(i + 1) % 2].get_absolute_url(),
+            'points': 20,
+            'gin': False,
+            'undercut': False,
+        } for i in range(20)
+    ]
+
+    view = GameBulkCreate.as_view()
+    request = authenticate_api_request(view, url, 'post', players[0],
+                                       games_data, format='json')
+    with django_assert_max_num_queries(12):
+        response = view(request, **url_kwargs)
+
+    assert response.status_code == 201, response.data
+    assert len(response.data) == 20
+    assert match.games.count() == 20
+    assert Score.objects.get(match=match, player=players[0]).player_score == 200
+
+def test_game_bulk_create_rejects_players_outside_match(
+        make_players, make_match, authenticate_api_request):
+    """Games whose winner or loser isn't in the Match are rejected."""
+    players = make_players(3)
+    match = make_match(players[:2])
+    url_kwargs = {'match_pk': match.pk}
+    url = reverse('api:game-bulk-create', kwargs=url_kwargs)
+
+    games_data = [{
+        'winner': players[2].get_absolute_url(),
+        'loser': players[0].get_absolute_url(),
+        'points': 20,
+    }]
+
+    view = GameBulkCreate.as_view()
+    request = authenticate_api_request(view, url, 'post', players[0],
+                                       games_data, format='json')
+    response = view(request, **url_kwargs)
+
+    assert response.status_code == 400
+    assert not match.games.exists()
+
+def test_match_detail_exposes_version(make_players, make_match,
+                                      authenticate_api_request):
+    """MatchDetail responses carry the Match's version as an ETag."""
+    players = make_players(2)
+    match = make_match(players)
+    kwargs = {'match_pk': match.pk}
+
+    view = MatchDetail.as_view()
+    url = reverse('api:match-detail', kwargs=kwargs)
+
+    request = authenticate_api_request(view, url, 'get', players[0], kwargs)
+    response = view(request, **kwargs)
+
+    assert response.data['version'] == 1
+    assert response['ETag'] == '"1"'
+
+def test_match_detail_patch_with_stale_version_fails(
+        make_players, make_match, authenticate_api_request):
+    """A PATCH with an out-of-date If-Match version receives a 412 error."""
+    players = make_players(2)
+    match = make_match(players)
+    url_kwargs = {'match_pk': match.pk}
+
+    view = MatchDetail.as_view()
+    url = reverse('api:match-detail', kwargs=url_kwargs)
+
+    request = authenticate_api_request(view, url, 'patch', players[0],
+                                       {'target_score': 250},
+                                       HTTP_IF_MATCH='"1"')
+    response = view(request, **url_kwargs)
+    assert response.status_code == 200
+    assert response['ETag'] == '"2"'
+
+    request = authenticate_api_request(view, url, 'patch', players[0],
+                                       {'target_score': 300},
+                                       HTTP_IF_MATCH='"1"')
+    response = view(request, **url_kwargs)
+    assert response.status_code == 412
+    assert response['X-Match-Version'] == '2'
+    match.refresh_from_db()
+    assert match.target_score == 250
+
+def test_game_create_with_stale_version_fails(
+        make_players, make_match, make_game, authenticate_api_request):
+    """A Game POSTed against an out-of-date Match version receives a 412
+    error, and one against the current version returns the new version.
+    """
+    players = make_players(2)
+    match = make_match(players)
+    make_game(match, players[0], players[1], 25)
+    url_kwargs = {'match_pk': match.pk}
+    url = reverse('api:game-create', kwargs=url_kwargs)
+
+    create_kwargs = {
+        'match': match.get_absolute_url(),
+        'winner': players[0].get_absolute_url(),
+        'loser': players[1].get_absolute_url(),
+        'points': 30,
+    }
+
+    view = GameCreate.as_view()
+    request = authenticate_api_request(view, url, 'post', players[0],
+                                       create_kwargs, HTTP_IF_MATCH='"1"')
+    response = view(request, **url_kwargs)
+    assert response.status_code == 412
+    assert match.games.count() == 1
+
+    request = authenticate_api_request(view, url, 'post', players[0],
+                                       create_kwargs, HTTP_IF_MATCH='"2"')
+    response = view(request, **url_kwargs)
+    assert response.status_code == 201, response.data
+    assert response['X-Match-Version'] == '3'
+
+def test_game_move_checks_the_version_of_its_match(
+        make_players, make_match, make_game, authenticate_api_request):
+    """Moving a Game to another Match checks If-Match against the Match in
+    the URL, and returns that Match's new version."""
+    players = make_players(2)
+    match = make_match(players)
+    other_match = make_match(players)
+    game = make_game(match, players[0], players[1], 25)
+    assert (Match.objects.get(pk=match.pk).version,
+            Match.objects.get(pk=other_match.pk).version) == (2, 1)
+
+    view = GameDetail.as_view()
+    url_kwargs = {'match_pk': match.pk, 'game_pk': game.pk}
+    url = reverse('api:game-detail', kwargs=url_kwargs)
+    patch_kwargs = {'match': other_match.get_absolute_url()}
+
+    request = authenticate_api_request(view, url, 'patch', players[0],
+                                       patch_kwargs, HTTP_IF_MATCH='"1"')
+    response = view(request, **url_kwargs)
+    assert response.status_code == 412
+    assert Game.objects.get(pk=game.pk).match_id == match.pk
+
+    request = authenticate_api_request(view, url, 'patch', players[0],
+                                       patch_kwargs, HTTP_IF_MATCH='"2"')
+    response = view(request, **url_kwargs)
+    assert response.status_code == 200, response.data
+    assert response['X-Match-Version'] == '3'
+    assert Game.objects.get(pk=game.pk).match_id == other_match.pk
+
+def test_game_detail_delete_with_malformed_version_fails(
+        make_players, make_match, make_game, authenticate_api_request):
+    """An If-Match header that isn't a Match version receives a 400 error."""
+    players = make_players(2)
+    match = make_match(players)
+    game = make_game(match, players[0], players[1], 50)
+
+    view = GameDetail.as_view()
+    kwargs = {'match_pk': match.pk, 'game_pk': game.pk}
+    url = reverse('api:game-detail', kwargs=kwargs)
+
+    request = authenticate_api_request(view, url, 'delete', players[0],
+                                       HTTP_IF_MATCH='"abc"')
+    response = view(request, **kwargs)
+
+    assert response.status_code == 400
+    assert match.games.exists()
+
+def test_game_create_with_idempotency_key_runs_once(
+        make_players, make_match, authenticate_api_request):
+    """A Game POST retried with the same Idempotency-Key returns the original
+    response without adding the points again.
+    """
+    players = make_players(2)
+    match = make_match(players)
+    url_kwargs = {'match_pk': match.pk}
+    url = reverse('api:game-create', kwargs=url_kwargs)
+
+    create_kwargs = {
+        'match': match.get_absolute_url(),
+        'winner': players[0].get_absolute_url(),
+        'loser': players[1].get_absolute_url(),
+        'points': 30,
+    }
+
+    view = GameCreate.as_view()
+    responses = []
+    for i in range(2):
+        request = authenticate_api_request(view, url, 'post', players[0],
+                                           create_kwargs,
+                                           HTTP_IDEMPOTENCY_KEY='game-1')
+        responses.append(view(request, **url_kwargs))
+
+    assert responses[0].status_code == responses[1].status_code == 201
+    assert responses[0].data == responses[1].data
+    assert responses[1]['Idempotent-Replayed'] == 'true'
+    assert responses[1]['X-Match-Version'] == '2'
+    assert Game.objects.filter(match=match).count() == 1
+    assert Score.objects.get(match=match, player=players[0]).player_score == 30
+
+def test_match_create_with_reused_idempotency_key_fails(
+        make_players, authenticate_api_request):
+    """An Idempotency-Key sent again with a different body receives a 422
+    error.
+    """
+    players = make_players(2)
+    url = reverse('api:match-create')
+    view = MatchCreate.as_view()
+
+    for target_score, status_code in ((500, 201), (250, 422)):
+        create_kwargs = {
+            'players': [player.get_absolute_url() for player in players],
+            'target_score': target_score,
+        }
+        request = authenticate_api_request(view, url, 'post', players[0],
+                                           create_kwargs,
+                                           HTTP_IDEMPOTENCY_KEY='match-1')
+        response = view(request)
+        assert response.status_code == status_code
+
+    assert Match.objects.count() == 1
+
+def test_match_detail_not_modified(player0, player1, simple_match,
+                                   authenticate_api_request,
+                                   django_assert_num_queries):
+    """A GET of MatchDetail with the Match's current version in
+    If-None-Match is answered with 304 from one query, until the Match
+    changes.
+    """
+    kwargs = {'match_pk': simple_match.pk}
+    view = MatchDetail.as_view()
+    url = reverse('api:match-detail', kwargs=kwargs)
+
+    response = view(authenticate_api_request(view, url, 'get', player0),
+                    **kwargs)
+    etag = response['ETag']
+    assert response['Last-Modified']
+
+    request = authenticate_api_request(view, url, 'get', player0,
+                                       HTTP_IF_NONE_MATCH=etag)
+    with django_assert_num_queries(1):
+        response = view(request, **kwargs)
+    assert response.status_code == 304
+    assert response['ETag'] == etag
+
+    Game.objects.create(match=simple_match, winner=player0, loser=player1,
+                        points=25)
+    request = authenticate_api_request(view, url, 'get', player0,
+                                       HTTP_IF_NONE_MATCH=etag)
+    response = view(request, **kwargs)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+@pytest.mark.parametrize('write', ['match', 'score_admin', 'outcome_admin'])
+def test_match_detail_modified_by_writes_outside_the_api(
+        player0, simple_match, authenticate_api_request, write):
+    """A Match saved directly, or a Score or Outcome saved in the admin,
+    changes the Match's ETag."""
+    kwargs = {'match_pk': simple_match.pk}
+    view = MatchDetail.as_view()
+    url = reverse('api:match-detail', kwargs=kwargs)
+    etag = view(authenticate_api_request(view, url, 'get', player0),
+                **kwargs)['ETag']
+
+    if write == 'match':
+        simple_match.target_score = 100
+        simple_match.save()
+    else:
+        model = Score if write == 'score_admin' else Outcome
+        obj = (Score.objects.get(match=simple_match, player=player0)
+               if model is Score else
+               Outcome(match=simple_match, player=player0,
+                       player_outcome=Outcome.WIN))
+        admin.site._registry[model].save_model(None, obj, None, True)
+
+    request = authenticate_api_request(view, url, 'get', player0,
+                                       HTTP_IF_NONE_MATCH=etag)
+    response = view(request, **kwargs)
+    assert response.status_code == 200
+    assert response['ETag'] != etag
+
+def test_not_modified_only_for_the_same_representation(
+        player0, simple_match, authenticate_api_request):
+    """The ETag of a MatchDetail GET differs by representation and media
+    type, so one representation's ETag doesn't get a 304 for another. Any
+    of them can be sent back in If-Match.
+    """
+    kwargs = {'match_pk': simple_match.pk}
+    view = MatchDetail.as_view()
+    url = reverse('api:match-detail', kwargs=kwargs)
+
+    etag = view(authenticate_api_request(view, url, 'get', player0),
+                **kwargs)['ETag']
+    etags = {etag}
+    for params, headers in [({'repr': 'compact'}, {}),
+                            ({}, {'HTTP_ACCEPT': 'text/html'})]:
+        request = authenticate_api_request(view, url, 'get', player0, params,
+                                           HTTP_IF_NONE_MATCH=etag, **headers)
+        response = view(request, **kwargs)
+        assert response.status_code == 200
+        etags.add(response['ETag'])
+    assert len(etags) == 3
+
+    request = authenticate_api_request(view, url, 'patch', player0,
+                                       {'target_score': 400}, format='json',
+                                       HTTP_IF_MATCH=response['ETag'])
+    assert view(request, **kwargs).status_code == 200
+
+def test_game_list_match_not_modified_since(player0, simple_match,
+                                            authenticate_api_request):
+    """A GET of GameListMatch with If-Modified-Since at or after the Match's
+    last change is answered with 304.
+    """
+    kwargs = {'match_pk': simple_match.pk}
+    view = GameListMatch.as_view()
+    url = reverse('api:game-list-match', kwargs=kwargs)
+
+    response = view(authenticate_api_request(view, url, 'get', player0),
+                    **kwargs)
+    request = authenticate_api_request(
+        view, url, 'get', player0,
+        HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+    response = view(request, **kwargs)
+
+    assert response.status_code == 304
+
+def test_player_list_not_modified(player0, player1, simple_match,
+                                  authenticate_api_request,
+                                  django_assert_num_queries):
+    """A GET of PlayerListAll with a current ETag is answered with 304 from
+    one query, until a Player's PlayerStats change.
+    """
+    view = PlayerListAll.as_view()
+    url = reverse('api:player-list-all')
+
+    response = view(authenticate_api_request(view, url, 'get', player0))
+    etag = response['ETag']
+
+    request = authenticate_api_request(view, url, 'get', player0,
+                                       HTTP_IF_NONE_MATCH=etag)
+    with django_assert_num_queries(1):
+        response = view(request)
+    assert response.status_code == 304
+
+    Game.objects.create(match=simple_match, winner=player0, loser=player1,
+                        points=25)
+    request = authenticate_api_request(view, url, 'get', player0,
+                                       HTTP_IF_NONE_MATCH=etag)
+    assert view(request).status_code == 200
+
+def test_match_detail_response_cache(player0, player1, simple_match,
+                                     response_cache, authenticate_api_request,
+                                     django_assert_num_queries,
+                                     django_capture_on_commit_callbacks):
+    """A repeat GET of MatchDetail is served from the response cache without
+    queries, until a Game write to the Match commits.
+    """
+    kwargs = {'match_pk': simple_match.pk}
+    view = MatchDetail.as_view()
+    url = reverse('api:match-detail', kwargs=kwargs)
+
+    response = view(authenticate_api_request(view, url, 'get', player0),
+                    **kwargs)
+    assert response['X-Cache'] == 'MISS'
+
+    request = authenticate_api_request(view, url, 'get', player0)
+    with django_assert_num_queries(0):
+        cached = view(request, **kwargs)
+    assert cached['X-Cache'] == 'HIT'
+    assert json.loads(cached.content) == response.data
+    assert cached['ETag'] == response['ETag']
+
+    with django_capture_on_commit_callbacks(execute=True):
+        Game.objects.create(match=simple_match, winner=player0, loser=player1,
+                            points=25)
+    response = view(authenticate_api_request(view, url, 'get', player0),
+                    **kwargs)
+    assert response['X-Cache'] == 'MISS'
+    assert response.data['version'] == 2
+
+def test_match_write_evicts_players_match_lists(
+        player0, simple_match, response_cache, authenticate_api_request,
+        django_capture_on_commit_callbacks):
+    """A write to a Match evicts the cached Match lists of its Players."""
+    kwargs = {'username': player0.username}
+    view = MatchListPlayer.as_view()
+    url = reverse('api:match-list-player', kwargs=kwargs)
+    view(authenticate_api_request(view, url, 'get', player0), **kwargs)
+
+    detail_kwargs = {'match_pk': simple_match.pk}
+    detail_view = MatchDetail.as_view()
+    detail_url = reverse('api:match-detail', kwargs=detail_kwargs)
+    request = authenticate_api_request(detail_view, detail_url, 'patch',
+                                       player0, {'target_score': 100},
+                                       format='json')
+    with django_capture_on_commit_callbacks(execute=True):
+        assert detail_view(request, **detail_kwargs).status_code == 200
+
+    response = view(authenticate_api_request(view, url, 'get', player0),
+                    **kwargs)
+    assert response['X-Cache'] == 'MISS'
+    assert response.data[0]['target_score'] == 100
+
+def test_response_cache_not_modified(player0, simple_match, response_cache,
+                                     authenticate_api_request):
+    """A cached response is answered with 304 when its ETag is current."""
+    kwargs = {'match_pk': simple_match.pk}
+    view = GameListMatch.as_view()
+    url = reverse('api:game-list-match', kwargs=kwargs)
+
+    etag = view(authenticate_api_request(view, url, 'get', player0),
+                **kwargs)['ETag']
+    request = authenticate_api_request(view, url, 'get', player0,
+                                       HTTP_IF_NONE_MATCH=etag)
+    response = view(request, **kwargs)
+
+    assert response.status_code == 304
+    assert response['X-Cache'] == 'HIT'
+    assert response['ETag'] == etag
+
+def test_player_detail_response_cache_counts(player0, response_cache,
+                                             authenticate_api_request,
+                                             django_capture_on_commit_callbacks):
+    """PlayerDetail counts its cache hits and misses, and a Player save
+    evicts the Player's cached response.
+    """
+    kwargs = {'username': player0.username}
+    view = PlayerDetail.as_view()
+    url = reverse('api:player-detail', kwargs=kwargs)
+
+    for i in range(3):
+        view(authenticate_api_request(view, url, 'get', player0), **kwargs)
+    with django_capture_on_commit_callbacks(execute=True):
+        player0.first_name = 'Renamed'
+        player0.save()
+    response = view(authenticate_api_request(view, url, 'get', player0),
+                    **kwargs)
+
+    assert response.data['first_name'] == 'Renamed'
+    assert get_stats(['PlayerDetail']) == {
+        'PlayerDetail': {'hits': 2, 'misses': 2}}
+
+def test_unauthenticated_requests_are_not_cached(simple_match, response_cache,
+                                                 unauth_api_rf):
+    """Requests without a user skip the response cache."""
+    kwargs = {'match_pk': simple_match.pk}
+    view = MatchDetail.as_view()
+    url = reverse('api:match-detail', kwargs=kwargs)
+
+    response = view(unauth_api_rf.get(url), **kwargs)
+
+    assert 'X-Cache' not in response
+
+def test_html_responses_are_not_cached(player0, player1, simple_match,
+                                       response_cache,
+                                       authenticate_api_request):
+    """Browsable API pages, which show the user they were rendered for,
+    aren't cached, so another user never sees them. Cached responses vary
+    by Accept, Cookie, and Authorization.
+    """
+    kwargs = {'match_pk': simple_match.pk}
+    view = MatchDetail.as_view()
+    url = reverse('api:match-detail', kwargs=kwargs)
+
+    for player in (player0, player1):
+        request = authenticate_api_request(view, url, 'get', player,
+                                           HTTP_ACCEPT='text/html')
+        response = view(request, **kwargs)
+        response.render()
+        assert 'X-Cache' not in response
+        assert player.username in response.content.decode()
+
+    view(authenticate_api_request(view, url, 'get', player0), **kwargs)
+    response = view(authenticate_api_request(view, url, 'get', player1),
+                    **kwargs)
+    assert response['X-Cache'] == 'HIT'
+    assert response['Vary'] == 'Accept, Cookie, Authorization'
+
+def test_game_list_compact(player0, player1, simple_match, make_games,
+                           authenticate_api_request, django_assert_num_queries):
+    """With `?repr=compact`, GameListMatch gives each Game's Match by pk and
+    its Players by username, without URLs, from a fixed number of queries.
+    """
+    games = make_games(num=4, match=simple_match, winners=[player0, player1] * 2,
+                       losers=[player1, player0] * 2, points=[5] * 4)
+    view = GameListMatch.as_view()
+    kwargs = {'match_pk': simple_match.pk}
+    url = reverse('api:game-list-match', kwargs=kwargs)
+
+    request = authenticate_api_request(view, url, 'get', player0,
+                                       {'repr': 'compact'})
+    with django_assert_num_queries(3):
+        response = view(request, **kwargs)
+
+    assert response.status_code == 200
+    assert response.data[0] == {
+        'id': games[-1].pk,
+        'match': simple_match.pk,
+        'winner': 'player1',
+        'loser': 'player0',
+        'points': 5,
+        'gin': False,
+        'undercut': False,
+        'datetime_played': response.data[0]['datetime_played'],
+    }
+
+def test_match_detail_compact(player0, player1, simple_match, simple_game,
+                              authenticate_api_request):
+    """With `?repr=compact`, MatchDetail gives the Match's Players by
+    username and its Games by pk."""
+    view = MatchDetail.as_view()
+    kwargs = {'match_pk': simple_match.pk}
+    url = reverse('api:match-detail', kwargs=kwargs)
+
+    request = authenticate_api_request(view, url, 'get', player0,
+                                       {'repr': 'compact'})
+    response = view(request, **kwargs)
+
+    assert response.status_code == 200
+    assert response.data['id'] == simple_match.pk
+    assert sorted(response.data['players']) == ['player0', 'player1']
+    assert response.data['games'] == [simple_game.pk]
+    assert 'url' not in response.data
+    assert response['ETag'].startswith(f'"{response.data["version"]}-')
+
+def test_player_list_compact(player0, player1, authenticate_api_request):
+    """With `?repr=compact`, PlayerListAll leaves out every URL, even with
+    `?expand=match_set`."""
+    view = PlayerListAll.as_view()
+    url = reverse('api:player-list-all')
+
+    request = authenticate_api_request(
+        view, url, 'get', player0, {'repr': 'compact', 'expand': 'match_set'})
+    response = view(request)
+
+    assert response.status_code == 200
+    assert set(response.data[0]) == {
+        'id', 'username', 'first_name', 'last_name', 'is_active',
+        'date_joined', 'last_login', 'match_count', 'game_count'}
+
+def test_game_export_player_ndjson(player0, player1, simple_match, make_games,
+                                   authenticate_api_request):
+    """GameExportPlayer streams the Player's Games, oldest first, as one JSON
+    object per line."""
+    games = make_games(num=3, match=simple_match,
+                       winners=[player0, player1, player0],
+                       losers=[player1, player0, player1], points=[25, 10, 5])
+    view = GameExportPlayer.as_view()
+    kwargs = {'username': player0.username}
+    url = reverse('api:game-export-player', kwargs=kwargs)
+
+    request = authenticate_api_request(view, url, 'get', player0,
+                                       {'format': 'ndjson'})
+    response = view(request, **kwargs)
+
+    assert response.status_code == 200
+    assert response.streaming
+    assert response['Content-Type'] == 'application/x-ndjson'
+    assert response['Content-Disposition'] == (
+        'attachment; filename="player0-games.ndjson"')
+    rows = [json.loads(line) for line
+            in b''.join(response.streaming_content).splitlines()]
+    assert [row['id'] for row in rows] == [game.pk for game in games]
+    assert rows[1] == {
+        'id': games[1].pk,
+        'match': simple_match.pk,
+        'datetime_played': rows[1]['datetime_played'],
+        'winner': 'player1',
+        'loser': 'player0',
+        'points': 10,
+        'gin': False,
+        'undercut': False,
+    }
+    assert rows[1]['datetime_played'].endswith('Z')
+
+def test_game_export_match_csv(player0, player1, simple_match, simple_game,
+                               authenticate_api_request):
+    """GameExportMatch streams the Match's Games as CSV with a header row."""
+    view = GameExportMatch.as_view()
+    kwargs = {'match_pk': simple_match.pk}
+    url = reverse('api:game-export-match', kwargs=kwargs)
+
+    request = authenticate_api_request(view, url, 'get', player0,
+                                       HTTP_ACCEPT='text/csv')
+    response = view(request, **kwargs)
+
+    assert response['Content-Type'] == 'text/csv; charset=utf-8'
+    lines = b''.join(response.streaming_content).decode().splitlines()
+    assert lines[0] == ('id,match,datetime_played,winner,loser,points,gin,'
+                        'undercut')
+    assert lines[1].startswith(f'{simple_game.pk},{simple_match.pk},')
+    assert lines[1].endswith(
+        f',{simple_game.winner.username},{simple_game.loser.username},'
+        f'{simple_game.points},False,False')
+    assert len(lines) == 2
+
+def test_game_export_unknown_player(player0, authenticate_api_request):
+    """Exporting the Games of a Player that doesn't exist returns 404."""
+    view = GameExportPlayer.as_view()
+    kwargs = {'username': 'nobody'}
+    url = reverse('api:game-export-player', kwargs=kwargs)
+
+    request = authenticate_api_request(view, url, 'get', player0,
+                                       {'format': 'csv'})
+    response = view(request, **kwargs)
+
+    assert response.status_code == 404
@@ -0,0 +1,26 @@
+"""
+Tests for base system checks.
+"""
+from base.checks import check_response_cache
+
+def test_response_cache_check_passes_when_off(settings):
+    settings.API_RESPONSE_CACHE = ''
+    assert check_response_cache(None) == []
+
+def test_response_cache_check_rejects_unknown_alias(settings):
+    settings.API_RESPONSE_CACHE = 'missing'
+    assert [error.id for error in check_response_cache(None)] == ['base.E001']
+
+def test_response_cache_check_warns_about_per_process_cache(settings):
+    """A LocMemCache isn't shared between workers."""
+    settings.API_RESPONSE_CACHE = 'default'
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    assert [error.id for error in check_response_cache(None)] == ['base.W001']
+
+def test_response_cache_check_passes_for_shared_cache(settings):
+    settings.API_RESPONSE_CACHE = 'default'
+    settings.CACHES = {'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': 'redis://127.0.0.1:6379'}}
+    assert check_response_cache(None) == []
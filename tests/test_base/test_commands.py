@@ -0,0 +1,244 @@
+"""
+Tests for the management commands in the base app.
+"""
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import CommandError, call_command
+from django.utils import timezone
+
+from accounts.models import Player
+from base.cache import generation_key, get_generations, record
+from base.models import (Game, IdempotencyKey, Match, Outcome, PlayerStats,
+                         Score)
+from tests.fixtures import *
+
+def reconcile_scores(*args):
+    out = StringIO()
+    call_command('reconcile_scores', *args, stdout=out)
+    return out.getvalue()
+
+def test_reconcile_scores_without_drift(player0, player1,
+                                        incomplete_match_with_ten_games):
+    """Matches whose Scores agree with their Games report no drift."""
+    output = reconcile_scores()
+
+    assert 'Checked 1 matches.' in output
+    assert 'No drift found.' in output
+
+def test_reconcile_scores_reports_drift(player0, player1, simple_match,
+                                        simple_game):
+    """A Score that doesn't match its Games is reported but left alone
+    without --repair.
+    """
+    Score.objects.filter(match=simple_match, player=player0).update(
+        player_score=40)
+
+    output = reconcile_scores()
+
+    assert 'Scores with drift: 1' in output
+    assert 'Run with --repair to fix drift.' in output
+    assert Score.objects.get(match=simple_match, player=player0).player_score == 40
+
+def test_reconcile_scores_repairs_drift(player0, player1, simple_match,
+                                        simple_game):
+    """With --repair, drifted Scores, Match completion, and Outcomes are
+    recomputed from the Games.
+    """
+    Score.objects.filter(match=simple_match, player=player0).update(
+        player_score=600)
+    Match.objects.filter(pk=simple_match.pk).update(complete=True)
+    Outcome.objects.create(match=simple_match, player=player1,
+                           player_outcome=Outcome.WIN)
+
+    output = reconcile_scores('--repair', '--batch-size', '1')
+
+    assert 'Scores with drift: 1' in output
+    assert 'Matches with drift: 1' in output
+    assert 'Outcomes with drift: 1' in output
+
+    simple_match.refresh_from_db()
+    assert Score.objects.get(match=simple_match, player=player0).player_score == 25
+    assert simple_match.complete is False
+    assert not Outcome.objects.filter(match=simple_match).exists()
+    assert 'No drift found.' in reconcile_scores()
+
+def test_reconcile_scores_completes_match(player0, player1, simple_match,
+                                          simple_game):
+    """With --repair, a Match whose recomputed Score reaches the target is
+    completed with Outcomes for both Players.
+    """
+    Match.objects.filter(pk=simple_match.pk).update(target_score=20)
+
+    reconcile_scores('--repair')
+
+    simple_match.refresh_from_db()
+    assert simple_match.complete is True
+    assert simple_match.datetime_ended == simple_game.datetime_played
+    assert Outcome.objects.get(match=simple_match, player=player0).player_outcome == Outcome.WIN
+    assert Outcome.objects.get(match=simple_match, player=player1).player_outcome == Outcome.LOSS
+
+def test_reconcile_scores_since(player0, player1, simple_match, simple_game):
+    """With --since, Matches with no activity since that date aren't
+    checked.
+    """
+    Score.objects.filter(match=simple_match, player=player0).update(
+        player_score=40)
+
+    output = reconcile_scores('--since', '2999-01-01')
+
+    assert 'No matches to check.' in output
+
+def test_evict_idempotency_keys_deletes_expired_keys(db, settings):
+    """Only IdempotencyKeys older than IDEMPOTENCY_KEY_TTL are deleted."""
+    settings.IDEMPOTENCY_KEY_TTL = 60
+    now = timezone.now()
+    for key, age in (('a' * 64, 30), ('b' * 64, 90)):
+        IdempotencyKey.objects.create(
+            key=key, request_hash='', status_code=201, response={},
+            datetime_created=now - timedelta(seconds=age))
+
+    out = StringIO()
+    call_command('evict_idempotency_keys', stdout=out)
+
+    assert 'Deleted 1 expired idempotency keys.' in out.getvalue()
+    assert list(IdempotencyKey.objects.values_list('key', flat=True)) == ['a' * 64]
+
+def test_rebuild_player_stats_backfills_missing_stats(player0, player1,
+                                                      simple_match,
+                                                      simple_game):
+    """rebuild_player_stats creates PlayerStats for Players without them."""
+    PlayerStats.objects.all().delete()
+
+    out = StringIO()
+    call_command('rebuild_player_stats', '--batch-size', '1', stdout=out)
+
+    assert 'Rebuilt stats for 2 players.' in out.getvalue()
+    assert 'Rebuilt 1 rivalries.' in out.getvalue()
+    stats = PlayerStats.objects.get(player=player0)
+    assert stats.matches_played == 1
+    assert stats.games_won == 1
+    assert stats.total_points == simple_game.points
+
+
+def test_response_cache_stats_reports_hit_rate(db, response_cache):
+    """response_cache_stats prints each cached view's hits, misses, and hit
+    rate."""
+    for outcome in ('hits', 'hits', 'hits', 'misses'):
+        record('MatchDetail', outcome)
+    out = StringIO()
+    call_command('response_cache_stats', stdout=out)
+
+    assert 'MatchDetail: 3 hits, 1 misses, 75.0% hit rate' in out.getvalue()
+    assert 'PlayerDetail: 0 hits, 0 misses, 0.0% hit rate' in out.getvalue()
+
+SCORESHEET = """match,datetime_played,winner,loser,points,gin,undercut,target_score
+a,2020-01-02T20:00:00+00:00,alice,bob,60,false,false,100
+a,2020-01-01T20:00:00+00:00,bob,alice,30,true,false,100
+a,2020-01-03T20:00:00+00:00,alice,bob,50,false,true,100
+b,2020-02-01T20:00:00+00:00,bob,carol,25,,,
+"""
+
+def test_import_scoresheets_creates_matches(db, tmp_path):
+    """import_scoresheets creates the Players, Matches, Games, Scores, and
+    Outcomes of a scoresheet, keeping when each Game was played."""
+    path = tmp_path / 'games.csv'
+    path.write_text(SCORESHEET)
+    out = StringIO()
+    call_command('import_scoresheets', path, '--batch-size', '2', stdout=out)
+
+    assert 'Created 3 players.' in out.getvalue()
+    assert 'Imported 4 games in 2 matches.' in out.getvalue()
+    alice = Player.objects.get(username='alice')
+    assert not alice.has_usable_password()
+
+    match = Match.objects.get(target_score=100)
+    assert match.complete
+    assert match.datetime_started.isoformat() == '2020-01-01T20:00:00+00:00'
+    assert match.datetime_ended.isoformat() == '2020-01-03T20:00:00+00:00'
+    assert set(match.players.values_list('username', flat=True)) == {
+        'alice', 'bob'}
+    assert dict(match.score_set.values_list('player__username',
+                                            'player_score')) == {
+        'alice': 110, 'bob': 30}
+    assert dict(match.outcome_set.values_list('player__username',
+                                              'player_outcome')) == {
+        'alice': Outcome.WIN, 'bob': Outcome.LOSS}
+    game = match.games.get(gin=True)
+    assert game.datetime_played.isoformat() == '2020-01-01T20:00:00+00:00'
+
+    match = Match.objects.get(target_score=500)
+    assert not match.complete
+    assert match.games.get().points == 25
+    assert not match.outcome_set.exists()
+
+    assert PlayerStats.objects.get(player=alice).games_won == 2
+    assert 'No drift found.' in reconcile_scores()
+
+def test_import_scoresheets_reads_ndjson(player0, tmp_path):
+    """NDJSON scoresheets are read a Game per line, and existing Players are
+    reused."""
+    path = tmp_path / 'games.ndjson'
+    path.write_text(json.dumps({
+        'match': 'a', 'datetime_played': '2020-01-01T20:00:00Z',
+        'winner': player0.username, 'loser': 'newcomer', 'points': 20,
+        'gin': True,
+    }) + '\n')
+    out = StringIO()
+    call_command('import_scoresheets', path, stdout=out)
+
+    assert 'Created 1 players.' in out.getvalue()
+    game = Game.objects.get()
+    assert game.winner == player0
+    assert game.gin
+
+def test_import_scoresheets_dry_run(db, tmp_path):
+    """--dry-run reports what would be imported without writing it."""
+    path = tmp_path / 'games.csv'
+    path.write_text(SCORESHEET)
+    out = StringIO()
+    call_command('import_scoresheets', path, '--dry-run', stdout=out)
+
+    assert 'Would import 4 games in 2 matches.' in out.getvalue()
+    assert not Match.objects.exists()
+    assert not Player.objects.exists()
+
+def test_import_scoresheets_skips_imported_matches(db, tmp_path):
+    """Re-running an import skips the Matches it already created."""
+    path = tmp_path / 'games.csv'
+    path.write_text(SCORESHEET)
+    call_command('import_scoresheets', path, stdout=StringIO())
+    out = StringIO()
+    call_command('import_scoresheets', path, path, stdout=out)
+
+    assert 'Skipped 4 matches that were already imported.' in out.getvalue()
+    assert 'Imported 0 games in 0 matches.' in out.getvalue()
+    assert Match.objects.count() == 2
+    assert Game.objects.count() == 4
+
+def test_import_scoresheets_evicts_players_cached_responses(
+        player0, tmp_path, response_cache, django_capture_on_commit_callbacks):
+    """Importing Games for an existing Player evicts the Player's cached
+    responses once the import commits."""
+    key = generation_key('player', player0.pk)
+    generation = get_generations([key])[key]
+    path = tmp_path / 'games.ndjson'
+    path.write_text(json.dumps({
+        'match': 'a', 'datetime_played': '2020-01-01T20:00:00Z',
+        'winner': player0.username, 'loser': 'newcomer', 'points': 20,
+    }) + '\n')
+    with django_capture_on_commit_callbacks(execute=True):
+        call_command('import_scoresheets', path, stdout=StringIO())
+
+    assert get_generations([key])[key] > generation
+
+def test_import_scoresheets_rejects_invalid_rows(db, tmp_path):
+    """An invalid row stops the import, naming its file and line."""
+    path = tmp_path / 'games.csv'
+    path.write_text(SCORESHEET + 'b,2020-02-02,bob,carol,-5,,,\n')
+
+    with pytest.raises(CommandError, match='games.csv:6: points must be'):
+        call_command('import_scoresheets', path, stdout=StringIO())
+    assert not Match.objects.exists()
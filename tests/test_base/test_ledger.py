@@ -0,0 +1,104 @@
+"""
+Tests for the game ledger in the base app.
+"""
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+
+import pytest
+
+from base.models import Game, LedgerEntry, Score, ScoreCheckpoint
+from base.services import GameService, checkpoint_scores, rebuild_scores
+from tests.fixtures import *
+
+@pytest.fixture
+def ledger_on(settings):
+    settings.GAME_LEDGER = True
+
+def test_no_ledger_entries_when_ledger_off(player0, player1, simple_match):
+    """With the ledger off, Game writes don't create LedgerEntry records."""
+    GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=25))
+
+    assert not LedgerEntry.objects.exists()
+
+def test_game_writes_append_ledger_entries(ledger_on, player0, player1,
+                                           simple_match):
+    """Creating, editing, and deleting a Game each append a LedgerEntry with
+    the change to the winner's Score.
+    """
+    game = GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=25))
+    game_pk = game.pk
+    game.points = 40
+    GameService.update(game)
+    GameService.delete(game)
+
+    entries = list(LedgerEntry.objects.values_list(
+        'player', 'game', 'delta', 'reason'))
+    assert entries == [
+        (player0.pk, game_pk, 25, LedgerEntry.CREATE),
+        (player0.pk, game_pk, 15, LedgerEntry.EDIT),
+        (player0.pk, game_pk, -40, LedgerEntry.DELETE),
+    ]
+
+def test_game_signals_append_ledger_entries(ledger_on, player0, player1,
+                                            simple_match, simple_game):
+    """Games written directly through the ORM also append LedgerEntry
+    records.
+    """
+    simple_game.points = 30
+    simple_game.save()
+
+    entries = list(LedgerEntry.objects.values_list('game', 'delta', 'reason'))
+    assert entries == [
+        (simple_game.pk, 25, LedgerEntry.CREATE),
+        (simple_game.pk, 5, LedgerEntry.EDIT),
+    ]
+
+def test_ledger_entries_cannot_be_changed(ledger_on, player0, player1,
+                                          simple_match, simple_game):
+    """Saving an existing LedgerEntry raises an error."""
+    entry = LedgerEntry.objects.get()
+    entry.delta = 100
+    with pytest.raises(ValueError):
+        entry.save()
+
+def test_rebuild_scores_from_checkpoint_and_ledger(
+        ledger_on, player0, player1, simple_match, simple_score):
+    """A Score is rebuilt from its last checkpoint plus the LedgerEntry
+    records written after it.
+    """
+    GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=25))
+    assert checkpoint_scores(Score.objects.all()) == 2
+
+    # No new entries, no new checkpoints
+    assert checkpoint_scores(Score.objects.all()) == 0
+
+    GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=10))
+    Score.objects.filter(pk=simple_score.pk).update(player_score=999)
+
+    assert rebuild_scores(Score.objects.all()) == 1
+    simple_score.refresh_from_db()
+    assert simple_score.player_score == 35
+
+def test_checkpoint_scores_command(ledger_on, player0, player1, simple_match,
+                                   simple_game):
+    """The checkpoint_scores command snapshots Scores and rebuilds them."""
+    out = StringIO()
+    call_command('checkpoint_scores', stdout=out)
+    assert 'Created 2 checkpoints.' in out.getvalue()
+    assert ScoreCheckpoint.objects.count() == 2
+
+    out = StringIO()
+    call_command('checkpoint_scores', '--rebuild', stdout=out)
+    assert 'Rebuilt 0 scores.' in out.getvalue()
+
+@pytest.mark.parametrize('batch_size', ['0', '-1'])
+def test_checkpoint_scores_command_rejects_batch_size(db, batch_size):
+    """--batch-size must be at least 1."""
+    with pytest.raises(CommandError, match='--batch-size must be at least 1'):
+        call_command('checkpoint_scores', '--batch-size', batch_size,
+                     stdout=StringIO())
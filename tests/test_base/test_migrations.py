@@ -0,0 +1,33 @@
+"""
+Tests for the data migrations of the base app.
+"""
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+from base.models import Game, PlayerStats, Rivalry
+from base.services import GameService
+from tests.fixtures import *
+from tests.test_base.test_services import player_stats_values, rivalry_values
+
+def test_migration_fills_player_stats(player0, player1, simple_match,
+                                      make_player, make_match):
+    """0017_rebuild_player_stats fills in the PlayerStats and Rivalries of
+    existing Players the way a rebuild does."""
+    player2 = make_player(username='player2')
+    GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=500,
+        gin=True))
+    other_match = make_match([player0, player1, player2])
+    GameService.create(Game(
+        match=other_match, winner=player2, loser=player0, points=40))
+    players = (player0, player1, player2)
+    expected = (player_stats_values(*players), rivalry_values(*players))
+
+    executor = MigrationExecutor(connection)
+    executor.migrate([('base', '0016_explicit_created_datetimes')])
+    PlayerStats.objects.all().delete()
+    Rivalry.objects.all().delete()
+    executor.loader.build_graph()
+    executor.migrate([('base', '0017_rebuild_player_stats')])
+
+    assert (player_stats_values(*players), rivalry_values(*players)) == expected
@@ -7,7 +7,7 @@ from unittest import mock
 from django.test import TestCase
 
 from accounts.models import Player
-from base.models import Match, Score
+from base.models import Game, Match, Outcome, PlayerStats, Score
 from tests.fixtures import *
 
 ### Match
@@ -31,6 +31,17 @@ def test_match_str(mock_now, simple_match):
     target_str = f'01/01/22 ({simple_match.pk})'
     assert simple_match.__str__() == target_str
 
+def test_match_save_bumps_version(simple_match):
+    """Saving a Match moves it to its next version."""
+    simple_match.target_score = 100
+    simple_match.save()
+    assert simple_match.version == 2
+
+    match = Match.objects.get(pk=simple_match.pk)
+    match.save(update_fields=['target_score'])
+    assert match.version == 3
+    assert Match.objects.get(pk=simple_match.pk).version == 3
+
 ### Score
 
 def test_score_str(mock_now, simple_match, simple_score):
@@ -39,3 +50,77 @@ def test_score_str(mock_now, simple_match, simple_score):
     """
     target_str = f'player0 01/01/22 - 0 ({simple_score.pk})'
     assert simple_score.__str__() == target_str
+
+def test_score_add_points_returns_new_score(simple_match, player0):
+    """`Score.objects.add_points` adds points to the Score in the database
+    and returns the new `player_score`.
+    """
+    new_score = Score.objects.add_points(simple_match.pk, player0.pk, 25)
+    assert new_score == 25
+
+    new_score = Score.objects.add_points(simple_match.pk, player0.pk, -10)
+    assert new_score == 15
+    assert Score.objects.get(match=simple_match, player=player0).player_score == 15
+
+def test_score_add_points_returns_none_for_missing_score(simple_match,
+                                                         make_player):
+    """`Score.objects.add_points` returns None when the Player has no Score
+    for the Match.
+    """
+    player = make_player(username='player2')
+    assert Score.objects.add_points(simple_match.pk, player.pk, 25) is None
+
+@pytest.mark.parametrize('game_count', [2, 50])
+def test_match_delete_takes_constant_queries(
+        make_match, make_games, player0, player1, game_count,
+        django_assert_max_num_queries):
+    """Deleting a Match deletes its Games, Scores, and Outcomes, and takes
+    them out of its Players' PlayerStats and Rivalries, in the same number of
+    queries however many Games it has.
+    """
+    match = make_match([player0, player1])
+    make_games(game_count, match, [player0] * game_count,
+               [player1] * game_count, [20] * game_count)
+
+    with django_assert_max_num_queries(15):
+        deleted, rows_count = match.delete()
+
+    assert rows_count['base.Game'] == game_count
+    assert not Game.objects.exists()
+    assert not Score.objects.exists()
+    assert not Outcome.objects.exists()
+
+def test_match_queryset_delete_deletes_games(make_matches, make_game,
+                                             player0, player1):
+    """Deleting a queryset of Matches deletes their Games without updating
+    the Scores game by game.
+    """
+    matches = make_matches(3, [player0, player1])
+    for match in matches:
+        make_game(match, player0, player1, 25)
+
+    deleted, rows_count = Match.objects.filter(
+        pk__in=[match.pk for match in matches[:2]]).delete()
+
+    assert rows_count['base.Match'] == 2
+    assert rows_count['base.Game'] == 2
+    assert list(Game.objects.values_list('match', flat=True)) == [matches[2].pk]
+    assert Score.objects.get(match=matches[2], player=player0).player_score == 25
+
+def test_match_queryset_delete_through_games(make_matches, make_game,
+                                             player0, player1):
+    """Deleting Matches through a filter on their Games deletes the Matches
+    the filter matched before their Games were deleted, and takes them out
+    of their Players' PlayerStats."""
+    matches = make_matches(2, [player0, player1])
+    make_game(matches[0], player0, player1, 10)
+    make_game(matches[1], player1, player0, 20)
+
+    deleted, rows_count = Match.objects.filter(games__winner=player0).delete()
+
+    assert rows_count['base.Match'] == 1
+    assert rows_count['base.Game'] == 1
+    assert list(Match.objects.all()) == [matches[1]]
+    stats = PlayerStats.objects.get(player=player0)
+    assert (stats.games_won, stats.games_lost) == (0, 1)
+    assert PlayerStats.objects.get(player=player1).games_won == 1
@@ -0,0 +1,388 @@
+"""
+Tests for the GameService in the base app.
+"""
+from contextlib import contextmanager
+
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+
+import pytest
+
+from base.models import Game, Match, Outcome, PlayerStats, Rivalry, Score
+from base.services import (GameService, StaleMatchVersion, complete_match,
+                           rebuild_player_stats, rebuild_rivalries)
+from tests.fixtures import *
+
+@contextmanager
+def assert_max_statements(num):
+    """Fail if more than `num` queries are made, leaving out the BEGIN that
+    SQLite sends as a query of its own (Postgres doesn't)."""
+    with CaptureQueriesContext(connection) as captured:
+        yield captured
+    statements = [query['sql'] for query in captured.captured_queries
+                  if query['sql'] != 'BEGIN']
+    assert len(statements) <= num, '\n'.join(statements)
+
+def test_create_game_updates_score(player0, player1, simple_match, simple_score):
+    """GameService.create saves the Game and adds its points to the winner's
+    Score.
+    """
+    game = GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=25))
+
+    assert game.pk
+    assert game._points_cache == 25
+    simple_score.refresh_from_db()
+    assert simple_score.player_score == 25
+
+def test_create_game_query_budget(player0, player1, simple_match):
+    """A Game that doesn't finish its Match is created in at most 5 queries."""
+    with assert_max_statements(5):
+        GameService.create(Game(
+            match=simple_match, winner=player0, loser=player1, points=25))
+
+def test_create_winning_game_completes_match(player0, player1, simple_match):
+    """A Game that takes the winner past the target score completes the
+    Match and creates both Outcomes.
+    """
+    GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=501))
+
+    simple_match.refresh_from_db()
+    assert simple_match.complete
+    assert simple_match.datetime_ended
+    assert Outcome.objects.get(match=simple_match, player=player0).player_outcome == Outcome.WIN
+    assert Outcome.objects.get(match=simple_match, player=player1).player_outcome == Outcome.LOSS
+
+def test_create_game_rolls_back_on_failure(player0, simple_match, make_player):
+    """If the winner has no Score in the Match, no Game is saved."""
+    outsider = make_player(username='player2')
+    with pytest.raises(Score.DoesNotExist):
+        GameService.create(Game(
+            match=simple_match, winner=outsider, loser=player0, points=25))
+
+    assert not Game.objects.exists()
+
+def test_update_game_changes_points(player0, player1, simple_match, simple_score):
+    """GameService.update moves the winner's Score by the change in points."""
+    game = GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=25))
+
+    game.points = 40
+    with assert_max_statements(6):
+        GameService.update(game)
+
+    simple_score.refresh_from_db()
+    assert simple_score.player_score == 40
+
+def test_update_game_changes_winner(player0, player1, simple_match):
+    """Changing a Game's winner moves its points from the old winner's Score
+    to the new winner's Score.
+    """
+    game = GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=25))
+
+    game.winner, game.loser = player1, player0
+    GameService.update(game)
+
+    assert Score.objects.get(match=simple_match, player=player0).player_score == 0
+    assert Score.objects.get(match=simple_match, player=player1).player_score == 25
+
+def test_update_game_moves_between_matches(player0, player1, simple_match,
+                                          make_match,
+                                          django_assert_max_num_queries):
+    """Moving a Game to another Match moves its points between the Matches'
+    Scores and locks both Matches with one query.
+    """
+    other_match = make_match([player0, player1])
+    game = GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=25))
+
+    game.match = other_match
+    with django_assert_max_num_queries(20) as captured:
+        GameService.update(game)
+
+    assert Score.objects.get(match=simple_match, player=player0).player_score == 0
+    assert Score.objects.get(match=other_match, player=player0).player_score == 25
+    assert Match.objects.get(pk=simple_match.pk).version == 3
+    assert Match.objects.get(pk=other_match.pk).version == 2
+    match_reads = [query['sql'] for query in captured.captured_queries
+                   if query['sql'].startswith('SELECT')
+                   and 'FROM "base_match" ' in query['sql']]
+    assert len(match_reads) == 1
+
+def test_update_game_below_target_reopens_match(player0, player1, simple_match):
+    """Lowering a winning Game's points below the target score reopens the
+    Match and deletes its Outcomes.
+    """
+    game = GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=501))
+
+    game.points = 25
+    GameService.update(game)
+
+    simple_match.refresh_from_db()
+    assert not simple_match.complete
+    assert simple_match.datetime_ended is None
+    assert not Outcome.objects.filter(match=simple_match).exists()
+
+def test_delete_game_reopens_match(player0, player1, simple_match, simple_score):
+    """GameService.delete removes the Game's points from the winner's Score
+    and reopens a Match that drops below the target score.
+    """
+    game = GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=501))
+
+    GameService.delete(game)
+
+    simple_score.refresh_from_db()
+    simple_match.refresh_from_db()
+    assert simple_score.player_score == 0
+    assert not simple_match.complete
+    assert not Game.objects.exists()
+    assert not Outcome.objects.filter(match=simple_match).exists()
+
+def test_bulk_create_games_recomputes_scores(player0, player1, simple_match):
+    """GameService.bulk_create saves every Game and sets each winner's Score
+    to the sum of their Games' points.
+    """
+    games = [
+        Game(winner=player0, loser=player1, points=25),
+        Game(winner=player1, loser=player0, points=10),
+        Game(winner=player0, loser=player1, points=30),
+    ]
+    games = GameService.bulk_create(simple_match, games)
+
+    assert all(game.pk for game in games)
+    assert simple_match.games.count() == 3
+    assert Score.objects.get(match=simple_match, player=player0).player_score == 55
+    assert Score.objects.get(match=simple_match, player=player1).player_score == 10
+    assert not Outcome.objects.filter(match=simple_match).exists()
+
+def test_bulk_create_games_completes_match_once(player0, player1, simple_match):
+    """A batch of Games that takes a Player past the target score completes
+    the Match with a single pair of Outcomes.
+    """
+    games = [Game(winner=player1, loser=player0, points=200) for i in range(4)]
+    GameService.bulk_create(simple_match, games)
+
+    simple_match.refresh_from_db()
+    assert simple_match.complete
+    assert Outcome.objects.filter(match=simple_match).count() == 2
+    assert Outcome.objects.get(match=simple_match, player=player1).player_outcome == Outcome.WIN
+
+def test_game_below_target_skips_completion_queries(
+        player0, player1, simple_match):
+    """A Game that doesn't cross the target score doesn't query the Match's
+    Outcomes or Players.
+    """
+    with assert_max_statements(5) as captured:
+        GameService.create(Game(
+            match=simple_match, winner=player0, loser=player1, points=25))
+
+    sql = ' '.join(query['sql'] for query in captured.captured_queries)
+    assert 'base_outcome' not in sql
+    assert 'base_match_players' not in sql
+
+def test_game_above_target_does_not_complete_match_again(
+        player0, player1, simple_match):
+    """Once a Match is complete, further Games above the target score don't
+    create more Outcomes.
+    """
+    GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=501))
+    GameService.create(Game(
+        match=simple_match, winner=player1, loser=player0, points=501))
+
+    assert Outcome.objects.filter(match=simple_match).count() == 2
+    assert Outcome.objects.get(match=simple_match, player=player0).player_outcome == Outcome.WIN
+
+def test_complete_match_is_a_one_time_transition(player0, player1, simple_match):
+    """`complete_match` only completes a Match that isn't complete yet."""
+    assert complete_match(simple_match, player0.pk)
+    assert not complete_match(simple_match, player1.pk)
+
+    assert Outcome.objects.filter(match=simple_match).count() == 2
+
+def test_complete_match_gives_every_other_player_a_loss(
+        player0, player1, simple_match, make_player):
+    """A Match is lost by each of its Players other than the winner, even if
+    the crossing Game has no loser.
+    """
+    player2 = make_player(username='player2')
+    simple_match.players.add(player2)
+    GameService.create(Game(
+        match=simple_match, winner=player0, loser=None, points=500))
+
+    assert dict(Outcome.objects.filter(match=simple_match).values_list(
+        'player', 'player_outcome')) == {
+        player0.pk: Outcome.WIN, player1.pk: Outcome.LOSS,
+        player2.pk: Outcome.LOSS}
+    assert PlayerStats.objects.get(player=player2).matches_lost == 1
+    assert Rivalry.objects.get(
+        player_a=player0, player_b=player2).a_matches_won == 1
+
+def test_outcome_allows_one_winner_per_match(player0, player1, simple_match):
+    """The database rejects a second winning Outcome for a Match."""
+    Outcome.objects.create(match=simple_match, player=player0,
+                           player_outcome=Outcome.WIN)
+    with pytest.raises(IntegrityError):
+        Outcome.objects.create(match=simple_match, player=player1,
+                               player_outcome=Outcome.WIN)
+
+def test_game_writes_bump_match_version(player0, player1, simple_match):
+    """Each Game create, update, and delete moves the Match to a new version."""
+    game = GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=25))
+    game.points = 30
+    GameService.update(game)
+    GameService.delete(game)
+
+    simple_match.refresh_from_db()
+    assert simple_match.version == 4
+
+def test_stale_version_is_rejected(player0, player1, simple_match, simple_score):
+    """A write against an old Match version raises and changes nothing."""
+    GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=25),
+        expected_version=1)
+
+    with pytest.raises(StaleMatchVersion):
+        GameService.create(Game(
+            match=simple_match, winner=player0, loser=player1, points=25),
+            expected_version=1)
+
+    simple_score.refresh_from_db()
+    assert simple_score.player_score == 25
+    assert Match.objects.get(pk=simple_match.pk).version == 2
+
+def player_stats_values(*players):
+    return list(PlayerStats.objects.filter(player__in=players).order_by(
+        'player').values(*[field.attname
+                           for field in PlayerStats._meta.concrete_fields
+                           if field.name != 'datetime_modified']))
+
+def test_game_writes_update_player_stats(player0, player1, simple_match):
+    """Game creates, edits, and deletes keep PlayerStats equal to a rebuild
+    from scratch.
+    """
+    games = GameService.bulk_create(simple_match, [
+        Game(winner=player0, loser=player1, points=30, gin=True),
+        Game(winner=player1, loser=player0, points=20, undercut=True),
+    ])
+    game = GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=25))
+    game.winner, game.loser, game.points = player1, player0, 40
+    GameService.update(game)
+    GameService.delete(games[0])
+    Game.objects.create(match=simple_match, winner=player0, loser=player1,
+                        points=15, gin=True)
+
+    stats = PlayerStats.objects.get(player=player1)
+    assert (stats.games_won, stats.games_lost) == (2, 1)
+    assert stats.total_points == 60
+    assert stats.undercut_count == 1
+    assert stats.matches_played == 1
+
+    incremental = player_stats_values(player0, player1)
+    rebuild_player_stats([player0.pk, player1.pk])
+    assert player_stats_values(player0, player1) == incremental
+
+def test_match_completion_updates_player_stats(player0, player1, simple_match):
+    """Completing and reopening a Match moves its Players' Match wins and
+    losses.
+    """
+    game = GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=500))
+    assert PlayerStats.objects.get(player=player0).matches_won == 1
+    assert PlayerStats.objects.get(player=player1).matches_lost == 1
+
+    GameService.delete(game)
+    assert PlayerStats.objects.get(player=player0).matches_won == 0
+    assert PlayerStats.objects.get(player=player1).matches_lost == 0
+    assert PlayerStats.objects.get(player=player0).last_played is None
+
+def test_match_delete_subtracts_player_stats(player0, player1, simple_match,
+                                            make_match, make_player):
+    """Deleting Matches takes their Players, Games, and Outcomes out of their
+    Players' PlayerStats and Rivalries, leaving them equal to a rebuild from
+    scratch.
+    """
+    player2 = make_player(username='player2')
+    other_match = make_match([player0, player1, player2])
+    GameService.create(Game(
+        match=other_match, winner=player2, loser=player0, points=40))
+    GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=500,
+        gin=True))
+    third_match = make_match([player1, player2])
+    GameService.create(Game(
+        match=third_match, winner=player1, loser=player2, points=500))
+
+    simple_match.delete()
+    stats = PlayerStats.objects.get(player=player0)
+    assert (stats.matches_played, stats.matches_won, stats.games_won) == (1, 0, 0)
+    assert stats.games_lost == 1
+    Match.objects.filter(pk=third_match.pk).delete()
+
+    players = (player0, player1, player2)
+    incremental = (player_stats_values(*players), rivalry_values(*players))
+    rebuild_player_stats([player.pk for player in players])
+    rebuild_rivalries([player.pk for player in players])
+    assert (player_stats_values(*players), rivalry_values(*players)) == incremental
+
+def test_deleting_the_only_shared_match_deletes_the_rivalry(
+        player0, player1, simple_match, make_player, make_match):
+    """Players who no longer share a Match, once their only shared Match is
+    deleted or they leave it, have no Rivalry."""
+    GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=40))
+    assert Rivalry.objects.filter(player_a=player0, player_b=player1).exists()
+
+    simple_match.delete()
+    assert not Rivalry.objects.exists()
+
+    player2 = make_player(username='player2')
+    match = make_match([player0, player2])
+    match.players.remove(player2)
+    assert not Rivalry.objects.exists()
+
+def rivalry_values(*players):
+    return list(Rivalry.objects.filter(player_a__in=players).order_by(
+        'player_a', 'player_b').values(
+            *[field.attname for field in Rivalry._meta.concrete_fields
+              if not field.primary_key]))
+
+def test_writes_update_rivalries(player0, player1, simple_match, make_player):
+    """Game writes, Match completion, and Match membership keep Rivalries
+    equal to a rebuild from scratch.
+    """
+    player2 = make_player(username='player2')
+    simple_match.players.add(player2)
+    games = GameService.bulk_create(simple_match, [
+        Game(winner=player0, loser=player1, points=30, gin=True),
+        Game(winner=player1, loser=player0, points=20, undercut=True),
+        Game(winner=player2, loser=player0, points=10),
+    ])
+    game = GameService.create(Game(
+        match=simple_match, winner=player0, loser=player1, points=25))
+    game.winner, game.loser, game.points = player2, player1, 40
+    GameService.update(game)
+    GameService.delete(games[0])
+    Game.objects.create(match=simple_match, winner=player1, loser=player0,
+                        points=500)
+
+    rivalry = Rivalry.objects.get(player_a=player0, player_b=player1)
+    assert rivalry.matches_played == 1
+    assert (rivalry.a_matches_won, rivalry.b_matches_won) == (0, 1)
+    assert (rivalry.a_games_won, rivalry.b_games_won) == (0, 2)
+    assert rivalry.b_points == 520
+    assert rivalry.b_undercut_count == 1
+
+    incremental = rivalry_values(player0, player1, player2)
+    rebuild_rivalries([player0.pk, player1.pk, player2.pk])
+    assert rivalry_values(player0, player1, player2) == incremental
+
+    simple_match.players.remove(player2)
+    assert not Rivalry.objects.filter(player_a=player1,
+                                      player_b=player2).exists()
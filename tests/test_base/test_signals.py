@@ -115,3 +115,64 @@ def test_delete_game_deletes_outcomes_and_sets_completed_to_false(
 
     assert Outcome.objects.count() == 0
     assert simple_match.complete == False
+
+def test_update_score_keeps_concurrent_score_changes(
+        player0, player1, simple_match, simple_score):
+    """Creating a Game adds to the Score in the database rather than
+    overwriting it with a stale in-memory value.
+    """
+    # Another request changes the Score after `simple_score` was read
+    Score.objects.filter(pk=simple_score.pk).update(player_score=100)
+    Game.objects.create(
+        match=simple_match, winner=player0, loser=player1, points=25)
+
+    simple_score.refresh_from_db()
+    assert simple_score.player_score == 125
+
+def test_update_score_does_not_check_outcomes_below_target(
+        player0, player1, simple_match, django_assert_num_queries):
+    """Creating a Game that doesn't reach the target score runs only the
+    Game INSERT, the Score UPDATE, the Match version UPDATE, and the
+    PlayerStats and Rivalry UPDATEs.
+    """
+    with django_assert_num_queries(5):
+        Game.objects.create(
+            match=simple_match, winner=player0, loser=player1, points=25)
+
+def test_create_score_for_many_players_in_two_queries(
+        make_players, db, django_assert_max_num_queries):
+    """Adding any number of Players to a Match creates their Scores with
+    one query for existing Scores and one bulk INSERT.
+    """
+    players = make_players(10)
+    match = Match.objects.create()
+
+    with django_assert_max_num_queries(9) as captured:
+        match.players.add(*players)
+
+    score_queries = [query for query in captured.captured_queries
+                     if 'base_score' in query['sql']]
+    assert len(score_queries) == 2
+
+    assert Score.objects.filter(match=match).count() == 10
+
+def test_create_score_skips_existing_scores(player0, player1, simple_match):
+    """Re-adding Players who already have Scores doesn't create new Scores
+    or reset existing ones.
+    """
+    Score.objects.filter(match=simple_match, player=player0).update(
+        player_score=25)
+    simple_match.players.remove(player0)
+    simple_match.players.add(player0, player1)
+
+    assert Score.objects.filter(match=simple_match).count() == 2
+    assert Score.objects.get(match=simple_match, player=player0).player_score == 25
+
+def test_create_score_from_player_side(player0, db):
+    """Adding Matches from the Player side of the relation also creates
+    Scores.
+    """
+    match = Match.objects.create()
+    player0.match_set.add(match)
+
+    assert Score.objects.get(match=match, player=player0).player_score == 0